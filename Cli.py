@@ -0,0 +1,234 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+from auxillary.CoverIndex import CoverIndex
+from auxillary.EntryImport import import_entries, iter_records
+from auxillary.GroupIndex import GroupIndex
+from auxillary.ImageProcessing import ImageProcessor, measure_image
+from auxillary.JSONMethods import load_json, save_json
+from auxillary.SearchEngine import SearchEngine, show_removed, default_sort, loose_match, multi_match
+from auxillary.SimilarGraph import SimilarGraph, repair_links
+from auxillary.ThumbnailManifest import ThumbnailManifest
+from auxillary.ThumbnailStore import DirectoryStore, PackStore, convert_directory, deduplicate, THUMBNAIL_PATH, \
+    PACK_FILE
+
+logger = logging.getLogger("Cli")
+CONFIG_PATH = os.path.join('assets', 'data')
+# Thumbnails handed to the process pool at once when measuring
+MEASURE_CHUNK = 64
+
+
+def load_config():
+    config_file = os.path.join(CONFIG_PATH, "config.json")
+    if not os.path.exists(config_file):
+        config_file = os.path.join(CONFIG_PATH, "config_default.json")
+    with open(config_file, 'r') as f:
+        return json.load(f)
+
+
+def megabytes(size):
+    if abs(size) < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def open_thumbnail_stores():
+    if not os.path.exists(THUMBNAIL_PATH):
+        os.makedirs(THUMBNAIL_PATH)
+    manifest = ThumbnailManifest(os.path.join(THUMBNAIL_PATH, "manifest.db"))
+    pack = PackStore(os.path.join(THUMBNAIL_PATH, PACK_FILE))
+    return manifest, pack
+
+
+def pack_convert(args):
+    manifest, pack = open_thumbnail_stores()
+    converted = convert_directory(manifest, pack)
+    logger.info(f"Moved {converted} thumbnails into {pack.file_path}, enable thumbnail_storage.pack to keep using it.")
+    pack.close()
+
+
+def pack_compact(args):
+    _, pack = open_thumbnail_stores()
+    logger.info(f"{len(pack.index)} live thumbnails, {pack.dead_bytes} bytes in removed records.")
+    reclaimed = pack.compact()
+    logger.info(f"Reclaimed {reclaimed} bytes.")
+    pack.close()
+
+
+def thumbs_report(args):
+    config = load_config().get("thumbnail_storage", {})
+    image_format = config.get("format", "PNG").upper()
+    quality = config.get("quality")
+    manifest = ThumbnailManifest(os.path.join(THUMBNAIL_PATH, "manifest.db"))
+    pack_path = os.path.join(THUMBNAIL_PATH, PACK_FILE)
+    pack = PackStore(pack_path) if os.path.exists(pack_path) else None
+    directory = DirectoryStore(THUMBNAIL_PATH)
+    # Shared files are measured once
+    locations = list(dict.fromkeys(record["path"] for variant in manifest.variants()
+                                   for record in manifest.load(variant).values() if record["path"]))
+    evicted = sum(1 for record in manifest.load().values() if not record["path"])
+
+    processor = ImageProcessor(config.get("processing_workers"))
+    stored = as_png = as_format = count = 0
+    for start in range(0, len(locations), MEASURE_CHUNK):
+        futures = []
+        for location in locations[start:start + MEASURE_CHUNK]:
+            data = pack.read(location) if pack and pack.owns(location) else directory.read(location)
+            if data:
+                stored += len(data)
+                futures.append(processor.submit(measure_image, bytes(data), image_format, quality))
+        for future in futures:
+            png_size, format_size = future.result()
+            as_png += png_size
+            as_format += format_size
+            count += 1
+    processor.shutdown()
+
+    logger.info(f"{count} stored thumbnails use {megabytes(stored)}, {evicted} covers are evicted.")
+    logger.info(f"As lossless PNG they would use {megabytes(as_png)}, saved: {megabytes(as_png - stored)}.")
+    logger.info(f"Encoded as {image_format} with quality {quality} they would use {megabytes(as_format)}, "
+                f"saving {megabytes(as_png - as_format)} compared to PNG.")
+    if config.get("budget_mb"):
+        logger.info(f"Disk budget: {megabytes(manifest.total_size())} of {config['budget_mb']} MB used.")
+    if pack:
+        pack.close()
+
+
+def thumbs_dedupe(args):
+    manifest = ThumbnailManifest(os.path.join(THUMBNAIL_PATH, "manifest.db"))
+    pack_path = os.path.join(THUMBNAIL_PATH, PACK_FILE)
+    pack = PackStore(pack_path) if os.path.exists(pack_path) else None
+    removed, freed = deduplicate(manifest, pack)
+    logger.info(f"Removed {removed} duplicate thumbnails, freeing {megabytes(freed)}.")
+    if pack:
+        pack.close()
+
+
+def similar_repair(args):
+    data_file = load_config()["data_file"]
+    data = load_json(data_file, data_type="mangas")
+    changes = repair_links(data)
+    for entry_id, (entry, added, removed) in changes.items():
+        if added:
+            logger.info(f"{entry_id}: added back links to {', '.join(added)}")
+        if removed:
+            logger.info(f"{entry_id}: removed links to {', '.join(removed)}")
+    if changes and not args.dry_run:
+        save_json(data_file, data)
+    logger.info(f"{'Would repair' if args.dry_run else 'Repaired'} the similar links of {len(changes)} entries.")
+
+
+def data_import(args):
+    config = load_config()
+    data_file = config["data_file"]
+    data = load_json(data_file, data_type="mangas")
+    known = len(data)
+    try:
+        changes, skipped = import_entries(data, iter_records(args.file), config.get("import_precedence"),
+                                          lambda count: logger.info(f"Read {count} records..."))
+    except (OSError, ValueError) as e:
+        # Invalid JSON arrays raise a JSONDecodeError, which is a ValueError
+        logger.error(f"Couldn't import {args.file}: {e}")
+        sys.exit(1)
+    added = len(data) - known
+    if skipped:
+        logger.warning(f"Skipped {skipped} records without an id.")
+    if changes and not args.dry_run:
+        # Everything is merged in memory first so the data file is written once
+        save_json(data_file, data)
+    logger.info(f"{'Would add' if args.dry_run else 'Added'} {added} and {'update' if args.dry_run else 'updated'} "
+                f"{len(changes) - added} entries.")
+
+
+def cover_lookup(config):
+    """similar_covers function of the stored perceptual cover hashes, None if there are no thumbnails yet."""
+    manifest_path = os.path.join(THUMBNAIL_PATH, "manifest.db")
+    if not os.path.exists(manifest_path):
+        return None
+    cover_index = CoverIndex()
+    for entry_id, record in ThumbnailManifest(manifest_path).load().items():
+        if record["dhash"]:
+            cover_index.update(entry_id, int(record["dhash"], 16))
+    default_distance = config.get("thumbnail_storage", {}).get("similar_distance", 10)
+    return lambda entry_id, max_distance: cover_index.similar(
+        entry_id, default_distance if max_distance is None else max_distance)
+
+
+def data_query(args):
+    config = load_config()
+    data = load_json(config["data_file"], data_type="mangas")
+    settings = load_json(config["settings_file"], data_type="dict")
+    for flag, key in ((args.show_removed, show_removed), (args.loose, loose_match), (args.multi, multi_match)):
+        if flag:
+            settings[key] = True
+    entry_to_index = {entry.id: idx for idx, entry in enumerate(data)}
+    engine = SearchEngine(data, entry_to_index, GroupIndex(data, entry_to_index), SimilarGraph(data),
+                          cover_lookup(config))
+
+    # Sort options can be given without their "By " and in any case
+    sort_names = {}
+    for name, _, _ in engine.sorting_options:
+        sort_names[name.lower()] = sort_names[name.lower()[len("by "):]] = name
+    sort_name = args.sort or settings.get(default_sort, engine.sorting_options[0][0])
+    if sort_name.lower() not in sort_names:
+        logger.error(f"Unknown sort {sort_name!r}, use one of {', '.join(name for name, _, _ in engine.sorting_options)}.")
+        sys.exit(1)
+
+    result = engine.query(args.text, sort_names[sort_name.lower()], args.reverse, args.group, settings)
+    entries = result.entries[:args.limit] if args.limit else result.entries
+    for entry in entries:
+        print(json.dumps(entry, ensure_ascii=False) if args.json else entry.id)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless tools for Manga Cabinet, run them while the app is closed.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack = commands.add_parser("pack", help="Manage the packed thumbnail store")
+    pack_actions = pack.add_subparsers(dest="action", required=True)
+    pack_actions.add_parser("convert", help="Move the <id>.png thumbnail files into the pack").set_defaults(
+        func=pack_convert)
+    pack_actions.add_parser("compact", help="Rewrite the pack without removed thumbnails").set_defaults(
+        func=pack_compact)
+
+    thumbs = commands.add_parser("thumbs", help="Inspect the stored thumbnails")
+    thumbs_actions = thumbs.add_subparsers(dest="action", required=True)
+    thumbs_actions.add_parser("report", help="Show the disk usage and the bytes saved by the configured format"
+                              ).set_defaults(func=thumbs_report)
+    thumbs_actions.add_parser("dedupe", help="Store byte-identical thumbnails only once").set_defaults(
+        func=thumbs_dedupe)
+
+    similar = commands.add_parser("similar", help="Maintain the links between similar entries")
+    similar_actions = similar.add_subparsers(dest="action", required=True)
+    repair = similar_actions.add_parser("repair", help="Store one-sided links on both entries and drop broken ones")
+    repair.add_argument("--dry-run", action="store_true", help="Only list the changes")
+    repair.set_defaults(func=similar_repair)
+
+    data_import_parser = commands.add_parser("import", help="Merge a JSON or JSON Lines dump of entries by id")
+    data_import_parser.add_argument("file", help="JSON array or one JSON object per line")
+    data_import_parser.add_argument("--dry-run", action="store_true", help="Only count the changes")
+    data_import_parser.set_defaults(func=data_import)
+
+    query = commands.add_parser("query", help="Search the library like the search bar and print the results")
+    query.add_argument("text", nargs="?", default="", help="Search terms, separated by commas")
+    query.add_argument("--sort", help="Sort option like 'name' or 'By upload date', the default sort of the settings "
+                                      "otherwise")
+    query.add_argument("--reverse", action="store_true", help="Reverse the default direction of the sort")
+    query.add_argument("--group", help="Only search the members of this group")
+    query.add_argument("--show-removed", action="store_true", help="Include removed entries")
+    query.add_argument("--loose", action="store_true", help="Entries only have to match one of the terms")
+    query.add_argument("--multi", action="store_true", help="Rank entries matching more often higher")
+    query.add_argument("--limit", type=int, default=0, help="Print at most this many results, 0 prints all")
+    query.add_argument("--json", action="store_true", help="Print every result as one line of JSON instead of its id")
+    query.set_defaults(func=data_query)
+    return parser
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s [%(name)s] %(message)s', stream=sys.stdout)
+    logging.getLogger('PIL').setLevel(logging.WARNING)
+    args = build_parser().parse_args()
+    args.func(args)
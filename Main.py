@@ -2,24 +2,34 @@ import json
 import logging
 import os
 import sys
+from collections import defaultdict
 from logging.handlers import RotatingFileHandler
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QPalette, QColor
 from PyQt5.QtWidgets import *
 
 from auxillary.BrowserHandling import BrowserHandler
+from auxillary.Catalog import Catalog
 from auxillary.DataAccess import MangaEntry
-from auxillary.JSONMethods import load_json, load_styles, save_json
+from auxillary.DataWatcher import DataWatcher
+from auxillary.GroupIndex import GroupIndex
+from auxillary.JSONMethods import load_json, load_styles, save_json, content_hash
+from auxillary.Recommendations import MinHashRecommender, FEATURE_FIELDS
+from auxillary.SearchEngine import SearchEngine
+from auxillary.SearchIndex import SearchIndex
+from auxillary.SimilarGraph import SimilarGraph
 from auxillary.Thumbnails import ThumbnailManager
 from gui import Options
+from gui.BulkEditor import BulkEditHandler
 from gui.DetailEditor import DetailEditorHandler
 from gui.DetailView import DetailViewHandler
+from gui.Exporter import ExportHandler
 from gui.GroupHandler import GroupHandler
 from gui.MangaList import ListViewHandler
 from gui.Options import OptionsHandler
 from gui.SearchBarHandler import SearchBarHandler
-from gui.WidgetDerivatives import ToastNotification
+from gui.WidgetDerivatives import ToastNotification, ThumbnailStatus, CatalogModel
 
 log_dir = 'logs'
 if not os.path.exists(log_dir):
@@ -34,6 +44,9 @@ logging.basicConfig(level=logging.DEBUG,
 
 class MangaCabinet(QWidget):
     config_path = os.path.join('assets', 'data')
+    entryChanged = pyqtSignal(MangaEntry, object)  # Signal emitted with an edited entry and the set of changed fields
+    entriesChanged = pyqtSignal(object)  # Signal emitted once for a batch of edits with {id: (entry, changed fields)}
+    entriesRemoved = pyqtSignal(object)  # Signal emitted with the set of ids after their entries left the data
 
     def __init__(self):
         super().__init__()
@@ -51,22 +64,45 @@ class MangaCabinet(QWidget):
             key=str.lower
         )
         self.entry_to_index = {}
-        self.all_tags = set()
-        self.all_artists = set()
-        self.all_ids = []
         for idx, entry in enumerate(self.data):
             # Save entry to its index so that sorting works quickly and as expected
             self.entry_to_index[entry.id] = idx
-            self.all_tags.update(entry.tags)
-            self.all_artists.update(entry.artist)
-            self.all_ids.append(entry.id)
-        self.all_tags = sorted(self.all_tags, key=str.lower)
+        # Values of tags, artists and ids in use, the completers follow it through the catalog models
+        self.catalog = Catalog(self.data)
+        self.entryChanged.connect(lambda entry, fields: self.catalog.update(entry))
+        self.tag_model = CatalogModel(self.catalog, "tags", self)
+        self.artist_model = CatalogModel(self.catalog, "artist", self)
+        self.search_index = SearchIndex(self.data)
+        self.entryChanged.connect(lambda entry, fields: self.search_index.update(entry))
+        self.recommender = MinHashRecommender(self.data)
+        self.recommender.start_build()
+        self.entryChanged.connect(self.update_recommendations)
+        self.similar_graph = SimilarGraph(self.data)
+        self.entryChanged.connect(self.update_similar_graph)
+        self.group_index = GroupIndex(self.data, self.entry_to_index)
+        self.entryChanged.connect(self.update_group_index)
+        self.entriesChanged.connect(self.update_indexes)
+        self.entriesRemoved.connect(self.remove_from_indexes)
+        # Fields edited in the app per id, they win over changes other programs make to the data file
+        self.edited_fields = defaultdict(set)
+        self.applying_external = False
+        self.entryChanged.connect(lambda entry, fields: self.track_edits({entry.id: (entry, fields)}))
+        self.entriesChanged.connect(self.track_edits)
         self.details_view = None
         self.styles = load_styles(self.style_path)
         self.settings = Options.load_settings(self.settings_file)
-        self.thumbnail_manager = ThumbnailManager(self.data, self.download_thumbnails, self.tags_to_blur)
+        self.thumbnail_manager = ThumbnailManager(self.data, self.download_thumbnails, self.tags_to_blur,
+                                                  self.thumbnail_download, self.thumbnail_storage)
         self.thumbnail_manager.startEnsuring.emit()
+        # The queries of the search bar, Cli.py query runs the same ones
+        self.search_engine = SearchEngine(self.data, self.entry_to_index, self.group_index, self.similar_graph,
+                                          self.thumbnail_manager.similar_covers)
         self.browser_handler = BrowserHandler(self)
+        self.data_watcher = None
+        if self.watch_data_file:
+            self.data_watcher = DataWatcher(self.data_file, self)
+            self.data_watcher.changesFound.connect(self.apply_external_changes)
+            self.data_watcher.start()
         self.init_ui()
         self.show()
         self.logger.info(f"Successfully initialized with {len(self.data)} entires.")
@@ -88,6 +124,9 @@ class MangaCabinet(QWidget):
             self.default_URL = config["default_url"]
             self.download_thumbnails = config["download_thumbnails"]
             self.tags_to_blur = config.get("tags_to_blur", [])
+            self.thumbnail_download = config.get("thumbnail_download", {})
+            self.thumbnail_storage = config.get("thumbnail_storage", {})
+            self.watch_data_file = config.get("watch_data_file", True)
 
     def init_ui(self):
         self.changeFont()
@@ -104,14 +143,23 @@ class MangaCabinet(QWidget):
         self.options_handler.bindViewChanged.connect(lambda state: self.details_handler.image_view.set_dynamic_show(state))
         # Handles the manga list view
         self.manga_list_handler = ListViewHandler(self)
+        # Applies one change to many entries
+        self.bulk_edit_handler = BulkEditHandler(self)
+        # Writes the current results to a file
+        self.export_handler = ExportHandler(self)
         # Setup initial list once components are in place
         self.search_bar_handler.update_list(False)
 
         # Setup layout (wdiget = single item, layout = group of items)
         self.layout.addLayout(
-            self.search_bar_handler.get_layout(self.group_handler.get_widgets() + [self.options_handler.get_widget()])
+            self.search_bar_handler.get_layout(self.group_handler.get_widgets() +
+                                               [self.bulk_edit_handler.get_widget(), self.export_handler.get_widget(),
+                                                self.options_handler.get_widget()])
         )
         self.layout.addWidget(self.manga_list_handler.get_widget())
+        self.thumbnail_status = ThumbnailStatus(self.thumbnail_manager, self)
+        self.thumbnail_status.setVisible(self.settings.get(Options.thumbnail_status, False))
+        self.layout.addWidget(self.thumbnail_status)
         for widget in self.details_handler.get_widgets():
             self.layout.addWidget(widget)
         self.layout.addLayout(self.details_handler.get_layout())
@@ -128,14 +176,130 @@ class MangaCabinet(QWidget):
     def closeEvent(self, event):
         if self.details_view:
             self.details_view.close()
+        self.thumbnail_manager.shutdown()
         super(MangaCabinet, self).closeEvent(event)
 
     def save_changes(self):
+        self.details_handler.flush_changes()
+        if self.data_watcher:
+            # Our own write isn't an external change
+            self.data_watcher.stop()
         if self.is_data_modified:
             save_json(self.data_file, self.data)
+            # The file holds the edits now, they can't conflict with later external changes anymore
+            self.edited_fields.clear()
             self.logger.info("Saved data.")
         self.logger.info("Terminated.")
 
+    def update_indexes(self, changes):
+        for entry, fields in changes.values():
+            self.search_index.update(entry)
+            self.catalog.update(entry)
+            self.update_recommendations(entry, fields)
+            self.update_similar_graph(entry, fields)
+            self.update_group_index(entry, fields)
+
+    def remove_from_indexes(self, entry_ids):
+        for entry_id in entry_ids:
+            self.search_index.remove(entry_id)
+            self.catalog.remove(entry_id)
+            self.recommender.discard(entry_id)
+            self.similar_graph.remove(entry_id)
+            self.group_index.remove(entry_id)
+        self.thumbnail_manager.remove_entries(entry_ids)
+
+    def track_edits(self, changes):
+        if self.applying_external:
+            return
+        for entry_id, (entry, fields) in changes.items():
+            self.edited_fields[entry_id].update(fields)
+
+    def apply_external_changes(self, records, removed_ids, previous):
+        """
+        Apply entries another program added, changed or removed in the data file. Fields edited in the app keep
+        their values and entries edited in the app aren't removed. previous holds the content hashes the changed
+        entries had in the file before, edits only conflict when the other program changed an edited field as well.
+        """
+        # Edits still waiting in the editor have to be known before deciding what wins
+        self.details_handler.flush_changes()
+        changes, added, conflicts = {}, [], 0
+        for entry_id, record in records.items():
+            if entry_id is None:
+                continue
+            index = self.entry_to_index.get(entry_id)
+            if index is None:
+                entry = MangaEntry(record)
+                added.append(entry)
+                changes[entry_id] = (entry, set(MangaEntry.attribute_names(entry)))
+                continue
+            entry = self.data[index]
+            merged = dict(record)
+            edited_keys = {MangaEntry.ATTRIBUTE_MAP.get(field, (field, None))[0]
+                           for field in self.edited_fields.get(entry_id, ())}
+            conflicts += self.count_conflicts(entry, record, edited_keys, previous.get(entry_id))
+            for key in edited_keys:
+                if key in entry:
+                    merged[key] = entry[key]
+                else:
+                    merged.pop(key, None)
+            keys = {key for key in set(merged) | set(entry) if merged.get(key) != entry.get(key)}
+            if keys:
+                entry.clear()
+                entry.update(merged)
+                changes[entry_id] = (entry, MangaEntry.attribute_names(keys))
+
+        kept = {entry_id for entry_id in removed_ids if entry_id in self.edited_fields}
+        conflicts += len(kept)
+        removed = {entry_id for entry_id in removed_ids if entry_id in self.entry_to_index} - kept
+        if removed:
+            self.data[:] = [entry for entry in self.data if entry.id not in removed]
+        self.data.extend(added)
+        if removed or added:
+            # Updated in place, the indexes and models share the mapping and the list
+            self.entry_to_index.clear()
+            self.entry_to_index.update((entry.id, idx) for idx, entry in enumerate(self.data))
+        self.thumbnail_manager.add_entries(entry for entry, fields in changes.values())
+
+        self.applying_external = True
+        try:
+            if removed:
+                self.entriesRemoved.emit(removed)
+            if changes:
+                self.entriesChanged.emit(changes)
+        finally:
+            self.applying_external = False
+        message = f"Data file changed: {len(added)} added, {len(changes) - len(added)} updated, {len(removed)} removed."
+        if conflicts:
+            message += f" Kept {conflicts} of your edits."
+        self.logger.info(message)
+        self.toast.show_notification(message)
+
+    @staticmethod
+    def count_conflicts(entry, record, edited_keys, previous_hash):
+        """
+        Number of edited keys the other program changed to a value different from the edit. Apart from its edited
+        keys an entry still matches the file it was read from, so if the entry with the incoming values for those
+        keys hashes like the previous file version, none of them were changed there.
+        """
+        differing = [key for key in edited_keys if record.get(key) != entry.get(key)]
+        if not differing or previous_hash is None:
+            return len(differing)
+        unedited = {key: value for key, value in entry.items() if key not in edited_keys}
+        unedited.update((key, record[key]) for key in edited_keys if key in record)
+        return 0 if content_hash(unedited) == previous_hash else len(differing)
+
+    def update_group_index(self, entry, fields):
+        # Any field can change the place of a member in its presorted group
+        self.group_index.update(entry)
+
+    def update_recommendations(self, entry, fields):
+        if fields & set(FEATURE_FIELDS):
+            self.recommender.update(entry)
+
+    def update_similar_graph(self, entry, fields):
+        if "similar" in fields:
+            self.similar_graph.update(entry)
+
     def open_detail_view(self, entry):
         if self.details_view:
             self.details_view.update_data(entry)
@@ -0,0 +1,65 @@
+def add_tag(entry, tag):
+    if tag in entry.tags:
+        return set()
+    entry.tags = entry.tags + [tag]
+    return {"tags"}
+
+
+def remove_tag(entry, tag):
+    if tag not in entry.tags:
+        return set()
+    entry.tags = [existing for existing in entry.tags if existing != tag]
+    return {"tags"}
+
+
+def set_group(entry, group):
+    if entry.group == group:
+        return set()
+    if group:
+        entry.group = group
+    else:
+        del entry.group
+    return {"group"}
+
+
+def set_score(entry, score):
+    if entry.score == score:
+        return set()
+    entry.score = score
+    return {"score"}
+
+
+def set_removed(entry, removed):
+    if entry.removed == removed:
+        return set()
+    entry.removed = removed
+    return {"removed"}
+
+
+# Name shown in the ui and the function applying it to one entry, which returns the fields it changed
+OPERATIONS = {
+    "Add tag": add_tag,
+    "Remove tag": remove_tag,
+    "Set group": set_group,
+    "Set score": set_score,
+    "Set removed": set_removed,
+}
+
+# Entries applied between two progress callbacks
+PROGRESS_STEP = 500
+
+
+def apply_bulk(entries, operation, value, progress=None):
+    """
+    Apply one of the OPERATIONS to every entry and return {id: (entry, changed fields)} of the entries that changed.
+    progress is called with the number of handled entries every PROGRESS_STEP entries, returning False stops early.
+    """
+    func = OPERATIONS[operation]
+    changes = {}
+    for count, entry in enumerate(entries, 1):
+        fields = func(entry, value)
+        if fields:
+            changes[entry.id] = (entry, fields)
+        if progress and count % PROGRESS_STEP == 0 and progress(count) is False:
+            break
+    return changes
@@ -0,0 +1,75 @@
+from collections import Counter
+
+# Fields with a catalog of the values used in the library
+CATALOG_FIELDS = ("tags", "artist", "id")
+
+
+class Catalog:
+    """
+    Reference counted values of the cataloged fields across the library, kept current with every edit.
+    Listeners are called with (field, added values, removed values) when a value is used for the first time or
+    isn't used by any entry anymore.
+    """
+
+    def __init__(self, entries=(), fields=CATALOG_FIELDS):
+        self.fields = fields
+        self.counts = {field: Counter() for field in fields}
+        # Values every entry was counted with, so an edit only has to compare them to the new ones
+        self.entry_values = {}
+        self.listeners = []
+        for entry in entries:
+            self.update(entry)
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    @staticmethod
+    def values_of(entry, field):
+        value = getattr(entry, field)
+        values = value if isinstance(value, list) else [value]
+        return frozenset(value for value in values if value)
+
+    def update(self, entry):
+        old_values = self.entry_values.get(entry.id, {})
+        new_values = {field: self.values_of(entry, field) for field in self.fields}
+        self.entry_values[entry.id] = new_values
+        for field in self.fields:
+            old, new = old_values.get(field, frozenset()), new_values[field]
+            if old != new:
+                self._count(field, new - old, old - new)
+
+    def remove(self, entry_id):
+        old_values = self.entry_values.pop(entry_id, {})
+        for field, values in old_values.items():
+            self._count(field, (), values)
+
+    def _count(self, field, added, removed):
+        counts = self.counts[field]
+        appeared, vanished = [], []
+        for value in added:
+            counts[value] += 1
+            if counts[value] == 1:
+                appeared.append(value)
+        for value in removed:
+            counts[value] -= 1
+            if not counts[value]:
+                del counts[value]
+                vanished.append(value)
+        if appeared or vanished:
+            for listener in self.listeners:
+                listener(field, appeared, vanished)
+
+    def values(self, field):
+        return sorted(self.counts[field], key=sort_key)
+
+    def count(self, field, value):
+        return self.counts[field].get(value, 0)
+
+    def __contains__(self, item):
+        field, value = item
+        return value in self.counts[field]
+
+
+def sort_key(value):
+    # Case-insensitive like the completers, ties are broken so the order is total
+    return value.lower(), value
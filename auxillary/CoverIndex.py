@@ -0,0 +1,117 @@
+import threading
+from functools import lru_cache
+from itertools import combinations
+
+# The 64 bit hashes are split into chunks, covers within a distance d share a chunk within d // CHUNKS
+CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+# int.bit_count only exists from Python 3.10 on
+popcount = getattr(int, "bit_count", None) or (lambda value: bin(value).count("1"))
+
+
+@lru_cache(maxsize=None)
+def flip_masks(radius):
+    """Every chunk sized mask with at most radius set bits."""
+    return tuple(sum(1 << bit for bit in bits) for count in range(radius + 1)
+                 for bits in combinations(range(CHUNK_BITS), count))
+
+
+def chunks(value):
+    return [(value >> (CHUNK_BITS * position)) & CHUNK_MASK for position in range(CHUNKS)]
+
+
+class CoverIndex:
+    """
+    Perceptual hashes of the stored covers by entry id, used to find visually similar covers.
+    Lookups use multi-index hashing: by the pigeonhole principle two hashes within distance d have at least one of
+    their CHUNKS chunks within d // CHUNKS of each other, so only the hashes found by flipping that few bits of each
+    chunk of the query are compared. At the distances used for covers that's a few hundred dictionary lookups
+    instead of comparing every cover, large distances or crowded buckets where it wouldn't save anything fall back to
+    a full scan.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = []
+        self.hashes = []
+        self.positions = {}
+        # Per chunk position the ids of the hashes with that chunk value
+        self.buckets = [{} for _ in range(CHUNKS)]
+
+    def update(self, entry_id, value):
+        with self.lock:
+            position = self.positions.get(entry_id)
+            if position is None:
+                self.positions[entry_id] = len(self.ids)
+                self.ids.append(entry_id)
+                self.hashes.append(value)
+            else:
+                self._unbucket(entry_id, self.hashes[position])
+                self.hashes[position] = value
+            for bucket, chunk in zip(self.buckets, chunks(value)):
+                bucket.setdefault(chunk, set()).add(entry_id)
+
+    def remove(self, entry_id):
+        with self.lock:
+            position = self.positions.pop(entry_id, None)
+            if position is None:
+                return
+            self._unbucket(entry_id, self.hashes[position])
+            # Move the last item into the gap so the lists stay dense
+            last_id, last_hash = self.ids.pop(), self.hashes.pop()
+            if position < len(self.ids):
+                self.ids[position] = last_id
+                self.hashes[position] = last_hash
+                self.positions[last_id] = position
+
+    def _unbucket(self, entry_id, value):
+        for bucket, chunk in zip(self.buckets, chunks(value)):
+            ids = bucket[chunk]
+            ids.discard(entry_id)
+            if not ids:
+                del bucket[chunk]
+
+    def get(self, entry_id):
+        with self.lock:
+            position = self.positions.get(entry_id)
+            return None if position is None else self.hashes[position]
+
+    def similar(self, entry_id, max_distance=10, limit=None):
+        """Return [(id, distance)] of the covers within max_distance of the entry's cover, closest first."""
+        with self.lock:
+            position = self.positions.get(entry_id)
+            if position is None:
+                return []
+            value = self.hashes[position]
+            candidates = self._candidates(value, max_distance)
+            if candidates is None:
+                others = zip(self.ids, self.hashes)
+            else:
+                others = ((key, self.hashes[self.positions[key]]) for key in candidates)
+            matches = [(distance, key) for key, distance in ((key, popcount(value ^ other)) for key, other in others)
+                       if distance <= max_distance and key != entry_id]
+        matches.sort()
+        return [(key, distance) for distance, key in matches[:limit]]
+
+    def _candidates(self, value, max_distance):
+        """Ids sharing a chunk within max_distance // CHUNKS bits of value, None when a full scan is cheaper."""
+        masks = flip_masks(min(max(max_distance, 0) // CHUNKS, CHUNK_BITS))
+        budget = len(self.ids) // 4
+        if len(masks) * CHUNKS > budget:
+            return None
+        candidates = set()
+        for bucket, chunk in zip(self.buckets, chunks(value)):
+            for mask in masks:
+                ids = bucket.get(chunk ^ mask)
+                if ids:
+                    candidates.update(ids)
+            # Near duplicates of a common cover can make the candidates most of the index
+            if len(candidates) > budget:
+                return None
+        return candidates
+
+    def __len__(self):
+        return len(self.ids)
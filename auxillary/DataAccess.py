@@ -40,6 +40,12 @@ class MangaEntry(dict):
         super().__init__(*args, **kwargs)
         self.logger = logging.getLogger(self.__class__.__name__)
 
+    @classmethod
+    def attribute_names(cls, keys):
+        """Map stored json keys to the attribute names they're accessed with, unknown keys stay as they are."""
+        names = {key: attr for attr, (key, _) in cls.ATTRIBUTE_MAP.items()}
+        return {names.get(key, key) for key in keys}
+
     def __getattr__(self, attr):
         # Using a mapping to get the key and default value
         key, default_value = self.ATTRIBUTE_MAP.get(attr, (None, None))
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from auxillary.JSONMethods import iter_json_array, content_hash
+
+# Milliseconds without further writes before a modified file is read, tools often write in several steps
+SETTLE_DELAY = 500
+# Milliseconds until a file that couldn't be parsed, most likely because it's still being written, is read again
+RETRY_DELAY = 2000
+
+
+class DataWatcher(QObject):
+    """
+    Notices when another program rewrites the data file while the app is open. The new file is streamed on a
+    worker thread and compared by id against a snapshot of the last known version, so only added, changed and
+    removed entries are reported instead of the whole library. The snapshot only holds a small content hash per
+    entry, the previous hash of a changed entry is handed on to tell which values the other program changed.
+    """
+    # Signal emitted with {id: record} of added or changed entries, removed ids and {id: content hash} of the
+    # changed entries in the previous version of the file
+    changesFound = pyqtSignal(object, object, object)
+    readFailed = pyqtSignal()
+
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.file_path = file_path
+        # Content hash of every entry of the file as it was last read, only touched by the worker
+        self.snapshot = None
+        self.last_stat = self.file_stat()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DataWatcher")
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(SETTLE_DELAY)
+        self.settle_timer.timeout.connect(self.check)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.readFailed.connect(self.retry)
+        self.paused = False
+
+    def start(self):
+        """Read the snapshot of the current file in the background and start watching it."""
+        if os.path.exists(self.file_path):
+            self.watcher.addPath(self.file_path)
+        self.executor.submit(self.read_baseline)
+
+    def stop(self):
+        """Stop watching, used before the app writes the file itself."""
+        self.paused = True
+        self.settle_timer.stop()
+        if self.watcher.files():
+            self.watcher.removePath(self.file_path)
+        self.executor.shutdown(wait=False)
+
+    def file_stat(self):
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def on_file_changed(self, path):
+        # Files replaced by a rename drop out of the watcher and have to be added again
+        if not self.watcher.files() and os.path.exists(self.file_path):
+            self.watcher.addPath(self.file_path)
+        self.settle_timer.start()
+
+    def check(self):
+        if self.paused:
+            return
+        if not self.watcher.files() and os.path.exists(self.file_path):
+            self.watcher.addPath(self.file_path)
+        stat = self.file_stat()
+        if stat is None or stat == self.last_stat:
+            return
+        self.last_stat = stat
+        self.executor.submit(self.read_changes)
+
+    def retry(self):
+        QTimer.singleShot(RETRY_DELAY, self.check)
+
+    def read_baseline(self):
+        try:
+            self.snapshot = {record.get("id"): content_hash(record) for record in iter_json_array(self.file_path)}
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Couldn't read {self.file_path} to watch it: {e}")
+            self.snapshot = {}
+        self.logger.debug(f"Watching {len(self.snapshot)} entries of {self.file_path}.")
+
+    def read_changes(self):
+        snapshot, changed, previous = {}, {}, {}
+        try:
+            for record in iter_json_array(self.file_path):
+                entry_id = record.get("id")
+                snapshot[entry_id] = content_hash(record)
+                old = self.snapshot.get(entry_id)
+                if old != snapshot[entry_id]:
+                    changed[entry_id] = record
+                    if old is not None:
+                        previous[entry_id] = old
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.info(f"Couldn't read the modified {self.file_path}, trying again later: {e}")
+            self.last_stat = None
+            self.readFailed.emit()
+            return
+        removed = [entry_id for entry_id in self.snapshot if entry_id not in snapshot]
+        self.snapshot = snapshot
+        self.logger.info(f"{self.file_path} was modified: {len(changed)} added or changed, {len(removed)} removed.")
+        if changed or removed:
+            self.changesFound.emit(changed, removed, previous)
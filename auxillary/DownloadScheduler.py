@@ -0,0 +1,338 @@
+import asyncio
+import collections
+import heapq
+import itertools
+import logging
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from auxillary.JSONMethods import load_json, save_json
+
+# Status codes worth retrying, everything else that isn't a 200 is treated as a permanent failure
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Lower runs first, anything the user is looking at jumps ahead of the background backfill
+PRIORITY_SELECTED = 0
+PRIORITY_HOVERED = 1
+PRIORITY_VISIBLE = 2
+PRIORITY_BACKFILL = 3
+
+
+class TokenBucket:
+    """Simple token bucket, every acquire takes one token and tokens refill at rate per second up to capacity."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DownloadQueue:
+    """
+    Persistent queue of pending downloads so an interrupted run continues where it left off.
+    Entries that failed permanently are remembered with their url and only retried once the url changes.
+    """
+    SAVE_INTERVAL = 5.0
+
+    def __init__(self, file_path):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.file_path = file_path
+        state = load_json(file_path, "dict")
+        self.pending = dict.fromkeys(state.get("pending", []))
+        self.failed = state.get("failed", {})
+        self._dirty = False
+        self._last_save = 0.0
+
+    def sync(self, entries):
+        """Build the job list from the given entries, previously pending ones first and known failures skipped."""
+        jobs = {entry.id: entry.thumbnail_url for entry in entries if entry.thumbnail_url}
+        ordered = [key for key in self.pending if key in jobs]
+        ordered += [key for key in jobs if key not in self.pending]
+
+        result = []
+        for key in ordered:
+            if self.failed.get(key) == jobs[key]:
+                continue
+            self.failed.pop(key, None)
+            result.append((key, jobs[key]))
+        self.pending = dict.fromkeys(key for key, _ in result)
+        self._dirty = True
+        self.save(force=True)
+        return result
+
+    def add(self, key):
+        if key not in self.pending:
+            self.pending[key] = None
+            self._mark_dirty()
+
+    def done(self, key):
+        if key in self.pending:
+            del self.pending[key]
+            self._mark_dirty()
+
+    def fail(self, key, url):
+        self.pending.pop(key, None)
+        self.failed[key] = url
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        self._dirty = True
+        self.save()
+
+    def save(self, force=False):
+        if not self._dirty:
+            return
+        now = time.monotonic()
+        if force or now - self._last_save >= self.SAVE_INTERVAL:
+            save_json(self.file_path, {"pending": list(self.pending), "failed": self.failed})
+            self._last_save = now
+            self._dirty = False
+
+
+class JobQueue:
+    """
+    Priority queue of download jobs keyed by id. Queuing a known job again with a better priority promotes it,
+    the outdated heap item is skipped lazily once it's popped.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.jobs = {}
+        self.in_flight = set()
+        # Jobs queued again while they were running, they're put back once the running one is done
+        self.requeued = {}
+        self.counter = itertools.count()
+        self.not_empty = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    def put(self, key, url, headers=None, priority=PRIORITY_BACKFILL, requeue=False):
+        """Queue a job, running jobs are skipped unless requeue asks to run them again once they're done."""
+        if key in self.in_flight:
+            if requeue:
+                self.requeued[key] = (url, headers, priority)
+            return
+        job = self.jobs.get(key)
+        if job:
+            if priority >= job["priority"]:
+                return
+            job["priority"] = priority
+        else:
+            self.jobs[key] = {"url": url, "headers": headers, "priority": priority}
+        heapq.heappush(self.heap, (priority, next(self.counter), key))
+        self.idle.clear()
+        self.not_empty.set()
+
+    async def get(self):
+        while True:
+            while self.heap:
+                priority, _, key = heapq.heappop(self.heap)
+                job = self.jobs.get(key)
+                if job and job["priority"] == priority:
+                    del self.jobs[key]
+                    self.in_flight.add(key)
+                    return key, job
+            self.not_empty.clear()
+            await self.not_empty.wait()
+
+    def task_done(self, key):
+        self.in_flight.discard(key)
+        if key in self.requeued:
+            url, headers, priority = self.requeued.pop(key)
+            self.put(key, url, headers, priority)
+        if not self.jobs and not self.in_flight:
+            self.idle.set()
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+class DownloadMetrics:
+    """Counters of the downloads, snapshot() turns them into a plain dict that can be sent through a Qt signal."""
+    # Seconds of completed downloads the images per second are averaged over
+    RATE_WINDOW = 10.0
+
+    def __init__(self):
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes = 0
+        self.latency_total = 0.0
+        self.responses = 0
+        self.recent = collections.deque()
+        # host -> [requests, errors]
+        self.hosts = {}
+
+    def request(self, url, latency=None, ok=True):
+        stats = self.hosts.setdefault(urlsplit(url).hostname or "", [0, 0])
+        stats[0] += 1
+        if not ok:
+            stats[1] += 1
+        if latency is not None:
+            self.latency_total += latency
+            self.responses += 1
+
+    def finished(self, size=0):
+        self.completed += 1
+        self.bytes += size
+        self.recent.append(time.monotonic())
+
+    def failure(self):
+        self.failed += 1
+
+    def snapshot(self, queued):
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] > self.RATE_WINDOW:
+            self.recent.popleft()
+        return {
+            "queued": queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "latency": self.latency_total / self.responses if self.responses else 0.0,
+            "rate": len(self.recent) / self.RATE_WINDOW,
+            "hosts": {host: {"requests": requests, "errors": errors, "error_rate": errors / requests}
+                      for host, (requests, errors) in self.hosts.items()}
+        }
+
+
+class DownloadScheduler:
+    """
+    Downloads jobs with a fixed pool of workers taking the most urgent job first. In-flight requests are bounded
+    by a semaphore, every host gets its own token bucket and failed requests are retried with exponential backoff.
+    """
+
+    def __init__(self, fetch, on_success, on_failure, concurrency=6, rate_per_host=4.0, burst=8, retries=3,
+                 backoff=1.0, timeout=30.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # fetch(url, headers) is a coroutine returning (status, data, response headers)
+        self.fetch = fetch
+        self.on_success = on_success
+        self.on_failure = on_failure
+        self.concurrency = concurrency
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.buckets = {}
+        self.queue = JobQueue()
+        self.workers = []
+        self.metrics = DownloadMetrics()
+
+    @classmethod
+    def from_config(cls, fetch, on_success, on_failure, config):
+        keys = ("concurrency", "rate_per_host", "burst", "retries", "backoff", "timeout")
+        return cls(fetch, on_success, on_failure, **{key: config[key] for key in keys if key in config})
+
+    def bucket(self, url):
+        host = urlsplit(url).hostname or ""
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+        return self.buckets[host]
+
+    def start(self):
+        """Start the worker pool on the running loop, workers wait for jobs until stop is called."""
+        if not self.workers:
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, key, url, headers=None, priority=PRIORITY_BACKFILL, requeue=False):
+        """
+        Queue a job or promote it if it's already waiting, must be called from the loop's thread.
+        A running job is only downloaded again with requeue, after it's finished.
+        """
+        self.start()
+        self.queue.put(key, url, headers, priority, requeue)
+
+    def snapshot(self):
+        return self.metrics.snapshot(len(self.queue))
+
+    async def join(self):
+        await self.queue.idle.wait()
+
+    async def run(self, jobs):
+        """Process all (key, url) or (key, url, headers) jobs and return once each succeeded or ran out of retries."""
+        for key, url, *headers in jobs:
+            self.submit(key, url, headers[0] if headers else None)
+        await self.join()
+
+    async def _worker(self):
+        while True:
+            key, job = await self.queue.get()
+            try:
+                await self.download(key, job["url"], headers=job["headers"])
+            except Exception as e:
+                # Never let a single job kill the worker
+                self.logger.error(f"Unexpected error while downloading {key}: {e}")
+                self.on_failure(key, job["url"], permanent=False)
+            finally:
+                self.queue.task_done(key)
+
+    async def download(self, key, url, on_success=None, on_failure=None, headers=None):
+        """
+        Download a single job, the callbacks default to the ones of the scheduler.
+        A 304 answer to a conditional request is reported as a success without data.
+        """
+        on_success = on_success or self.on_success
+        on_failure = on_failure or self.on_failure
+        for attempt in range(self.retries + 1):
+            await self.bucket(url).acquire()
+            try:
+                async with self.semaphore:
+                    self.metrics.in_flight += 1
+                    start = time.monotonic()
+                    try:
+                        status, data, response_headers = await asyncio.wait_for(self.fetch(url, headers),
+                                                                                self.timeout)
+                    finally:
+                        self.metrics.in_flight -= 1
+            except (asyncio.TimeoutError, aiohttp.ClientError, OSError) as e:
+                self.metrics.request(url, ok=False)
+                self.logger.debug(f"Attempt {attempt + 1} for {key} failed: {e!r}")
+            else:
+                self.metrics.request(url, time.monotonic() - start, status in (200, 304))
+                if status == 200:
+                    self.metrics.finished(len(data))
+                    on_success(key, url, data, response_headers)
+                    return
+                if status == 304:
+                    self.metrics.finished()
+                    on_success(key, url, None, response_headers)
+                    return
+                if status not in RETRY_STATUSES:
+                    self.logger.error(f"Couldn't download thumbnail of {key}, status: {status}")
+                    self.metrics.failure()
+                    on_failure(key, url, permanent=True)
+                    return
+                self.logger.debug(f"Attempt {attempt + 1} for {key} returned status {status}")
+
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+        self.logger.error(f"Giving up on thumbnail of {key} after {self.retries + 1} attempts")
+        self.metrics.failure()
+        on_failure(key, url, permanent=False)
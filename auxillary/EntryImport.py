@@ -0,0 +1,126 @@
+import json
+import logging
+
+from auxillary.DataAccess import MangaEntry
+from auxillary.JSONMethods import iter_json_array
+
+logger = logging.getLogger(__name__)
+
+# Stored keys only the app writes, imports never overwrite them and new entries start without them
+APP_FIELDS = ("MC_Grouping", "MC_num_opens", "score")
+
+# How a field of an existing entry is merged with the imported value:
+# "import" takes the imported value, "existing" keeps a non-empty current value, "union" appends missing list items
+PRECEDENCES = ("import", "existing", "union")
+DEFAULT_PRECEDENCE = {"default": "import", "fields": {"tags": "union", "similar": "union"}}
+
+# Records read between two progress callbacks
+PROGRESS_STEP = 10000
+
+# Default value of every stored key, it tells the type a value is normalized to
+STORED_DEFAULTS = {key: default for key, default in MangaEntry.ATTRIBUTE_MAP.values()}
+
+
+def storage_key(name):
+    """Stored json key of an attribute name like tags or upload, stored keys stay as they are."""
+    if name in STORED_DEFAULTS:
+        return name
+    return MangaEntry.ATTRIBUTE_MAP.get(name, (name, None))[0]
+
+
+def iter_records(file_path):
+    """
+    Yield the records of a JSON array or JSON Lines file one at a time, whichever the file contains.
+    Lines that aren't valid JSON are logged and skipped, an invalid array raises json.JSONDecodeError.
+    """
+    with open(file_path, 'r') as file:
+        first = ""
+        while not first:
+            chunk = file.read(1)
+            if not chunk:
+                return
+            first = chunk.strip()
+    if first == "[":
+        yield from iter_json_array(file_path)
+        return
+    with open(file_path, 'r') as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping line {number} of {file_path}: {e}")
+
+
+def normalize(record):
+    """
+    Map a record to the stored schema of MangaEntry: attribute names become their stored keys, ids are strings and
+    single values of list fields become lists. Returns None for records without an id.
+    """
+    if not isinstance(record, dict):
+        return None
+    normalized = {}
+    for name, value in record.items():
+        key = storage_key(name)
+        default = STORED_DEFAULTS.get(key)
+        if isinstance(default, list) and isinstance(value, str):
+            value = [value] if value else []
+        elif isinstance(default, int) and not isinstance(default, bool) and isinstance(value, str) and value.isdigit():
+            value = int(value)
+        normalized[key] = value
+    if normalized.get("id") in (None, ""):
+        return None
+    normalized["id"] = str(normalized["id"])
+    return normalized
+
+
+def merge_entry(entry, record, precedence):
+    """Merge a normalized record into an existing entry and return the stored keys that changed."""
+    changed = set()
+    fields = {storage_key(name): rule for name, rule in precedence.get("fields", {}).items()}
+    for key, value in record.items():
+        if key in APP_FIELDS or key == "id":
+            continue
+        rule = fields.get(key, precedence.get("default", "import"))
+        current = entry.get(key)
+        if rule == "existing" and current not in (None, "", [], 0):
+            continue
+        if rule == "union" and isinstance(current, list) and isinstance(value, list):
+            value = current + [item for item in value if item not in current]
+        if current != value:
+            entry[key] = value
+            changed.add(key)
+    return changed
+
+
+def import_entries(data, records, precedence=None, progress=None):
+    """
+    Merge the records into the entries by id, unknown ids are appended to data as new entries.
+    Returns {id: (entry, changed attribute names)} of the entries that changed or were added and the number of
+    skipped records. progress is called with the number of read records every PROGRESS_STEP records.
+    """
+    precedence = precedence or DEFAULT_PRECEDENCE
+    for rule in [precedence.get("default", "import"), *precedence.get("fields", {}).values()]:
+        if rule not in PRECEDENCES:
+            raise ValueError(f"Unknown import precedence {rule!r}, use one of {', '.join(PRECEDENCES)}.")
+    entries = {entry.id: entry for entry in data}
+    changes, skipped = {}, 0
+    for count, record in enumerate(records, 1):
+        record = normalize(record)
+        if record is None:
+            skipped += 1
+        elif record["id"] in entries:
+            entry = entries[record["id"]]
+            keys = merge_entry(entry, record, precedence)
+            if keys:
+                fields = changes[entry.id][1] if entry.id in changes else set()
+                changes[entry.id] = (entry, fields | MangaEntry.attribute_names(keys))
+        else:
+            entry = MangaEntry({key: value for key, value in record.items() if key not in APP_FIELDS})
+            entries[entry.id] = entry
+            data.append(entry)
+            changes[entry.id] = (entry, MangaEntry.attribute_names(entry))
+        if progress and count % PROGRESS_STEP == 0:
+            progress(count)
+    return changes, skipped
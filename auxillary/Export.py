@@ -0,0 +1,63 @@
+import csv
+import json
+import os
+
+from auxillary.DataAccess import MangaEntry
+
+# Format name shown in the ui and its file extension
+EXPORT_FORMATS = {"JSONL": ".jsonl", "CSV": ".csv"}
+# Attribute names exported when no other fields are chosen
+DEFAULT_FIELDS = ("id", "title", "artist", "tags", "score", "group")
+
+# Entries written between two progress callbacks
+PROGRESS_STEP = 500
+
+
+def project(entry, fields):
+    """Values of the chosen attribute names of an entry, missing ones have their default value."""
+    return {field: getattr(entry, field) for field in fields}
+
+
+def csv_value(value):
+    # Lists are joined like the editor shows them
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return "" if value is None else value
+
+
+def export_entries(entries, file_path, fields=DEFAULT_FIELDS, file_format="JSONL", progress=None):
+    """
+    Write the chosen fields of the entries to a JSON Lines or CSV file one entry at a time and return how many
+    were written. progress is called with the number of written entries every PROGRESS_STEP entries, returning
+    False stops the export. The file only appears under its name once it's complete.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r}, use one of {', '.join(EXPORT_FORMATS)}.")
+    unknown = [field for field in fields if field not in MangaEntry.ATTRIBUTE_MAP]
+    if unknown:
+        raise ValueError(f"Unknown fields {', '.join(unknown)}.")
+    part_path = file_path + ".part"
+    count, completed = 0, True
+    try:
+        with open(part_path, 'w', newline='', encoding='utf-8') as file:
+            if file_format == "CSV":
+                writer = csv.writer(file)
+                writer.writerow(fields)
+                write = lambda entry: writer.writerow(csv_value(value) for value in project(entry, fields).values())
+            else:
+                write = lambda entry: file.write(json.dumps(project(entry, fields), ensure_ascii=False) + "\n")
+            for entry in entries:
+                write(entry)
+                count += 1
+                if progress and count % PROGRESS_STEP == 0 and progress(count) is False:
+                    completed = False
+                    break
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    if completed:
+        os.replace(part_path, file_path)
+    else:
+        os.remove(part_path)
+    return count
@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+
+class GroupIndex:
+    """
+    Member ids of every group, so renaming, merging or deleting a group and showing its entries only touch its
+    members instead of testing the MC_Grouping value of every entry in the library.
+    Groups that were shown also keep their members presorted for the active sort, edits move single entries in them.
+    """
+
+    def __init__(self, entries=(), positions=None):
+        self.members = defaultdict(set)
+        self.group_of = {}
+        # Position of every id in the data, ties of the sort keep the data order
+        self.positions = positions if positions is not None else {}
+        self.sort_key = None
+        self.reverse = False
+        self.sorted = {}
+        for entry in entries:
+            self.update(entry)
+
+    def update(self, entry):
+        old_group = self.group_of.get(entry.id)
+        new_group = entry.group
+        if old_group == new_group:
+            if new_group in self.sorted:
+                # The edit may have changed its sort key
+                self._unsort(new_group, entry.id)
+                self._insort(new_group, entry)
+            return
+        self.remove(entry.id)
+        if new_group:
+            self.group_of[entry.id] = new_group
+            self.members[new_group].add(entry.id)
+            if new_group in self.sorted:
+                self._insort(new_group, entry)
+
+    def remove(self, entry_id):
+        group = self.group_of.pop(entry_id, None)
+        if group is None:
+            return
+        members = self.members[group]
+        members.discard(entry_id)
+        if group in self.sorted:
+            self._unsort(group, entry_id)
+        if not members:
+            del self.members[group]
+            self.sorted.pop(group, None)
+
+    def sorted_members(self, group, entries, sort_key, reverse):
+        """
+        Members of the group as entries sorted like the list would sort them, entries maps ids to entries.
+        The order is kept up to date by update() until another sort is asked for.
+        """
+        if (sort_key, reverse) != (self.sort_key, self.reverse):
+            self.sort_key, self.reverse = sort_key, reverse
+            self.sorted.clear()
+        if group not in self.sorted:
+            members = sorted(self.members_of(group), key=lambda entry_id: self.positions.get(entry_id, 0))
+            self.sorted[group] = sorted((entries(entry_id) for entry_id in members), key=sort_key, reverse=reverse)
+        return self.sorted[group]
+
+    def _precedes(self, first, second):
+        first_key, second_key = self.sort_key(first), self.sort_key(second)
+        if first_key != second_key:
+            return (first_key > second_key) == self.reverse
+        return self.positions.get(first.id, 0) < self.positions.get(second.id, 0)
+
+    def _insort(self, group, entry):
+        members = self.sorted[group]
+        low, high = 0, len(members)
+        while low < high:
+            middle = (low + high) // 2
+            if self._precedes(members[middle], entry):
+                low = middle + 1
+            else:
+                high = middle
+        members.insert(low, entry)
+
+    def _unsort(self, group, entry_id):
+        members = self.sorted[group]
+        for position, member in enumerate(members):
+            if member.id == entry_id:
+                del members[position]
+                return
+
+    def members_of(self, group):
+        return self.members.get(group, set())
+
+    def count(self, group):
+        return len(self.members.get(group, ()))
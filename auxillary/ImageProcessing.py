@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageFilter
+
+# Storage formats and the file extension they are written with
+FORMAT_EXTENSIONS = {"PNG": ".png", "WEBP": ".webp", "JPEG": ".jpg"}
+
+# The functions on module level run inside the worker processes, so they must stay picklable and Qt-free
+
+
+def encode_image(img, image_format="PNG", quality=None):
+    image_format = image_format.upper()
+    if image_format == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    elif image_format == "WEBP" and img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    options = {"quality": quality} if quality and image_format != "PNG" else {}
+    output = BytesIO()
+    img.save(output, image_format, **options)
+    return output.getvalue()
+
+
+def dhash(img, size=8):
+    """Difference hash, every bit tells if a pixel of the shrunk grayscale image is brighter than its right neighbour."""
+    pixels = list(img.convert("L").resize((size + 1, size), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            value = value << 1 | (left > pixels[row * (size + 1) + col + 1])
+    return f"{value:016x}"
+
+
+def image_dhash(img_data: bytes):
+    with Image.open(BytesIO(img_data)) as img:
+        return dhash(img)
+
+
+def process_image(img_data: bytes, blur_strength: int = 0, max_size=None, image_format="PNG", quality=None):
+    """Decode the downloaded bytes, optionally shrink and blur them and return the encoded result with its details."""
+    with Image.open(BytesIO(img_data)) as img:
+        img.load()
+        if max_size:
+            img.thumbnail(tuple(max_size))
+        # Taken before blurring, so a blurred variant carries the hash of the cover it was made from
+        perceptual_hash = dhash(img)
+        if blur_strength:
+            img = img.filter(ImageFilter.GaussianBlur(blur_strength))
+        encoded = encode_image(img, image_format, quality)
+        width, height = img.size
+    return {"data": encoded, "width": width, "height": height, "size": len(encoded),
+            "hash": hashlib.sha1(encoded).hexdigest(), "dhash": perceptual_hash}
+
+
+def measure_image(img_data: bytes, image_format="PNG", quality=None):
+    """Return the size of the stored bytes re-encoded as lossless PNG and in the given format."""
+    with Image.open(BytesIO(img_data)) as img:
+        img.load()
+        return len(encode_image(img)), len(encode_image(img, image_format, quality))
+
+
+def verify_image(img_data, expected_hash=None, width=None, height=None):
+    """
+    Return why stored thumbnail bytes are broken or None if they're fine. Comparing the hash is enough when it was
+    taken from bytes that already decoded fine, otherwise the image is decoded and its dimensions are checked.
+    """
+    if not img_data:
+        return "missing"
+    if expected_hash:
+        return None if hashlib.sha1(img_data).hexdigest() == expected_hash else "hash mismatch"
+    try:
+        with Image.open(BytesIO(img_data)) as img:
+            img.load()
+            size = img.size
+    except Exception as e:
+        return f"not decodable: {e}"
+    if not all(size) or (width and height and size != (width, height)):
+        return f"unexpected dimensions {size}"
+    return None
+
+
+class ImageProcessor:
+    """Owns the process pool that decodes, resizes, blurs and encodes thumbnails away from the download loop."""
+
+    def __init__(self, workers=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    def submit(self, func, *args):
+        """Run func in the pool and return a concurrent future with its result."""
+        return self.get_pool().submit(func, *args)
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import logging
 import os
@@ -6,6 +7,11 @@ from auxillary.DataAccess import MangaEntry
 
 logger = logging.getLogger(__name__)
 
+# How close to the end of the buffer a decode error can be for the item to be merely cut off, "-Infinit" fails at "-"
+TRUNCATED_TAIL = 16
+# Characters that can follow the part of a number which already decodes, as in "1.", "1e" or "1e+"
+NUMBER_TAIL = 3
+
 
 def load_json(file_path: str, data_type='list'):
     if os.path.exists(file_path):
@@ -23,6 +29,76 @@ def load_json(file_path: str, data_type='list'):
         return [] if data_type == 'list' else {}
 
 
+def iter_json_array(file_path: str, object_pairs_hook=None, chunk_size=1 << 16):
+    """
+    Yield the items of the JSON array in the file one by one, only about one item is held in memory at a time
+    instead of the whole document. Raises json.JSONDecodeError for invalid or truncated files, as soon as the
+    invalid part is read.
+    """
+    decoder = json.JSONDecoder(object_pairs_hook=object_pairs_hook)
+    with open(file_path, 'r') as file:
+        buffer, pos = "", 0
+
+        def read_more():
+            nonlocal buffer, pos
+            more = file.read(chunk_size)
+            if not more:
+                # Positions into the buffer stay valid at the end of the file
+                return False
+            buffer, pos = buffer[pos:] + more, 0
+            return True
+
+        def next_char():
+            # Skips whitespace, returns None at the end of the file
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not read_more():
+                    return None
+
+        if next_char() != "[":
+            raise json.JSONDecodeError("Expected a JSON array", buffer, pos)
+        pos += 1
+        if next_char() == "]":
+            return
+        while True:
+            if next_char() is None:
+                raise json.JSONDecodeError("Unterminated array", buffer, pos)
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as error:
+                # An item cut off by the end of the chunk fails close to the end or in a string running up to it,
+                # anything else is an error in the file that reading further won't fix
+                truncated = error.pos >= len(buffer) - TRUNCATED_TAIL or error.msg.startswith("Unterminated string")
+                if truncated and read_more():
+                    continue
+                raise
+            if len(buffer) - end < NUMBER_TAIL and read_more():
+                # A number at the end of the chunk may continue in the next one, "1" of "1e+5" decodes on its own
+                continue
+            yield item
+            pos = end
+            separator = next_char()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise json.JSONDecodeError("Expected ',' or ']' after an item", buffer, pos)
+            pos += 1
+
+
+def canonical_json(record) -> str:
+    """Compact json of an entry that doesn't depend on the order of its keys, equal content gives equal text."""
+    return json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def content_hash(record) -> bytes:
+    """Fixed size digest of an entry's content that doesn't depend on the order of its keys."""
+    return hashlib.blake2b(canonical_json(record).encode("utf-8"), digest_size=16).digest()
+
+
 def save_json(file_path: str, input_data):
     with open(file_path, 'w') as file:
         json.dump(input_data, file, indent=4)
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+# Fields whose values make up the feature set of an entry
+FEATURE_FIELDS = ("tags", "artist", "parody")
+
+
+def entry_features(entry):
+    return {f"{field}:{value}".lower() for field in FEATURE_FIELDS for value in getattr(entry, field) or () if value}
+
+
+class MinHashRecommender:
+    """
+    Recommends entries with similar tags, artists and parodies. Every feature gets its own vector of MinHash values
+    once, the signature of an entry is the element-wise minimum over its features. Signatures are split into bands
+    and bucketed for locality-sensitive hashing, so a query only looks at the entries sharing a bucket and ranks
+    them by the estimated Jaccard similarity.
+    Building the index for a large library takes a while, so it runs on a background thread and queries return
+    nothing until it's done.
+    """
+    # Mersenne prime for the universal hash functions, small values keep the Python ints cheap
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, entries=(), num_perm=63, rows=3, seed=1):
+        self.num_perm = num_perm
+        self.rows = rows
+        rng = random.Random(seed)
+        self.coefficients = [(rng.randrange(1, self.PRIME), rng.randrange(self.PRIME)) for _ in range(num_perm)]
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.signatures = {}
+        self.buckets = defaultdict(set)
+        self.feature_vectors = {}
+        self.entries = entries
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        # Entries edited while the index is being built, removed ones map to None
+        self.dirty = {}
+
+    def start_build(self):
+        threading.Thread(target=self.build, name="Recommendations", daemon=True).start()
+
+    def build(self):
+        start = time.perf_counter()
+        # Entries added or removed meanwhile are passed through dirty
+        for entry in list(self.entries):
+            self._index(entry)
+        with self.lock:
+            for entry_id, entry in self.dirty.items():
+                if entry is None:
+                    self.remove(entry_id)
+                else:
+                    self._index(entry)
+            self.dirty.clear()
+            self.ready.set()
+        self.logger.info(f"Indexed {len(self.signatures)} entries in {time.perf_counter() - start:.2f}s.")
+
+    def feature_vector(self, feature):
+        # Tags repeat across the library, so each feature is only hashed once
+        vector = self.feature_vectors.get(feature)
+        if vector is None:
+            value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "little")
+            vector = tuple((a * value + b) % self.PRIME for a, b in self.coefficients)
+            self.feature_vectors[feature] = vector
+        return vector
+
+    def signature(self, features):
+        if not features:
+            return None
+        return tuple(map(min, zip(*(self.feature_vector(feature) for feature in features))))
+
+    def bands(self, signature):
+        # Bucket keys are hashes of the band and its position, a rare collision only adds a candidate
+        return [hash((start, *signature[start:start + self.rows])) for start in range(0, self.num_perm, self.rows)]
+
+    def update(self, entry):
+        """Recompute the signature of an edited entry, only its own buckets are touched."""
+        with self.lock:
+            if not self.ready.is_set():
+                self.dirty[entry.id] = entry
+                return
+            self._index(entry)
+
+    def discard(self, entry_id):
+        """Drop an entry that was removed from the library."""
+        with self.lock:
+            if not self.ready.is_set():
+                self.dirty[entry_id] = None
+                return
+            self.remove(entry_id)
+
+    def _index(self, entry):
+        self.remove(entry.id)
+        signature = self.signature(entry_features(entry))
+        if signature is None:
+            return
+        self.signatures[entry.id] = signature
+        for band in self.bands(signature):
+            self.buckets[band].add(entry.id)
+
+    def remove(self, entry_id):
+        signature = self.signatures.pop(entry_id, None)
+        if signature is None:
+            return
+        for band in self.bands(signature):
+            bucket = self.buckets[band]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self.buckets[band]
+
+    def similarity(self, first, second):
+        return sum(a == b for a, b in zip(first, second)) / self.num_perm
+
+    def recommend(self, entry_id, limit=20, min_similarity=0.2):
+        """Return [(id, estimated jaccard)] of the most similar entries, best first."""
+        if not self.ready.is_set():
+            return []
+        signature = self.signatures.get(entry_id)
+        if signature is None:
+            return []
+        candidates = set()
+        for band in self.bands(signature):
+            candidates.update(self.buckets[band])
+        candidates.discard(entry_id)
+        scored = [(self.similarity(signature, self.signatures[candidate]), candidate) for candidate in candidates]
+        scored = [(score, candidate) for score, candidate in scored if score >= min_similarity]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(candidate, score) for score, candidate in scored[:limit]]
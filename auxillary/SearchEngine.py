@@ -0,0 +1,209 @@
+from collections import defaultdict, namedtuple
+
+from auxillary.DataAccess import MangaEntry
+
+# Keys of the settings that change the results of a search
+show_removed = "show_removed_entries"
+default_sort = "default_sort_option"
+loose_match = "loose_search_matching"
+multi_match = "count_multiple_matches"
+
+# Shorter searches list every entry
+MIN_SEARCH_LENGTH = 3
+
+# Sorted entries of a query, terms is None when everything was listed, filters and sort (key, reverse) were used
+SearchResult = namedtuple("SearchResult", ["entries", "terms", "filters", "sort"])
+
+
+class SearchEngine:
+    """
+    The searches of the search bar without any ui, so the app and the command line tools find the same entries
+    in the same order. Settings are the settings dict of the app, missing keys count as their defaults.
+    """
+
+    def __init__(self, data, entry_to_index, group_index, similar_graph, similar_covers=None):
+        self.data = data
+        self.entry_to_index = entry_to_index
+        self.group_index = group_index
+        self.similar_graph = similar_graph
+        # Returns [(id, distance)] of the covers similar to an id's, None without cover hashes
+        self.cover_lookup = similar_covers
+        # Resolved cover:ID[~distance] and similar:ID~[hops] terms of the current search
+        self.cover_matches = {}
+        self.similar_matches = {}
+        self.sorting_options = [
+            # Name, algorithm, should be reversed by default
+            ("By data order", lambda entry: self.entry_to_index.get(entry.id, 0), False),
+            ("By id", lambda entry: (0, int(entry.id)) if entry.id.isdigit() else (1, entry.id), True),  # number id or UUID
+            ("By upload date", lambda entry: (0 if entry.upload is None else 1, entry.upload_date()), True),
+            ("By name", lambda entry: entry.display_title().lower(), False),
+            ("By artist", lambda entry: entry.first_artist().lower(), False),
+            ("By score", lambda entry: entry.get('score', float('-inf')), True)  # Reversed will show unrated first
+        ]
+
+    def sorting_option(self, name):
+        return next((option for option in self.sorting_options if option[0] == name), self.sorting_options[0])
+
+    def entry_by_id(self, entry_id):
+        return self.data[self.entry_to_index[entry_id]]
+
+    @staticmethod
+    def apply_filters(entry, filters):
+        # Apply all filters; if any filter returns False, the entry is excluded
+        return all(filter_func(entry) for filter_func in filters)
+
+    def query(self, text, sort_name, reverse_order=False, group=None, settings=None):
+        """
+        Run a search like the search bar does and return a SearchResult with all hits, best matches first and each
+        score sorted by the sort option. reverse_order flips its default direction, group limits it to the members.
+        """
+        settings = settings or {}
+        search_terms = [term.strip() for term in text.split(",")]
+
+        # Define sort in case we need it
+        _, sort_key, reverse_default = self.sorting_option(sort_name)
+        reverse_final = reverse_default ^ reverse_order  # XOR
+
+        # Aggregate applicable filters
+        filters = []
+        if not settings.get(show_removed, False):
+            filters.append(lambda e: not e.removed)
+        active_filters = filters + ([lambda e: e.group == group] if group else [])
+        sort = (sort_key, reverse_final)
+
+        if len(text) < MIN_SEARCH_LENGTH:
+            if group:
+                # Groups keep their members presorted, switching to one only costs as much as its size
+                members = self.group_index.sorted_members(group, self.entry_by_id, sort_key, reverse_final)
+                sorted_data = [entry for entry in members if self.apply_filters(entry, filters)]
+            else:
+                mod_data = [entry for entry in self.data if self.apply_filters(entry, filters)] if filters \
+                    else self.data
+                sorted_data = sorted(mod_data, key=lambda x: sort_key(x), reverse=reverse_final)
+            return SearchResult(sorted_data, None, active_filters, sort)
+
+        # A group only needs its members from the group index, in data order like the whole library
+        candidates = self.data
+        if group:
+            candidates = [self.data[index] for index in
+                          sorted(self.entry_to_index[entry_id] for entry_id in self.group_index.members_of(group))]
+
+        # Now filter the data using a single list comprehension
+        if filters:
+            mod_data = [entry for entry in candidates if self.apply_filters(entry, filters)]
+        else:
+            mod_data = candidates
+
+        # Compute scores for all manga entries and sort them based on the score
+        self.cover_matches.clear()
+        self.similar_matches.clear()
+        scored_data = [(entry, self.match_score(entry, search_terms, settings)) for entry in mod_data]
+        grouped_data = defaultdict(list)
+        for entry, score in scored_data:
+            if score != 0:  # prune non-hits early
+                grouped_data[score].append(entry)
+
+        # 2. Sort Each Group by Secondary Key
+        for score, group_entries in grouped_data.items():
+            grouped_data[score] = sorted(group_entries, key=lambda x: sort_key(x), reverse=reverse_final)
+
+        sorted_data = [entry for score in sorted(grouped_data.keys(), reverse=True) for entry in grouped_data[score]]
+        return SearchResult(sorted_data, search_terms, active_filters, sort)
+
+    def match_score(self, data, terms, settings=None):
+        """Compute a score based on the number of matching terms."""
+        settings = settings or {}
+        score = 0
+
+        for term in terms:
+            term_score = 0
+            if term.startswith("cover:"):
+                term_score = 1 if data.id in self.similar_covers(term[len("cover:"):]) else 0
+            elif term.startswith("similar:") and "~" in term:
+                term_score = 1 if data.id in self.linked_entries(term[len("similar:"):]) else 0
+            elif ":" in term:
+                field, value = term.split(":", 1)
+                fields_to_search = MangaEntry.FIELD_ALIASES_AND_GROUPING.get(field, [field])
+
+                for search_field in fields_to_search:
+                    data_value = data.get(search_field, "")
+                    if value and value[0] in [">", "<"]:
+                        term_score += self.compare_match(data_value, value)
+                    else:
+                        term_score += self.count_matches(data_value, value)
+            else:
+                for data_value in data.values():
+                    term_score += self.count_matches(data_value, term)
+
+            if not settings.get(loose_match, False) and term_score == 0:
+                return 0  # If a term did not match any field, we return a score of 0 for the entire entry
+
+            score += term_score
+
+        if not settings.get(multi_match, False) and score > 1:
+            score = 1  # Disable multiple match weighting to preserve proper sort order
+
+        return score
+
+    def similar_covers(self, value):
+        """Ids matching a cover:ID[~distance] term, the entry itself and the ones with visually similar covers."""
+        if value not in self.cover_matches:
+            entry_id, _, distance = value.partition("~")
+            max_distance = int(distance) if distance.isdigit() else None
+            similar = self.cover_lookup(entry_id.strip(), max_distance) if self.cover_lookup else []
+            self.cover_matches[value] = {entry_id.strip()} | {similar_id for similar_id, _ in similar}
+        return self.cover_matches[value]
+
+    def linked_entries(self, value):
+        """
+        Ids matching a similar:ID~hops term, the entries at most hops similar links away from the entry.
+        Without a number of hops every entry transitively linked to it matches.
+        """
+        if value not in self.similar_matches:
+            entry_id, _, hops = value.partition("~")
+            entry_id = entry_id.strip()
+            hops = hops.strip()
+            self.similar_matches[value] = self.similar_graph.neighbors(entry_id, int(hops)) if hops.isdigit() \
+                else self.similar_graph.component(entry_id)
+        return self.similar_matches[value]
+
+    def count_matches(self, value, target):
+        """
+        Count the number of times the target is present in the value or any of its items (if list/dict).
+        """
+        count = 0
+
+        if isinstance(value, (int, float)):
+            if str(value) == target:
+                count += 1
+        elif isinstance(value, list):
+            for item in value:
+                count += self.count_matches(item, target)
+        elif isinstance(value, dict):
+            for item_value in value.values():
+                count += self.count_matches(item_value, target)
+        elif target.lower() in str(value).lower():
+            count += 1
+
+        return count
+
+    @staticmethod
+    def compare_match(data_value, compare_term):
+        """Match > or < for field searches"""
+        operator = compare_term[0]
+        target_value = compare_term[1:]
+
+        if isinstance(data_value, (list, dict)):
+            value = len(data_value)
+        elif isinstance(data_value, (float, int)) or (isinstance(data_value, str) and data_value.isnumeric()):
+            value = int(data_value)
+        else:
+            value = len(str(data_value))
+
+        if target_value and target_value.isnumeric():
+            if operator == '>':
+                return 1 if value > int(target_value) else 0
+            elif operator == '<':
+                return 1 if value < int(target_value) else 0
+
+        return 0
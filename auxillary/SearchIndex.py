@@ -0,0 +1,74 @@
+from array import array
+from collections import defaultdict
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """
+    Trigram index over the id and display title of every entry, finds the entries containing a text without
+    scanning the library. Postings are compact arrays of entry slots, candidates of the rarest trigram are verified.
+    The index is built on the first search so it doesn't slow down startup.
+    """
+    MIN_LENGTH = 3
+
+    def __init__(self, entries=()):
+        self.postings = defaultdict(lambda: array("I"))
+        self.ids = []
+        self.texts = []
+        self.slots = {}
+        self.unindexed = entries
+
+    def build(self):
+        entries, self.unindexed = self.unindexed, None
+        for entry in entries:
+            self.update(entry)
+
+    @staticmethod
+    def entry_text(entry):
+        return f"{entry.id} - {entry.display_title()}".lower()
+
+    def update(self, entry):
+        if self.unindexed is not None:
+            # Picked up with its current values once the index is built
+            return
+        text = self.entry_text(entry)
+        slot = self.slots.get(entry.id)
+        if slot is None:
+            slot = self.slots[entry.id] = len(self.ids)
+            self.ids.append(entry.id)
+            self.texts.append(text)
+        elif self.texts[slot] == text:
+            return
+        else:
+            self._unlink(slot)
+            self.texts[slot] = text
+        for gram in trigrams(text):
+            self.postings[gram].append(slot)
+
+    def remove(self, entry_id):
+        if self.unindexed is not None:
+            self.build()
+        slot = self.slots.pop(entry_id, None)
+        if slot is not None:
+            self._unlink(slot)
+            self.texts[slot] = None
+
+    def _unlink(self, slot):
+        for gram in trigrams(self.texts[slot]):
+            self.postings[gram].remove(slot)
+
+    def search(self, text):
+        """Return the ids of the entries containing text, None if the text is too short to use the index."""
+        if self.unindexed is not None:
+            self.build()
+        text = text.lower()
+        grams = trigrams(text)
+        if len(text) < self.MIN_LENGTH or not grams:
+            return None
+        if any(gram not in self.postings for gram in grams):
+            return set()
+        rarest = min((self.postings[gram] for gram in grams), key=len)
+        return {self.ids[slot] for slot in rarest if text in self.texts[slot]}
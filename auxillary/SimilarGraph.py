@@ -0,0 +1,97 @@
+from collections import defaultdict, deque
+
+
+class SimilarGraph:
+    """
+    Adjacency sets of the similar links between entries, so everything connected to a work can be found without
+    walking the id lists of the library. A link counts in both directions even if only one entry stores it,
+    the stored lists are kept to tell one-sided links apart and to update edges when a single entry changes.
+    """
+
+    def __init__(self, entries=()):
+        self.stored = {}
+        self.adjacency = defaultdict(set)
+        for entry in entries:
+            self.update(entry)
+
+    def update(self, entry):
+        """Apply the current similar list of an entry, only the edges of that entry are touched."""
+        old = self.stored.get(entry.id, set())
+        new = {similar_id for similar_id in entry.similar if similar_id and similar_id != entry.id}
+        if new:
+            self.stored[entry.id] = new
+        else:
+            self.stored.pop(entry.id, None)
+        for similar_id in old - new:
+            # Still linked while the other entry stores the link
+            if entry.id not in self.stored.get(similar_id, ()):
+                self._unlink(entry.id, similar_id)
+        for similar_id in new - old:
+            self.adjacency[entry.id].add(similar_id)
+            self.adjacency[similar_id].add(entry.id)
+
+    def remove(self, entry_id):
+        self.stored.pop(entry_id, None)
+        for similar_id in list(self.adjacency.get(entry_id, ())):
+            self._unlink(entry_id, similar_id)
+
+    def _unlink(self, first, second):
+        for a, b in ((first, second), (second, first)):
+            links = self.adjacency.get(a)
+            if links is not None:
+                links.discard(b)
+                if not links:
+                    del self.adjacency[a]
+
+    def neighbors(self, entry_id, hops=1):
+        """Return {id: hops} of the entries at most hops links away, including the entry itself at 0."""
+        found = {entry_id: 0}
+        queue = deque([entry_id])
+        while queue:
+            current = queue.popleft()
+            distance = found[current]
+            if hops is not None and distance >= hops:
+                continue
+            for similar_id in self.adjacency.get(current, ()):
+                if similar_id not in found:
+                    found[similar_id] = distance + 1
+                    queue.append(similar_id)
+        return found
+
+    def component(self, entry_id):
+        """Every entry transitively linked to the entry, including itself."""
+        return set(self.neighbors(entry_id, None))
+
+    def one_sided(self):
+        """Yield (id, similar_id) for links only stored on the first entry."""
+        for entry_id, similar_ids in self.stored.items():
+            for similar_id in similar_ids:
+                if entry_id not in self.stored.get(similar_id, ()):
+                    yield entry_id, similar_id
+
+
+def repair_links(entries):
+    """
+    Store every one-sided similar link on both entries and drop duplicate links and ones to the entry itself or to
+    ids that don't exist.
+    Returns the changed entries as {id: (entry, added ids, removed ids)}.
+    """
+    by_id = {entry.id: entry for entry in entries}
+    changes = {}
+
+    def change(entry):
+        return changes.setdefault(entry.id, (entry, [], []))
+
+    for entry in entries:
+        # Duplicates are dropped as well
+        valid = list(dict.fromkeys(similar_id for similar_id in entry.similar
+                                   if similar_id in by_id and similar_id != entry.id))
+        if valid != entry.similar:
+            change(entry)[2].extend(similar_id for similar_id in entry.similar if similar_id not in valid)
+            entry.similar = valid
+    graph = SimilarGraph(entries)
+    for entry_id, similar_id in list(graph.one_sided()):
+        entry = by_id[similar_id]
+        entry.similar = entry.similar + [entry_id]
+        change(entry)[1].append(entry_id)
+    return changes
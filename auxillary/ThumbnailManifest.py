@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+ORIGINAL = "original"
+BLUR = "blur"
+
+COLUMNS = ("id", "variant", "path", "url", "etag", "last_modified", "size", "hash", "width", "height", "checked",
+           "accessed", "verified", "dhash")
+# Columns added after the first version of the manifest
+ADDED_COLUMNS = {"accessed": "REAL", "verified": "REAL", "dhash": "TEXT"}
+
+
+def file_hash(file_path):
+    with open(file_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class ThumbnailManifest:
+    """
+    SQLite backed record of every stored thumbnail, so startup doesn't need to scan the thumbnail directory.
+    Rows are keyed by entry id and variant and hold the source url, cache validators, size, hashes and dimensions.
+    """
+
+    def __init__(self, file_path):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.file_path = file_path
+        # Written from the download loop and the processing callbacks, so access is serialized with a lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(file_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS thumbnails (
+                    id TEXT NOT NULL,
+                    variant TEXT NOT NULL DEFAULT 'original',
+                    path TEXT NOT NULL,
+                    url TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER,
+                    hash TEXT,
+                    width INTEGER,
+                    height INTEGER,
+                    checked REAL,
+                    accessed REAL,
+                    verified REAL,
+                    dhash TEXT,
+                    PRIMARY KEY (id, variant)
+                )""")
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(thumbnails)")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE thumbnails ADD COLUMN {column} {column_type}")
+            # Identical covers share one stored file, so references are looked up by path
+            self.conn.execute("CREATE INDEX IF NOT EXISTS thumbnails_path ON thumbnails (path)")
+            # Entries where the user overrode whether tags_to_blur decide about blurring
+            self.conn.execute("CREATE TABLE IF NOT EXISTS blur_overrides (id TEXT PRIMARY KEY, blurred INTEGER NOT NULL)")
+
+    def is_empty(self):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM thumbnails LIMIT 1").fetchone() is None
+
+    def load(self, variant=ORIGINAL):
+        """Return all records of the variant as {id: record}."""
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM thumbnails WHERE variant = ?", (variant,)).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    def variants(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT variant FROM thumbnails")]
+
+    def get(self, entry_id, variant=ORIGINAL):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM thumbnails WHERE id = ? AND variant = ?",
+                                    (entry_id, variant)).fetchone()
+        return dict(row) if row else None
+
+    def upsert(self, record):
+        """Insert or replace a record, missing columns keep the value they had before."""
+        record = dict(record)
+        record.setdefault("variant", ORIGINAL)
+        with self.lock, self.conn:
+            existing = self.conn.execute("SELECT * FROM thumbnails WHERE id = ? AND variant = ?",
+                                         (record["id"], record["variant"])).fetchone()
+            if existing:
+                record = {**dict(existing), **record}
+            else:
+                record.setdefault("checked", time.time())
+            values = [record.get(column) for column in COLUMNS]
+            self.conn.execute(f"INSERT OR REPLACE INTO thumbnails ({', '.join(COLUMNS)}) "
+                              f"VALUES ({', '.join('?' * len(COLUMNS))})", values)
+
+    def insert_many(self, records):
+        records = [{"variant": ORIGINAL, "checked": time.time(), **record} for record in records]
+        with self.lock, self.conn:
+            self.conn.executemany(f"INSERT OR REPLACE INTO thumbnails ({', '.join(COLUMNS)}) "
+                                  f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                                  [[record.get(column) for column in COLUMNS] for record in records])
+
+    def touch(self, entry_id, variant=ORIGINAL):
+        """Mark a record as checked against the server without changing it."""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE thumbnails SET checked = ? WHERE id = ? AND variant = ?",
+                              (time.time(), entry_id, variant))
+
+    def set_accessed(self, accessed):
+        """Store the {id: timestamp} of when covers were last shown, used to evict the least recently viewed."""
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE thumbnails SET accessed = ? WHERE id = ?",
+                                  [(timestamp, entry_id) for entry_id, timestamp in accessed.items()])
+
+    def total_size(self):
+        """Size of all stored files, shared ones are counted once."""
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM thumbnails "
+                                     "WHERE path != '' GROUP BY path)").fetchone()[0]
+
+    def is_referenced(self, path):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM thumbnails WHERE path = ? LIMIT 1", (path,)).fetchone() is not None
+
+    def references(self, path):
+        """Return the (id, variant) pairs stored in the file at path."""
+        with self.lock:
+            return [tuple(row) for row in self.conn.execute("SELECT id, variant FROM thumbnails WHERE path = ?",
+                                                            (path,))]
+
+    def unverified(self, before, limit):
+        """Return up to limit stored files not verified since before, the ones verified longest ago first."""
+        with self.lock:
+            rows = self.conn.execute("SELECT path, MAX(hash) AS hash, MAX(width) AS width, MAX(height) AS height "
+                                     "FROM thumbnails WHERE path != '' GROUP BY path "
+                                     "HAVING MAX(COALESCE(verified, 0)) < ? ORDER BY MAX(COALESCE(verified, 0)) "
+                                     "LIMIT ?", (before, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_verified(self, paths):
+        with self.lock, self.conn:
+            now = time.time()
+            self.conn.executemany("UPDATE thumbnails SET verified = ? WHERE path = ?", [(now, path) for path in paths])
+
+    def remove(self, entry_id, variant=None):
+        with self.lock, self.conn:
+            if variant:
+                self.conn.execute("DELETE FROM thumbnails WHERE id = ? AND variant = ?", (entry_id, variant))
+            else:
+                self.conn.execute("DELETE FROM thumbnails WHERE id = ?", (entry_id,))
+
+    def load_blur_overrides(self):
+        with self.lock:
+            return {row[0]: bool(row[1]) for row in self.conn.execute("SELECT id, blurred FROM blur_overrides")}
+
+    def set_blur_override(self, entry_id, blurred):
+        """Store a manual blur decision, None removes it again."""
+        with self.lock, self.conn:
+            if blurred is None:
+                self.conn.execute("DELETE FROM blur_overrides WHERE id = ?", (entry_id,))
+            else:
+                self.conn.execute("INSERT OR REPLACE INTO blur_overrides (id, blurred) VALUES (?, ?)",
+                                  (entry_id, int(blurred)))
+
+    def import_directory(self, base_path, entries):
+        """One time migration from the old layout of <id>.png files without any manifest."""
+        existing = set(os.listdir(base_path))
+        records = []
+        for entry in entries:
+            file_name = entry.id + ".png"
+            if file_name in existing:
+                file_path = os.path.join(base_path, file_name)
+                records.append({"id": entry.id, "path": file_path, "url": entry.thumbnail_url,
+                                "size": os.path.getsize(file_path), "hash": file_hash(file_path), "checked": 0})
+        self.insert_many(records)
+        self.logger.info(f"Imported {len(records)} existing thumbnails into the manifest.")
+        return len(records)
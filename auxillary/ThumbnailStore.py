@@ -0,0 +1,233 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+
+THUMBNAIL_PATH = os.path.join('assets', 'thumbnails')
+PACK_FILE = "thumbnails.pack"
+PACK_PREFIX = "pack:"
+PACK_MAGIC = b"MCPACK1\n"
+# flag (1 = blob, 0 = deleted), key length, data length
+RECORD_HEADER = struct.Struct("<BHI")
+
+
+class DirectoryStore:
+    """Stores every thumbnail as its own file, the location is the file path."""
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+
+    def write(self, key, data, extension=".png"):
+        file_path = os.path.join(self.base_path, key + extension)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return file_path
+
+    def find(self, key, extension=".png"):
+        file_path = os.path.join(self.base_path, key + extension)
+        return file_path if os.path.exists(file_path) else None
+
+    def read(self, location):
+        try:
+            with open(location, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def size(self, location):
+        try:
+            return os.path.getsize(location)
+        except OSError:
+            return 0
+
+    def remove(self, location):
+        if os.path.exists(location):
+            os.remove(location)
+
+    def owns(self, location):
+        return not location.startswith(PACK_PREFIX)
+
+
+class PackStore:
+    """
+    Append-only pack of thumbnails read through mmap, so showing a cover needs no file open.
+    Every record carries a small header, the offset index is rebuilt from them when the pack is opened.
+    Removing a cover only appends a tombstone, compact() rewrites the pack without dead records.
+    """
+
+    def __init__(self, file_path):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.index = {}
+        self.dead_bytes = 0
+        self.map = None
+        if not os.path.exists(file_path):
+            with open(file_path, "wb") as f:
+                f.write(PACK_MAGIC)
+        self.file = open(file_path, "r+b")
+        self._remap()
+        if self._load_index() < len(self.map):
+            # Drop the truncated record of a crashed write so appends start at a clean boundary
+            self.map.close()
+            self.file.truncate(self.end)
+            self._remap()
+
+    def _remap(self):
+        if self.map is not None:
+            self.map.close()
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _load_index(self):
+        if self.map[:len(PACK_MAGIC)] != PACK_MAGIC:
+            raise ValueError(f"{self.file_path} is not a thumbnail pack")
+        pos, end = len(PACK_MAGIC), len(self.map)
+        while pos + RECORD_HEADER.size <= end:
+            flag, key_len, data_len = RECORD_HEADER.unpack_from(self.map, pos)
+            key_start = pos + RECORD_HEADER.size
+            data_start = key_start + key_len
+            if data_start + data_len > end:
+                # Truncated write from a crash, the partial record is cut off again
+                self.logger.warning(f"Dropping truncated record at {pos} in {self.file_path}")
+                break
+            key = self.map[key_start:data_start].decode("utf-8")
+            if key in self.index:
+                self.dead_bytes += self.index[key][1]
+            if flag:
+                self.index[key] = (data_start, data_len)
+            else:
+                self.index.pop(key, None)
+            pos = data_start + data_len
+        self.end = pos
+        return pos
+
+    def _append(self, flag, key, data):
+        key_bytes = key.encode("utf-8")
+        self.file.seek(self.end)
+        self.file.write(RECORD_HEADER.pack(flag, len(key_bytes), len(data)) + key_bytes + data)
+        self.file.flush()
+        data_start = self.end + RECORD_HEADER.size + len(key_bytes)
+        self.end = data_start + len(data)
+        return data_start
+
+    def write(self, key, data, extension=None):
+        # Records are addressed by key alone, the format is recognized from the data when loading
+        with self.lock:
+            if key in self.index:
+                self.dead_bytes += self.index[key][1]
+            self.index[key] = (self._append(1, key, data), len(data))
+        return PACK_PREFIX + key
+
+    def find(self, key, extension=None):
+        with self.lock:
+            return PACK_PREFIX + key if key in self.index else None
+
+    def size(self, location):
+        with self.lock:
+            return self.index.get(location[len(PACK_PREFIX):], (0, 0))[1]
+
+    def read(self, location):
+        key = location[len(PACK_PREFIX):]
+        with self.lock:
+            if key not in self.index:
+                return None
+            offset, length = self.index[key]
+            if offset + length > len(self.map):
+                self._remap()
+            return self.map[offset:offset + length]
+
+    def remove(self, location):
+        key = location[len(PACK_PREFIX):]
+        with self.lock:
+            if key in self.index:
+                self.dead_bytes += self.index.pop(key)[1]
+                self._append(0, key, b"")
+
+    def owns(self, location):
+        return location.startswith(PACK_PREFIX)
+
+    def compact(self):
+        """Rewrite the pack with only the live records and return the number of bytes reclaimed."""
+        with self.lock:
+            before = self.end
+            temp_path = self.file_path + ".tmp"
+            new_index = {}
+            with open(temp_path, "wb") as f:
+                f.write(PACK_MAGIC)
+                pos = len(PACK_MAGIC)
+                for key, (offset, length) in self.index.items():
+                    key_bytes = key.encode("utf-8")
+                    f.write(RECORD_HEADER.pack(1, len(key_bytes), length) + key_bytes)
+                    f.write(self.map[offset:offset + length])
+                    pos += RECORD_HEADER.size + len(key_bytes)
+                    new_index[key] = (pos, length)
+                    pos += length
+            # The mapping has to be released before the file can be replaced on Windows
+            self.map.close()
+            self.file.close()
+            os.replace(temp_path, self.file_path)
+            self.file = open(self.file_path, "r+b")
+            self.map = None
+            self._remap()
+            self.index = new_index
+            self.end = pos
+            self.dead_bytes = 0
+        self.logger.info(f"Compacted {self.file_path} from {before} to {pos} bytes.")
+        return before - pos
+
+    def close(self):
+        with self.lock:
+            self.map.close()
+            self.file.close()
+
+
+def convert_directory(manifest, pack):
+    """
+    Move every file based thumbnail of the manifest into the pack and delete the original files.
+    Files shared by several records are written once and only deleted after all of them point to the pack.
+    """
+    directory = DirectoryStore(None)
+    # Location to the (id, variant) records stored in it
+    records = {}
+    for variant in manifest.variants():
+        for entry_id, record in manifest.load(variant).items():
+            if directory.owns(record["path"]):
+                records.setdefault(record["path"], []).append((entry_id, variant))
+    converted = 0
+    for location, references in records.items():
+        data = directory.read(location)
+        if data is None:
+            for entry_id, variant in references:
+                manifest.remove(entry_id, variant)
+            continue
+        key = pack.write(os.path.splitext(os.path.basename(location))[0], data)
+        for entry_id, variant in references:
+            manifest.upsert({"id": entry_id, "variant": variant, "path": key})
+        directory.remove(location)
+        converted += 1
+    return converted
+
+
+def deduplicate(manifest, pack=None):
+    """
+    Point every record to one file per content hash and delete the now unused copies.
+    Returns the number of removed files and the bytes freed.
+    """
+    directory = DirectoryStore(None)
+    shared = {}
+    removed = freed = 0
+    for variant in manifest.variants():
+        for entry_id, record in manifest.load(variant).items():
+            if not record["path"] or not record["hash"]:
+                continue
+            location = shared.setdefault(record["hash"], record["path"])
+            if location == record["path"]:
+                continue
+            manifest.upsert({"id": entry_id, "variant": variant, "path": location})
+            if not manifest.is_referenced(record["path"]):
+                store = pack if pack and pack.owns(record["path"]) else directory
+                freed += store.size(record["path"])
+                store.remove(record["path"])
+                removed += 1
+    return removed, freed
@@ -1,40 +1,102 @@
 import logging
 import os
 import asyncio
-import aiohttp
-from io import BytesIO
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
-from PIL import Image, ImageFilter
+import aiohttp
 from PyQt5.QtCore import QObject, pyqtSignal, QThread
 
+from auxillary.CoverIndex import CoverIndex
 from auxillary.DataAccess import MangaEntry
+from auxillary.DownloadScheduler import DownloadQueue, DownloadScheduler, PRIORITY_SELECTED, PRIORITY_HOVERED, \
+    PRIORITY_VISIBLE
+from auxillary.ImageProcessing import ImageProcessor, process_image, verify_image, image_dhash, FORMAT_EXTENSIONS
+from auxillary.ThumbnailManifest import ThumbnailManifest, ORIGINAL, BLUR
+from auxillary.ThumbnailStore import DirectoryStore, PackStore, THUMBNAIL_PATH, PACK_FILE, PACK_PREFIX
+
+
+BUDGET_CHECK_INTERVAL = 10
+# Seconds between metricsUpdated signals while anything changes
+METRICS_INTERVAL = 1.0
+# Share of the budget that eviction frees down to
+BUDGET_TARGET = 0.9
 
 
-def blur_image(input_path: str, output_path: str, blur_strength: int = 10):
-    # Blurs an image from the given input path and saves the result to the specified output path.
-    with Image.open(input_path) as img:
-        blurred = img.filter(ImageFilter.GaussianBlur(blur_strength))
-        blurred.save(output_path)
+def source_info(url, headers):
+    return {"url": url, "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"),
+            "checked": time.time()}
+
+
+def conditional_headers(record):
+    headers = {}
+    if record.get("etag"):
+        headers["If-None-Match"] = record["etag"]
+    if record.get("last_modified"):
+        headers["If-Modified-Since"] = record["last_modified"]
+    return headers
 
 
 class ThumbnailManager(QObject):
-    BATCH_SIZE = 3
-    DELAY = 0.75
+    SELECTED = PRIORITY_SELECTED
+    HOVERED = PRIORITY_HOVERED
+    VISIBLE = PRIORITY_VISIBLE
 
     thumbnailDownloaded = pyqtSignal(MangaEntry, str)  # Signal emitted when a thumbnail is downloaded
+    thumbnailChanged = pyqtSignal(str, str)  # Signal emitted with id and location whenever a stored thumbnail changes
     startEnsuring = pyqtSignal()
+    metricsUpdated = pyqtSignal(dict)  # Signal emitted with the download metrics, see DownloadMetrics.snapshot
 
-    def __init__(self, data, download, tags_to_blur):
+    def __init__(self, data, download, tags_to_blur, download_config=None, storage_config=None):
         super().__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.data = data
         self.download = download
         self.tags_to_blur = tags_to_blur
+        self.download_config = download_config or {}
+        self.storage_config = storage_config or {}
+        self.processor = ImageProcessor(self.storage_config.get("processing_workers"))
+        self.blur_strength = self.storage_config.get("blur_strength", 10)
+        self.image_format = self.storage_config.get("format", "PNG").upper()
+        self.quality = self.storage_config.get("quality")
+        # Disk budget, once exceeded the least recently viewed covers are evicted, 0 means unlimited
+        self.budget = int((self.storage_config.get("budget_mb") or 0) * 1024 * 1024)
+        self.budget_checked = 0
+        self.accessed = {}
+        self.evicted = set()
+        self.pinned = {PRIORITY_SELECTED: set(), PRIORITY_VISIBLE: set()}
+        self.entries = {manga.id: manga for manga in data}
         self.id_to_path = {}
-        self.base_path = os.path.join('assets', 'thumbnails')
+        # Blurred renditions are cached next to the untouched originals and picked when displaying
+        self.blur_paths = {}
+        self.blurring = set()
+        # Perceptual hashes of the originals for finding visually similar covers
+        self.cover_index = CoverIndex()
+        self.base_path = THUMBNAIL_PATH
         if not os.path.exists(self.base_path):
             os.makedirs(self.base_path)
+        self.queue = DownloadQueue(os.path.join(self.base_path, "download_queue.json"))
+        self.manifest = ThumbnailManifest(os.path.join(self.base_path, "manifest.db"))
+        # Covers are written to the pack when it's enabled, but existing ones are read from wherever they live
+        pack_path = os.path.join(self.base_path, PACK_FILE)
+        self.directory_store = DirectoryStore(self.base_path)
+        self.pack_store = None
+        if self.storage_config.get("pack") or os.path.exists(pack_path):
+            self.pack_store = PackStore(pack_path)
+        self.store = self.pack_store if self.storage_config.get("pack") else self.directory_store
+        self.blur_overrides = self.manifest.load_blur_overrides()
+
+        # All network traffic runs on one long-lived event loop so the pooled session can be shared
+        self.session = None
+        self.scheduler = None
+        self.metrics_task = None
+        self.verify_task = None
+        # Cover url to the entries waiting for its download
+        self.pending = {}
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name="ThumbnailLoop", daemon=True)
+        self.loop_thread.start()
 
         self.worker_thread = QThread()
         self.moveToThread(self.worker_thread)
@@ -42,81 +104,469 @@ class ThumbnailManager(QObject):
         self.thumbnailDownloaded.connect(self.log_download)
         self.startEnsuring.connect(self.ensure_all_thumbnails)
 
-    async def ensure_thumbnail(self, manga: MangaEntry):
-        # Ensure the thumbnail for the given manga exists, downloading it if necessary.
-        if manga.thumbnail_url:
-            file_path = self.make_file_path(manga)
-            await self.async_download_thumbnail(manga, file_path)
-
-    async def async_download_thumbnail(self, manga, file_path):
-        # Download the thumbnail image from the given URL and save it to the specified file path.
-        async with aiohttp.ClientSession() as session:
-            async with session.get(manga.thumbnail_url) as response:
-                if response.status == 200:
-                    image_data = await response.read()
-                    self.save_img(image_data, file_path, manga)
-                else:
-                    self.logger.error(f"Couldn't download thumbnail, resp:\n{response}")
-
-    async def batch_ensure_thumbnails(self):
-        # Divide data into batches
-        total_batches = len(self.data) // self.BATCH_SIZE + (len(self.data) % self.BATCH_SIZE != 0)
-        for batch_num in range(total_batches):
-            start_idx = batch_num * self.BATCH_SIZE
-            end_idx = start_idx + self.BATCH_SIZE
-
-            # Create tasks for the current batch
-            tasks = [self.ensure_thumbnail(manga) for manga in self.data[start_idx:end_idx]]
-
-            # Run the tasks for the current batch
-            await asyncio.gather(*tasks)
-
-            # Sleep after each batch, but not after the last batch
-            if batch_num != total_batches - 1:
-                await asyncio.sleep(self.DELAY)
+    def get_session(self):
+        # Created lazily since the session has to be made inside the running loop
+        if self.session is None or self.session.closed:
+            config = self.download_config
+            connector = aiohttp.TCPConnector(limit=config.get("connection_limit", 20),
+                                             limit_per_host=config.get("connection_limit_per_host", 6),
+                                             keepalive_timeout=config.get("keepalive_timeout", 30),
+                                             ttl_dns_cache=300)
+            timeout = aiohttp.ClientTimeout(total=config.get("timeout", 30.0),
+                                            connect=config.get("connect_timeout", 10.0),
+                                            sock_read=config.get("read_timeout", 20.0))
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    def get_scheduler(self):
+        if self.scheduler is None:
+            self.scheduler = DownloadScheduler.from_config(self.fetch, self.on_download, self.on_download_failed,
+                                                           self.download_config)
+            self.metrics_task = asyncio.run_coroutine_threadsafe(self.report_metrics(), self.loop)
+        return self.scheduler
+
+    async def report_metrics(self):
+        last = None
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            snapshot = self.scheduler.snapshot()
+            if snapshot != last:
+                self.metricsUpdated.emit(snapshot)
+                last = snapshot
+
+    async def fetch(self, url, headers=None):
+        async with self.get_session().get(url, headers=headers) as response:
+            return response.status, await response.read(), response.headers
+
+    def wait_for(self, url, manga):
+        """Register the manga for the url and return whether the url still has to be queued."""
+        waiting = self.pending.setdefault(url, [])
+        waiting.append(manga)
+        return len(waiting) == 1
+
+    async def scheduled_download(self, mangas, stale=()):
+        """Download the missing thumbnails and revalidate the stale (manga, record) pairs with conditional requests."""
+        scheduler = self.get_scheduler()
+        # Jobs are keyed by url, entries sharing a cover url wait for the same download
+        for key, url in self.queue.sync(mangas):
+            if self.wait_for(url, self.entries[key]):
+                scheduler.submit(url, url)
+        for manga, record in stale:
+            if self.wait_for(manga.thumbnail_url, manga):
+                scheduler.submit(manga.thumbnail_url, manga.thumbnail_url, conditional_headers(record))
+        self.logger.info(f"Downloading {len(mangas)} missing and revalidating {len(stale)} thumbnails "
+                         f"from {len(self.pending)} urls.")
+        try:
+            await scheduler.join()
+        finally:
+            self.queue.save(force=True)
+        self.logger.info("Finished the thumbnail backfill.")
+
+    def add_entries(self, entries):
+        """Track entries added or changed outside the app, covers missing for their url are downloaded."""
+        missing = []
+        for entry in entries:
+            self.entries[entry.id] = entry
+            if not entry.thumbnail_url:
+                continue
+            record = self.manifest.get(entry.id)
+            if record is None or record["url"] != entry.thumbnail_url:
+                missing.append(entry)
+        if missing and self.download:
+            self.loop.call_soon_threadsafe(self._queue_downloads, missing)
+
+    def _queue_downloads(self, mangas):
+        scheduler = self.get_scheduler()
+        for manga in mangas:
+            self.queue.add(manga.id)
+            if self.wait_for(manga.thumbnail_url, manga):
+                scheduler.submit(manga.thumbnail_url, manga.thumbnail_url)
+
+    def remove_entries(self, entry_ids):
+        # Their stored covers stay until the disk budget evicts them
+        for entry_id in entry_ids:
+            self.entries.pop(entry_id, None)
+
+    def prioritize(self, entries, priority):
+        """
+        Move the queued covers of the given entries ahead of the backfill, safe to call from the GUI thread.
+        Selected and visible covers are pinned so they're never evicted, evicted ones are downloaded again.
+        """
+        if priority in self.pinned:
+            self.pinned[priority] = {entry.id for entry in entries}
+        # The pending downloads, evicted covers and running blurs are only touched on the loop thread
+        self.loop.call_soon_threadsafe(self._promote, list(entries), priority)
+
+    def _promote(self, entries, priority):
+        for entry in entries:
+            url = entry.thumbnail_url
+            if self.download and url and entry.id in self.evicted:
+                self.evicted.discard(entry.id)
+                self.wait_for(url, entry)
+            if url in self.pending:
+                self.get_scheduler().submit(url, url, priority=priority)
+            if self.should_blur(entry.id):
+                self.request_blur(entry.id)
+
+    def on_download(self, key, url, data, headers):
+        mangas = self.pending.pop(key, [])
+        if data is None:
+            # Server copy didn't change since the last check
+            for manga in mangas:
+                self.manifest.touch(manga.id)
+            unstored = [manga for manga in mangas if manga.id not in self.id_to_path]
+            if unstored:
+                # Joined a revalidation while their own cover was evicted, so they need the actual data
+                # The url is still running while this callback runs, so it's queued for after it finished
+                self.pending[url] = unstored
+                self.get_scheduler().submit(url, url, priority=PRIORITY_VISIBLE, requeue=True)
+        else:
+            self.save_img(data, mangas, source_info(url, headers))
+        for manga in mangas:
+            self.queue.done(manga.id)
+
+    def on_download_failed(self, key, url, permanent):
+        for manga in self.pending.pop(key, []):
+            if permanent:
+                self.queue.fail(manga.id, url)
 
     def ensure_all_thumbnails(self):
-        # Preprocess the manga list to filter out those with existing thumbnails
-        existing_thumbnails = set(os.listdir(self.base_path))
-        new_data = []
+        if self.manifest.is_empty():
+            self.manifest.import_directory(self.base_path, self.data)
+        records = self.manifest.load()
+        self.blur_paths = {key: record["path"] for key, record in self.manifest.load(BLUR).items()}
+
+        refresh_days = self.download_config.get("refresh_days", 0)
+        refresh_before = time.time() - refresh_days * 86400 if refresh_days else None
+        missing, stale = [], []
         for manga in self.data:
-            if (manga.id + ".png") not in existing_thumbnails:
-                new_data.append(manga)
-            else:
-                self.id_to_path[manga.id] = os.path.join(self.base_path, manga.id + ".png")
-        self.data = new_data
-
-        if len(self.data) > 0 and self.download:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(self.batch_ensure_thumbnails())
-            loop.close()
+            record = records.get(manga.id)
+            if record and record["path"]:
+                self.id_to_path[manga.id] = record["path"]
+            if record and record["dhash"]:
+                self.cover_index.update(manga.id, int(record["dhash"], 16))
+            if not manga.thumbnail_url:
+                continue
+            if record is None or record["url"] != manga.thumbnail_url:
+                missing.append(manga)
+            elif not record["path"]:
+                # Evicted for the disk budget, downloaded again once it's shown
+                self.evicted.add(manga.id)
+            elif refresh_before and (record["checked"] or 0) < refresh_before:
+                stale.append((manga, record))
         self.data = None
 
-    def download_thumbnail(self, url, file_path, manga):
-        # Download the thumbnail image from the given URL and save it to the specified file path.
+        if (missing or stale) and self.download:
+            asyncio.run_coroutine_threadsafe(self.scheduled_download(missing, stale), self.loop)
+        unblurred = [key for key in self.id_to_path if key not in self.blur_paths and self.should_blur(key)]
+        if unblurred:
+            asyncio.run_coroutine_threadsafe(self.generate_blur_variants(unblurred), self.loop)
+        unhashed = [key for key in self.id_to_path if self.cover_index.get(key) is None]
+        if unhashed:
+            asyncio.run_coroutine_threadsafe(self.generate_hashes(unhashed), self.loop)
+        if self.budget:
+            self.loop.call_soon_threadsafe(self.enforce_budget)
+        if self.storage_config.get("verify", True):
+            self.verify_task = asyncio.run_coroutine_threadsafe(self.verify_thumbnails(), self.loop)
+
+    def download_thumbnail(self, url, manga):
+        # Download the thumbnail through the shared session, thumbnailDownloaded is emitted once it's saved.
+        def on_success(key, url, data, headers):
+            self.save_img(data, [manga], source_info(url, headers))
+
+        def on_failure(key, url, permanent):
+            self.logger.error(f"Couldn't download thumbnail of {manga.id} from {url}")
+
+        asyncio.run_coroutine_threadsafe(self.get_scheduler().download(manga.id, url, on_success, on_failure),
+                                         self.loop)
+
+    def save_img(self, img_data, mangas, source=None):
+        # Decoding and encoding happens in the process pool, the download loop continues right away
+        future = self.processor.submit(process_image, img_data, 0, self.storage_config.get("max_size"),
+                                       self.image_format, self.quality)
+        future.add_done_callback(lambda f: self.processed_later(f, mangas, True, source))
+
+    def processed_later(self, future, *args, **kwargs):
+        # Done callbacks run on the thread of the process pool, the results are stored on the loop thread
+        self.loop.call_soon_threadsafe(lambda: self.on_processed(future, *args, **kwargs))
+
+    def should_blur(self, id):
+        """Decided when displaying, a manual override wins over the configured tags_to_blur."""
+        override = self.blur_overrides.get(id)
+        if override is not None:
+            return override
+        entry = self.entries.get(id)
+        return bool(entry) and any(tag in entry.tags for tag in self.tags_to_blur)
+
+    def toggle_blur(self, manga):
+        blurred = not self.should_blur(manga.id)
+        self.blur_overrides[manga.id] = blurred
+        if blurred == any(tag in manga.tags for tag in self.tags_to_blur):
+            # Back to what the tags decide anyway
+            del self.blur_overrides[manga.id]
+        self.manifest.set_blur_override(manga.id, self.blur_overrides.get(manga.id))
+        self.thumbnailChanged.emit(manga.id, self.id_to_path.get(manga.id, ""))
+        return blurred
+
+    def request_blur(self, id):
+        """Render the blurred variant from the stored original in the process pool, returns the future if started."""
+        entry = self.entries.get(id)
+        if entry is None or id in self.blurring or id in self.blur_paths or id not in self.id_to_path:
+            return None
+        img_data = self.read_location(self.id_to_path[id])
+        if not img_data:
+            return None
+        self.blurring.add(id)
+        future = self.processor.submit(process_image, img_data, self.blur_strength, None, self.image_format,
+                                       self.quality)
+        future.add_done_callback(lambda f: self.processed_later(f, [entry], False, variant=BLUR))
+        return future
+
+    async def generate_blur_variants(self, keys):
+        # Only keep as many renditions queued as there are workers so downloads still get processed quickly
+        limit = asyncio.Semaphore(self.processor.workers)
+
+        async def generate(key):
+            async with limit:
+                future = self.request_blur(key)
+                if future:
+                    await asyncio.wrap_future(future)
+
+        await asyncio.gather(*(generate(key) for key in keys), return_exceptions=True)
+        self.logger.info(f"Generated {len(keys)} blurred thumbnails.")
+
+    def release(self, location):
+        """Delete the stored file once no record refers to it anymore and return the bytes freed."""
+        if not location or self.manifest.is_referenced(location):
+            return 0
+        store = self.store_for(location)
+        size = store.size(location)
+        store.remove(location)
+        return size
+
+    async def generate_hashes(self, keys):
+        """Compute the missing perceptual hashes of covers stored before they were taken while processing."""
+        limit = asyncio.Semaphore(self.processor.workers)
+
+        async def generate(key):
+            async with limit:
+                img_data = self.read_location(self.id_to_path.get(key))
+                if not img_data:
+                    return
+                value = await asyncio.wrap_future(self.processor.submit(image_dhash, bytes(img_data)))
+                self.manifest.upsert({"id": key, "dhash": value})
+                self.cover_index.update(key, int(value, 16))
+
+        await asyncio.gather(*(generate(key) for key in keys), return_exceptions=True)
+        self.logger.info(f"Computed {len(keys)} perceptual cover hashes.")
+
+    def similar_covers(self, id, max_distance=None, limit=None):
+        """Return [(id, distance)] of the entries with visually similar covers, closest first."""
+        if max_distance is None:
+            max_distance = self.storage_config.get("similar_distance", 10)
+        return self.cover_index.similar(id, max_distance, limit)
+
+    def remove_blurred(self, id):
+        location = self.blur_paths.pop(id, None)
+        if location:
+            self.manifest.remove(id, BLUR)
+            self.release(location)
+
+    def on_processed(self, future, mangas, downloaded, source=None, variant=ORIGINAL):
+        for manga in mangas:
+            self.blurring.discard(manga.id)
+        # Entries removed from the library while their cover was processed don't get it stored anymore
+        mangas = [manga for manga in mangas if manga.id in self.entries]
+        if not mangas:
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            self.logger.error(f"Couldn't process thumbnail of {', '.join(manga.id for manga in mangas)}: {e}")
+            return
+        # Stored under the hash of the content, so identical covers share one file
+        data = result.pop("data")
+        extension = FORMAT_EXTENSIONS.get(self.image_format, ".png")
+        location = self.store.find(result["hash"], extension) or self.store.write(result["hash"], data, extension)
+        paths = self.id_to_path if variant == ORIGINAL else self.blur_paths
+        for manga in mangas:
+            previous = paths.get(manga.id)
+            self.manifest.upsert({"id": manga.id, "variant": variant, "path": location, **result, **(source or {})})
+            paths[manga.id] = location
+            if variant == ORIGINAL:
+                self.cover_index.update(manga.id, int(result["dhash"], 16))
+            if previous != location:
+                self.release(previous)
+                if variant == ORIGINAL:
+                    # The blurred rendition belongs to the previous original
+                    self.remove_blurred(manga.id)
+            if variant == ORIGINAL and self.should_blur(manga.id):
+                self.request_blur(manga.id)
+            if downloaded:
+                self.thumbnailDownloaded.emit(manga, location)
+            self.thumbnailChanged.emit(manga.id, location)
+        if self.budget and time.time() - self.budget_checked > BUDGET_CHECK_INTERVAL:
+            self.budget_checked = time.time()
+            self.loop.call_soon_threadsafe(self.enforce_budget)
+
+    async def verify_thumbnails(self):
+        """
+        Low priority scan that checks the stored files in small batches on a thread pool and pauses while downloads
+        are running. Progress is kept in the manifest, so an interrupted scan continues with the files it didn't reach.
+        """
+        batch = self.storage_config.get("verify_batch", 16)
+        delay = self.storage_config.get("verify_delay", 1.0)
+        before = time.time() - self.storage_config.get("verify_days", 30) * 86400
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ThumbnailVerifier")
+        checked = broken = 0
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                self.save_img(response.content, file_path, manga, autoBlur=False)
+            while True:
+                await asyncio.sleep(delay)
+                if self.pending or self.blurring:
+                    continue
+                records = self.manifest.unverified(before, batch)
+                if not records:
+                    break
+                problems = await asyncio.gather(*(self.loop.run_in_executor(pool, self.verify_record, record)
+                                                  for record in records))
+                for record, problem in zip(records, problems):
+                    if problem:
+                        self.quarantine(record["path"], problem)
+                        broken += 1
+                self.manifest.set_verified([record["path"] for record, problem in zip(records, problems)
+                                            if not problem])
+                checked += len(records)
+        finally:
+            pool.shutdown(wait=False)
+        self.logger.info(f"Verified {checked} stored thumbnails, {broken} were broken.")
+
+    def verify_record(self, record):
+        # Only the hashes of thumbnails that went through process_image prove they decode fine
+        expected_hash = record["hash"] if record["width"] else None
+        return verify_image(self.read_location(record["path"]), expected_hash, record["width"], record["height"])
+
+    def quarantine(self, location, problem):
+        """Move a broken file out of the store and download the covers stored in it again."""
+        store = self.store_for(location)
+        data = store.read(location)
+        if data:
+            quarantine_path = os.path.join(self.base_path, "quarantine")
+            os.makedirs(quarantine_path, exist_ok=True)
+            name = location[len(PACK_PREFIX):] if location.startswith(PACK_PREFIX) else os.path.basename(location)
+            with open(os.path.join(quarantine_path, name), "wb") as f:
+                f.write(data)
+        store.remove(location)
+        for id, variant in self.manifest.references(location):
+            self.logger.warning(f"Quarantined broken {variant} thumbnail of {id}: {problem}")
+            self.manifest.remove(id, variant)
+            if variant == BLUR:
+                # Rendered again from the original when it's shown
+                self.blur_paths.pop(id, None)
             else:
-                self.logger.error(f"Couldn't download thumbnail, resp:\n{response}")
-        except requests.RequestException as e:
-            self.logger.error(f"Error occurred while downloading the thumbnail: {e}")
-
-    def save_img(self, img_data, file_path, manga, autoBlur=True):
-        img = Image.open(BytesIO(img_data))
-        if autoBlur and any(tag in manga.tags for tag in self.tags_to_blur):
-            img = img.filter(ImageFilter.GaussianBlur(10))
-        img.save(file_path)
-        self.id_to_path[manga.id] = file_path
-        self.thumbnailDownloaded.emit(manga, file_path)
-
-    def log_download(self, manga, file_path):
+                self.id_to_path.pop(id, None)
+                self.cover_index.remove(id)
+                entry = self.entries.get(id)
+                if self.download and entry and entry.thumbnail_url:
+                    self.queue.add(id)
+                    if self.wait_for(entry.thumbnail_url, entry):
+                        self.get_scheduler().submit(entry.thumbnail_url, entry.thumbnail_url)
+            self.thumbnailChanged.emit(id, "")
+
+    def flush_accessed(self):
+        accessed, self.accessed = self.accessed, {}
+        if accessed:
+            self.manifest.set_accessed(accessed)
+
+    def enforce_budget(self):
+        """Evict unpinned covers, those of removed entries first and then the least recently viewed ones."""
+        self.flush_accessed()
+        used = self.manifest.total_size()
+        if used <= self.budget:
+            return 0
+        pinned = set().union(*self.pinned.values())
+
+        def eviction_order(record):
+            entry = self.entries.get(record["id"])
+            return entry is not None, record["accessed"] or record["checked"] or 0, entry.opens if entry else 0
+
+        records = sorted((record for record in self.manifest.load().values()
+                          if record["path"] and record["id"] not in pinned), key=eviction_order)
+        # Evict a bit below the budget so not every new download triggers another round
+        target = self.budget * BUDGET_TARGET
+        freed = 0
+        evicted = 0
+        for record in records:
+            if used - freed <= target:
+                break
+            freed += self.evict(record["id"])
+            evicted += 1
+        self.logger.info(f"Evicted {evicted} thumbnails ({freed} bytes) to stay within the disk budget.")
+        return freed
+
+    def evict(self, id):
+        """Remove the stored covers of the id and return the bytes freed, files shared with others are kept."""
+        locations = [self.id_to_path.pop(id, None), self.blur_paths.pop(id, None)]
+        self.manifest.remove(id, BLUR)
+        if id in self.entries:
+            # Keep the source and validators so the cover isn't downloaded again on the next start
+            self.manifest.upsert({"id": id, "path": "", "size": 0, "hash": None})
+            self.evicted.add(id)
+        else:
+            self.manifest.remove(id)
+        self.thumbnailChanged.emit(id, "")
+        return sum(self.release(location) for location in locations)
+
+    def log_download(self, manga, location):
         self.logger.debug(f"Downloaded thumbnail of {manga.id} - {manga.display_title()}")
 
-    def get_thumbnail_path(self, id):
-        return self.id_to_path.get(id)
+    def store_for(self, location):
+        if self.pack_store and self.pack_store.owns(location):
+            return self.pack_store
+        return self.directory_store
+
+    def read_location(self, location):
+        if not location:
+            return None
+        return self.store_for(location).read(location)
+
+    def has_thumbnail(self, id):
+        return id in (self.blur_paths if self.should_blur(id) else self.id_to_path)
 
-    def make_file_path(self, manga):
-        return os.path.join(self.base_path, manga.id + ".png")
+    def get_thumbnail_data(self, id):
+        """
+        Return the encoded thumbnail of the id as bytes, read from the mapped pack or the thumbnail file.
+        If it should be blurred but the blurred variant doesn't exist yet, it's requested and None is returned.
+        """
+        if self.should_blur(id):
+            location = self.blur_paths.get(id)
+            if not location:
+                # Running blurs are tracked on the loop thread
+                self.loop.call_soon_threadsafe(self.request_blur, id)
+                return None
+        else:
+            location = self.id_to_path.get(id)
+        if location:
+            self.accessed[id] = time.time()
+        return self.read_location(location)
+
+    async def close_session(self):
+        self.queue.save(force=True)
+        self.flush_accessed()
+        for task in (self.metrics_task, self.verify_task):
+            if task is not None:
+                task.cancel()
+        if self.scheduler is not None:
+            await self.scheduler.stop()
+        if self.session is not None:
+            await self.session.close()
+
+    def shutdown(self):
+        """Close the shared session and stop the download loop, pending downloads resume on the next start."""
+        try:
+            asyncio.run_coroutine_threadsafe(self.close_session(), self.loop).result(timeout=2)
+        except Exception as e:
+            self.logger.warning(f"Couldn't close thumbnail session cleanly: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.processor.shutdown()
+        self.worker_thread.quit()
+        self.worker_thread.wait()
@@ -0,0 +1,102 @@
+"""
+Compares the old fixed batch download loop with the DownloadScheduler against a local stand-in image server,
+once opening a session per image and once with a shared pooled session like ThumbnailManager uses.
+Run from the repository root: python -m benchmarks.thumbnail_throughput [--images 120]
+"""
+import argparse
+import asyncio
+import random
+import time
+from io import BytesIO
+
+import aiohttp
+from aiohttp import web
+from PIL import Image
+
+from auxillary.DownloadScheduler import DownloadScheduler
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new("RGB", (225, 320), (120, 60, 200)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def start_server(port, slow_ratio, latency):
+    image = make_image()
+    rng = random.Random(0)
+
+    async def handle(request):
+        # Mostly quick responses with the occasional straggler, like a real CDN
+        await asyncio.sleep(2.0 if rng.random() < slow_ratio else rng.uniform(0, latency))
+        return web.Response(body=image, content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/img/{name}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def fetch(url, headers=None):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, headers=headers) as response:
+            return response.status, await response.read(), response.headers
+
+
+def shared_fetch(session):
+    async def fetch_with(url, headers=None):
+        async with session.get(url, headers=headers) as response:
+            return response.status, await response.read(), response.headers
+    return fetch_with
+
+
+async def batched(urls, batch_size=3, delay=0.75):
+    # The previous ThumbnailManager.batch_ensure_thumbnails behaviour
+    for start in range(0, len(urls), batch_size):
+        await asyncio.gather(*(fetch(url) for url in urls[start:start + batch_size]))
+        if start + batch_size < len(urls):
+            await asyncio.sleep(delay)
+
+
+async def scheduled(urls, config, fetch_func=fetch):
+    scheduler = DownloadScheduler.from_config(fetch_func, lambda *args: None, lambda *args, **kwargs: None, config)
+    await scheduler.run([(str(i), url) for i, url in enumerate(urls)])
+    await scheduler.stop()
+
+
+async def scheduled_shared(urls, config):
+    connector = aiohttp.TCPConnector(limit_per_host=config["concurrency"], keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await scheduled(urls, config, shared_fetch(session))
+
+
+async def main(args):
+    runner = await start_server(args.port, args.slow_ratio, args.latency)
+    urls = [f"http://127.0.0.1:{args.port}/img/{i}.png" for i in range(args.images)]
+    config = {"concurrency": args.concurrency, "rate_per_host": args.rate, "burst": args.concurrency}
+    try:
+        runs = [("scheduler", lambda: scheduled(urls, config)),
+                ("shared session", lambda: scheduled_shared(urls, config))]
+        if not args.skip_batched:
+            runs.insert(0, ("batched", lambda: batched(urls)))
+        for name, run in runs:
+            start = time.perf_counter()
+            await run()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>14}: {len(urls)} images in {elapsed:.2f}s ({len(urls) / elapsed:.1f} images/s)")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--rate", type=float, default=50.0, help="Requests per second allowed for the host")
+    parser.add_argument("--slow-ratio", type=float, default=0.05, help="Share of requests that take two seconds")
+    parser.add_argument("--latency", type=float, default=0.15, help="Maximum latency of regular requests")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--skip-batched", action="store_true", help="Only compare the session strategies")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+import logging
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QPushButton, QDialog, QVBoxLayout, QLabel, QComboBox, QLineEdit, QSpinBox, \
+    QStackedWidget, QDialogButtonBox, QProgressDialog
+
+from auxillary.BulkEdit import OPERATIONS, apply_bulk, PROGRESS_STEP
+from gui.GroupHandler import fill_groups_box
+from gui.WidgetDerivatives import catalog_completer
+
+
+class BulkEditHandler:
+    """Applies one change to every selected entry or every result of the current search at once."""
+
+    def __init__(self, main_window):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.mw = main_window
+        self.bulk_button = QPushButton("Bulk Edit", self.mw)
+        self.bulk_button.setStyleSheet(self.mw.styles.get("textbutton"))
+        self.bulk_button.clicked.connect(self.show_dialog)
+
+    def get_widget(self):
+        return self.bulk_button
+
+    def show_dialog(self):
+        list_handler = self.mw.manga_list_handler
+        selected = [index.data(Qt.UserRole) for index in list_handler.list_view.selectionModel().selectedIndexes()]
+        # Hits past the search threshold aren't shown but still belong to the results
+        results = self.mw.search_bar_handler.result_entries()
+        dialog = BulkEditDialog(self.mw, selected, results)
+        if dialog.exec_() == QDialog.Accepted:
+            self.apply(dialog.chosen_entries(), dialog.operation(), dialog.value())
+
+    def apply(self, entries, operation, value):
+        # Edits still waiting in the editor would otherwise overwrite the bulk change with the old widget values
+        self.mw.details_handler.flush_changes()
+        progress = None
+        if len(entries) > PROGRESS_STEP:
+            progress = QProgressDialog(f"{operation}...", "Stop", 0, len(entries), self.mw)
+            progress.setWindowModality(Qt.WindowModal)
+            progress.setMinimumDuration(0)
+
+        def report(count):
+            progress.setValue(count)
+            return not progress.wasCanceled()
+
+        changes = apply_bulk(entries, operation, value, report if progress else None)
+        if progress:
+            progress.setValue(len(entries))
+        self.logger.info(f"{operation} {value!r}: changed {len(changes)} of {len(entries)} entries.")
+        if changes:
+            self.mw.is_data_modified = True
+            self.mw.entriesChanged.emit(changes)
+        self.mw.toast.show_notification(f"{operation}: changed {len(changes)} entries.")
+
+
+class BulkEditDialog(QDialog):
+    def __init__(self, mw, selected, results):
+        super().__init__(mw)
+        self.mw = mw
+        self.setWindowTitle("Bulk Edit")
+        self.setStyleSheet("\n".join([self.mw.styles.get("textbutton"), self.mw.styles.get("lineedit"),
+                                      self.mw.styles.get("dropdown"), self.mw.styles.get("spinbox")]))
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("Apply to:"))
+        self.scope_combobox = QComboBox(self)
+        # Ctrl or shift clicking in the list selects several entries
+        if len(selected) > 1:
+            self.scope_combobox.addItem(f"Selected entries ({len(selected)})", selected)
+        self.scope_combobox.addItem(f"All results ({len(results)})", results)
+        layout.addWidget(self.scope_combobox)
+
+        layout.addWidget(QLabel("Change:"))
+        self.operation_combobox = QComboBox(self)
+        self.operation_combobox.addItems(OPERATIONS)
+        layout.addWidget(self.operation_combobox)
+
+        # One value input per operation, in the order of OPERATIONS
+        self.tag_input = QLineEdit(self)
+        completer = catalog_completer(self.mw.tag_model, self)
+        self.tag_input.setCompleter(completer)
+        self.tag_input.setPlaceholderText("Tag")
+        self.remove_tag_input = QLineEdit(self)
+        self.remove_tag_input.setCompleter(completer)
+        self.remove_tag_input.setPlaceholderText("Tag")
+        self.group_combobox = QComboBox(self)
+        fill_groups_box(self.mw.group_handler.groups, self.group_combobox)
+        self.score_input = QSpinBox(self)
+        self.score_input.setRange(0, 5)
+        self.removed_combobox = QComboBox(self)
+        self.removed_combobox.addItem("Removed", True)
+        self.removed_combobox.addItem("Not removed", False)
+
+        self.value_inputs = QStackedWidget(self)
+        for widget in (self.tag_input, self.remove_tag_input, self.group_combobox, self.score_input,
+                       self.removed_combobox):
+            self.value_inputs.addWidget(widget)
+        self.operation_combobox.currentIndexChanged.connect(self.value_inputs.setCurrentIndex)
+        layout.addWidget(self.value_inputs)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.Apply | QDialogButtonBox.Cancel, self)
+        button_box.button(QDialogButtonBox.Apply).clicked.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+    def chosen_entries(self):
+        return self.scope_combobox.currentData()
+
+    def operation(self):
+        return self.operation_combobox.currentText()
+
+    def value(self):
+        widget = self.value_inputs.currentWidget()
+        if isinstance(widget, QLineEdit):
+            return widget.text().strip()
+        if isinstance(widget, QSpinBox):
+            return widget.value()
+        return widget.currentData()
+
+    def accept(self):
+        # Adding or removing an empty tag does nothing
+        if isinstance(self.value_inputs.currentWidget(), QLineEdit) and not self.value():
+            return
+        super().accept()
@@ -2,7 +2,7 @@ import json
 import logging
 import os
 
-from PyQt5.QtCore import Qt, QSize, QStringListModel
+from PyQt5.QtCore import Qt, QSize, QTimer
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QTextEdit, QPushButton, QGridLayout, QLineEdit, QLabel, QComboBox, \
     QHBoxLayout
@@ -10,10 +10,14 @@ from PyQt5.QtWidgets import QTextEdit, QPushButton, QGridLayout, QLineEdit, QLab
 from auxillary.DataAccess import MangaEntry
 from gui.GroupHandler import fill_groups_box
 from gui.Options import bind_dview
-from gui.WidgetDerivatives import CustomTextEdit, IdMatcher, TagsWidget, ImageViewer, RatingWidget, CommaCompleter
+from gui.WidgetDerivatives import CustomTextEdit, IdMatcher, TagsWidget, ImageViewer, RatingWidget, CommaCompleter, \
+    catalog_completer
 
 
 class DetailEditorHandler:
+    # Edits made within this many milliseconds are committed together
+    SAVE_DELAY = 400
+
     def __init__(self, parent):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.cur_data = None
@@ -23,13 +27,22 @@ class DetailEditorHandler:
         self.json_edit_mode = False
         self.current_row = 0
         self.current_col = 0
+        # Fields edited since the last commit, the widgets are only read for these
+        self.pending_fields = set()
 
         self.img_empty_star = os.path.join(self.mw.image_path, 'star_empty.png')
         self.img_star = os.path.join(self.mw.image_path, 'star.png')
 
         self.init_ui()
+        self.mw.entriesChanged.connect(self.on_entries_changed)
+        self.mw.entriesRemoved.connect(self.on_entries_removed)
 
     def init_ui(self):
+        self.save_timer = QTimer(self.mw)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(DetailEditorHandler.SAVE_DELAY)
+        self.save_timer.timeout.connect(self.flush_changes)
+
         # Detail view
         self.detail_view = QTextEdit(self.mw)
         self.detail_view.setPlaceholderText("Select an item to edit it.")
@@ -37,7 +50,7 @@ class DetailEditorHandler:
 
         # Save button
         self.save_button = QPushButton("Save Changes", self.mw)
-        self.save_button.clicked.connect(self.save_changes)
+        self.save_button.clicked.connect(lambda: self.save_changes())
         self.save_button.setStyleSheet(self.mw.styles.get("textbutton"))
         self.save_button.hide()
 
@@ -47,13 +60,13 @@ class DetailEditorHandler:
         self.title_input = QLineEdit(self.mw)
         self.title_input.setStyleSheet(self.mw.styles.get("lineedit"))
         self.title_input.textChanged.connect(lambda: self.title_input.setToolTip(self.title_input.text()))
-        self.title_input.editingFinished.connect(self.save_changes)
+        self.title_input.editingFinished.connect(lambda: self.queue_save("title"))
         self.short_title_input = QLineEdit(self.mw)
         self.short_title_input.setStyleSheet(self.mw.styles.get("lineedit"))
         self.short_title_input.setPlaceholderText("Input shorter title for displaying")
         self.short_title_input.textChanged.connect(
             lambda: self.short_title_input.setToolTip(self.short_title_input.text()))
-        self.short_title_input.editingFinished.connect(self.save_changes)
+        self.short_title_input.editingFinished.connect(lambda: self.queue_save("title_short"))
 
         # Create a new QHBoxLayout for the titles
         titles_layout = QHBoxLayout()
@@ -72,11 +85,11 @@ class DetailEditorHandler:
 
         # Tags Area with QGridLayout
         self.tags_widget = TagsWidget(self.mw)
-        self.tags_widget.saveSignal.connect(self.save_changes)
+        self.tags_widget.saveSignal.connect(lambda: self.queue_save("tags"))
 
         # Similar entry selector
         self.similar_searcher = IdMatcher(self.mw)
-        self.similar_searcher.saveSignal.connect(self.save_changes)
+        self.similar_searcher.saveSignal.connect(lambda: self.queue_save("similar"))
 
         complex_layout = QHBoxLayout()
         complex_layout.addWidget(self.image_view)
@@ -92,7 +105,7 @@ class DetailEditorHandler:
         self.description_input.setMaximumHeight(80)
         self.description_input.setStyleSheet(self.mw.styles.get("textedit"))
         self.description_input.setPlaceholderText("Input description which can be searched")
-        self.description_input.contentEdited.connect(self.save_changes)
+        self.description_input.contentEdited.connect(lambda: self.queue_save("description"))
 
         description_layout = QHBoxLayout()
         description_layout.addWidget(QLabel("Description:"))
@@ -104,7 +117,7 @@ class DetailEditorHandler:
 
         # Score
         self.score_widget = RatingWidget(self.mw)
-        self.score_widget.scoreChanged.connect(lambda: self.save_changes())
+        self.score_widget.scoreChanged.connect(lambda: self.queue_save("score"))
 
         misc_layout.addWidget(QLabel("Score:"), 0)
         misc_layout.addWidget(self.score_widget, 1)
@@ -113,7 +126,7 @@ class DetailEditorHandler:
         self.group_combobox = QComboBox(self.mw)
         fill_groups_box(self.mw.group_handler.groups, self.group_combobox)
         self.group_combobox.setStyleSheet(self.mw.styles.get("dropdown"))
-        self.group_combobox.currentIndexChanged.connect(self.save_changes)
+        self.group_combobox.currentIndexChanged.connect(lambda: self.queue_save("group"))
         self.mw.group_handler.group_modified.connect(lambda: fill_groups_box(self.mw.group_handler.groups, self.group_combobox))
         misc_layout.addWidget(QLabel("Group:"), 0)
         misc_layout.addWidget(self.group_combobox, 1)
@@ -122,15 +135,13 @@ class DetailEditorHandler:
         self.language_input = QLineEdit(self.mw)
         self.language_input.setStyleSheet(self.mw.styles.get("lineedit"))
         self.language_input.setPlaceholderText("Input languages here (csv)")
-        self.language_input.editingFinished.connect(self.save_changes)
+        self.language_input.editingFinished.connect(lambda: self.queue_save("language"))
 
         self.artist_input = QLineEdit(self.mw)
-        completer = CommaCompleter(list(self.mw.all_artists), self.artist_input)
-        completer.setCaseSensitivity(Qt.CaseInsensitive)
-        self.artist_input.setCompleter(completer)
+        self.artist_input.setCompleter(catalog_completer(self.mw.artist_model, self.artist_input, CommaCompleter))
         self.artist_input.setStyleSheet(self.mw.styles.get("lineedit"))
         self.artist_input.setPlaceholderText("Input artists here (csv)")
-        self.artist_input.editingFinished.connect(self.on_artist_editing_finished)
+        self.artist_input.editingFinished.connect(lambda: self.queue_save("artist"))
 
         misc_layout.addWidget(QLabel("Artists:"), 0)
         misc_layout.addWidget(self.artist_input, 1)
@@ -172,8 +183,11 @@ class DetailEditorHandler:
         self.toggle_button.setGeometry(x_position, y_position, button_width, button_height)
 
     def display_detail(self, index, reload=False):
+        # Read the clicked entry first, saving the edits still waiting can move its row
+        new_data = None if reload else index.data(Qt.UserRole)
+        # Edits still waiting belong to the entry shown so far
+        self.flush_changes()
         if not reload:
-            new_data = index.data(Qt.UserRole)
             if self.cur_data == new_data:
                 if self.mw.settings[bind_dview]:
                     self.mw.open_detail_view(self.cur_data)
@@ -184,6 +198,7 @@ class DetailEditorHandler:
 
         if self.mw.settings[bind_dview]:
             self.mw.open_detail_view(self.cur_data)
+        self.mw.thumbnail_manager.prioritize([self.cur_data], self.mw.thumbnail_manager.SELECTED)
 
         if self.json_edit_mode:
             self.detail_view.setText(json.dumps(self.cur_data, indent=4))
@@ -211,7 +226,30 @@ class DetailEditorHandler:
 
             self.image_view.load_image(self.cur_data.id)
 
-    def save_changes(self):
+    def on_entries_changed(self, changes):
+        if self.cur_data and self.cur_data.id in changes:
+            self.display_detail(0, True)  # Index is skipped
+
+    def on_entries_removed(self, entry_ids):
+        if self.cur_data and self.cur_data.id in entry_ids:
+            # Nothing is saved into an entry that isn't part of the library anymore
+            self.save_timer.stop()
+            self.pending_fields.clear()
+            self.cur_data = None
+
+    def queue_save(self, field):
+        """Remember an edited field and commit it together with the other edits of the next moments."""
+        self.pending_fields.add(field)
+        self.save_timer.start()
+
+    def flush_changes(self):
+        self.save_timer.stop()
+        if self.pending_fields:
+            fields, self.pending_fields = self.pending_fields, set()
+            self.save_changes(fields)
+
+    def save_changes(self, fields=None):
+        """Apply the edited fields, or all of them when None, to the current entry as one change."""
         if not self.cur_data:
             return
 
@@ -219,17 +257,18 @@ class DetailEditorHandler:
             contents = self.detail_view.toPlainText()
             if len(contents) > 5:  # saftey to not save bogus
                 modified_data = json.loads(contents, object_pairs_hook=MangaEntry)
+                changed_fields = MangaEntry.attribute_names(
+                    key for key in set(self.cur_data) | set(modified_data)
+                    if self.cur_data.get(key) != modified_data.get(key))
                 self.cur_data.clear()  # Done to update inplace references
                 self.cur_data.update(modified_data)
                 self.logger.debug(f"{self.cur_data.id} was updated with manually")
                 self.mw.is_data_modified = True
-                self.mw.search_bar_handler.update_list()
+                self.mw.entryChanged.emit(self.cur_data, changed_fields)
         else:
-            data_changed = False
+            changed_fields = set()
 
             def update_attribute(attr, new_value):
-                nonlocal data_changed
-
                 old_value = getattr(self.cur_data, attr)
 
                 # Check if old and new values are lists and normalize empty string lists
@@ -240,7 +279,7 @@ class DetailEditorHandler:
                 if old_value != new_value:
                     setattr(self.cur_data, attr, new_value)
                     self.logger.debug(f"{self.cur_data.id}: {attr} was updated with: {new_value}")
-                    data_changed = True
+                    changed_fields.add(attr)
 
             attributes_mapping = {
                 'title': self.title_input.text,
@@ -254,26 +293,30 @@ class DetailEditorHandler:
             }
 
             for attr, func in attributes_mapping.items():
-                update_attribute(attr, func())
+                if fields is None or attr in fields:
+                    update_attribute(attr, func())
 
             # Special case for the group combobox
-            group_value = self.group_combobox.currentData()
-            if not group_value:
-                if self.cur_data.group:
-                    self.logger.debug(f"{self.cur_data.id}: group was updated with: deleted value")
-                    delattr(self.cur_data, 'group')
-                    data_changed = True
-            else:
-                update_attribute('group', group_value)
-
-            if data_changed:
+            if fields is None or "group" in fields:
+                group_value = self.group_combobox.currentData()
+                if not group_value:
+                    if self.cur_data.group:
+                        self.logger.debug(f"{self.cur_data.id}: group was updated with: deleted value")
+                        delattr(self.cur_data, 'group')
+                        changed_fields.add('group')
+                else:
+                    update_attribute('group', group_value)
+
+            if changed_fields:
                 self.mw.is_data_modified = True
-                self.mw.search_bar_handler.update_list()
+                self.mw.entryChanged.emit(self.cur_data, changed_fields)
 
     def save_similar_changes(self):
         """Save id of current data to ids that were added to this entry's similar works."""
         old_ids = self.cur_data.similar
-        ids = self.similar_searcher.selected_items
+        selected = self.similar_searcher.selected_items
+        # Keep the stored order, newly selected ids are appended
+        ids = [id for id in old_ids if id in selected] + sorted(selected.difference(old_ids))
         # Update other entries if they're new
         for id in ids:
             if id not in old_ids:
@@ -284,6 +327,7 @@ class DetailEditorHandler:
                     else:
                         entry.similar = [self.cur_data.id]
                     self.logger.debug(f"{id}: similar was updated with: {self.cur_data.id}")
+                    self.mw.entryChanged.emit(entry, {"similar"})
         # Update old entries that were removed
         for id in old_ids:
             if id not in ids:
@@ -291,21 +335,11 @@ class DetailEditorHandler:
                 if self.cur_data.id in entry.similar:
                     entry.similar.remove(self.cur_data.id)
                     self.logger.debug(f"{id}: similar was updated by removing: {self.cur_data.id}")
+                    self.mw.entryChanged.emit(entry, {"similar"})
         return ids
 
-    def on_artist_editing_finished(self):
-        current_artists = set([artist.strip() for artist in self.artist_input.text().split(",") if artist.strip()])
-        # Find any new artists that aren't in the known list.
-        new_artists = current_artists - self.mw.all_artists
-
-        if new_artists:
-            self.mw.all_artists.update(new_artists)
-            completer_model = QStringListModel(list(self.mw.all_artists))
-            self.artist_input.completer().setModel(completer_model)
-
-        self.save_changes()
-
     def toggle_edit_mode(self):
+        self.flush_changes()
         if not self.json_edit_mode:
             for i in range(self.layout.count()):
                 self.recursively_toggle_visibility(self.layout.itemAt(i), False)
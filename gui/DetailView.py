@@ -3,7 +3,6 @@ import logging
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QPushButton, \
     QApplication
 
-from auxillary import Thumbnails
 from gui.WidgetDerivatives import ImageViewer
 
 
@@ -44,10 +43,15 @@ class DetailViewHandler(QWidget):
         self.download_btn = QPushButton("Download new")
         self.download_btn.setStyleSheet(self.mw.styles.get("textbutton"))
         self.download_btn.clicked.connect(lambda: self.redownload())
+        self.similar_btn = QPushButton("Similar Covers")
+        self.similar_btn.setStyleSheet(self.mw.styles.get("textbutton"))
+        self.similar_btn.setToolTip("Search for entries with visually similar covers.")
+        self.similar_btn.clicked.connect(self.search_similar_covers)
 
         btn_layout = QHBoxLayout()
         btn_layout.addWidget(self.blur_btn)
         btn_layout.addWidget(self.download_btn)
+        btn_layout.addWidget(self.similar_btn)
 
         layout.addWidget(self.image_viewer)
         layout.addWidget(self.title_label)
@@ -65,8 +69,10 @@ class DetailViewHandler(QWidget):
                 self.show()
             return
         self.entry = entry
+        self.thumb.prioritize([self.entry], self.thumb.SELECTED)
 
         self.image_viewer.load_image(self.entry.id)
+        self.blur_btn.setText("Unblur" if self.thumb.should_blur(self.entry.id) else "Blur")
 
         self.id_label.setText(f"Id: {self.entry.id}")
         self.artist_label.setText(f"Artist: {', '.join(self.entry.artist)}")
@@ -88,12 +94,12 @@ class DetailViewHandler(QWidget):
         self.move(desired_position)
 
     def blur(self):
-        img_path = self.thumb.get_thumbnail_path(self.entry.id)
-        if img_path:
-            Thumbnails.blur_image(img_path, img_path, 5)
-            self.image_viewer.load_image(self.entry.id)
-        else:
-            self.logger.warning("Tried to blur the default image.")
+        # Only switches the variant that is shown, the stored original stays untouched
+        blurred = self.thumb.toggle_blur(self.entry)
+        self.blur_btn.setText("Unblur" if blurred else "Blur")
+
+    def search_similar_covers(self):
+        self.mw.search_bar_handler.search_bar.setText(f"cover:{self.entry.id}")
 
     def redownload(self, new_url=None):
         url = self.entry.thumbnail_url
@@ -101,7 +107,7 @@ class DetailViewHandler(QWidget):
             url = new_url
 
         if url:
-            self.thumb.download_thumbnail(url, self.thumb.make_file_path(self.entry), self.entry)
-            self.image_viewer.load_image(self.entry.id)
+            # The image viewer reloads itself once the download finished
+            self.thumb.download_thumbnail(url, self.entry)
         else:
             self.logger.warning("Tried downloading thumbnail without thumbnail_url set.")
\ No newline at end of file
@@ -0,0 +1,147 @@
+import logging
+import os
+import threading
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtWidgets import QPushButton, QDialog, QVBoxLayout, QLabel, QComboBox, QListWidget, QListWidgetItem, \
+    QDialogButtonBox, QFileDialog
+
+from auxillary.DataAccess import MangaEntry
+from auxillary.Export import EXPORT_FORMATS, DEFAULT_FIELDS, export_entries
+
+
+class ExportWorker(QObject):
+    """Writes an export on a background thread and reports back through signals."""
+    progress = pyqtSignal(int)  # Signal emitted with the number of written entries
+    finished = pyqtSignal(int, str)  # Signal emitted with the number of written entries and an error message or ""
+
+    def __init__(self, entries, file_path, fields, file_format):
+        super().__init__()
+        self.entries = entries
+        self.file_path = file_path
+        self.fields = fields
+        self.file_format = file_format
+        self.cancelled = False  # Set from the GUI thread, checked at the next progress report
+        self.stopped = False  # Whether the export was stopped before it was complete
+
+    def start(self):
+        threading.Thread(target=self.run, name="Export", daemon=True).start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, count):
+        # Returning False makes export_entries stop and remove the unfinished file
+        self.progress.emit(count)
+        self.stopped = self.cancelled
+        return not self.cancelled
+
+    def run(self):
+        try:
+            count = export_entries(self.entries, self.file_path, self.fields, self.file_format, self.report)
+        except (OSError, ValueError) as e:
+            self.finished.emit(0, str(e))
+        else:
+            self.finished.emit(count, "")
+
+
+class ExportHandler:
+    """Writes the results of the active search to a JSON Lines or CSV file."""
+
+    def __init__(self, main_window):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.mw = main_window
+        self.worker = None
+        self.fields = list(DEFAULT_FIELDS)
+        self.export_button = QPushButton("Export", self.mw)
+        self.export_button.setStyleSheet(self.mw.styles.get("textbutton"))
+        self.export_button.clicked.connect(self.on_clicked)
+
+    def get_widget(self):
+        return self.export_button
+
+    def on_clicked(self):
+        # While an export runs the button stops it
+        if self.worker:
+            self.worker.cancel()
+            self.export_button.setText("Stopping")
+        else:
+            self.show_dialog()
+
+    def show_dialog(self):
+        entries = self.mw.search_bar_handler.result_entries()
+        dialog = ExportDialog(self.mw, len(entries), self.fields)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        file_format = dialog.file_format()
+        file_path, _ = QFileDialog.getSaveFileName(self.mw, "Export Results", f"results{EXPORT_FORMATS[file_format]}",
+                                                   f"{file_format} (*{EXPORT_FORMATS[file_format]})")
+        if file_path:
+            self.fields = dialog.chosen_fields()
+            self.start(entries, file_path, self.fields, file_format)
+
+    def start(self, entries, file_path, fields, file_format):
+        # The list of results is taken as it is now, later searches don't change what's written
+        worker = self.worker = ExportWorker(entries, file_path, fields, file_format)
+        worker.progress.connect(lambda count: self.show_progress(worker, count / len(entries)))
+        worker.finished.connect(lambda count, error: self.finish(count, error, file_path, worker.stopped))
+        self.export_button.setText("Stop Export")
+        worker.start()
+
+    def show_progress(self, worker, share):
+        if not worker.cancelled:
+            self.export_button.setText(f"Stop Export {share:.0%}")
+
+    def finish(self, count, error, file_path, stopped):
+        self.worker = None
+        self.export_button.setText("Export")
+        if error:
+            self.logger.error(f"Export to {file_path} failed: {error}")
+            self.mw.toast.show_notification(f"Export failed: {error}")
+            return
+        if stopped:
+            self.logger.info(f"Stopped the export to {file_path} after {count} entries.")
+            self.mw.toast.show_notification("Export stopped, nothing was written.")
+            return
+        self.logger.info(f"Exported {count} entries to {file_path}.")
+        self.mw.toast.show_notification(f"Exported {count} entries to {os.path.basename(file_path)}.")
+
+
+class ExportDialog(QDialog):
+    def __init__(self, mw, result_count, fields):
+        super().__init__(mw)
+        self.mw = mw
+        self.result_count = result_count
+        self.setWindowTitle("Export Results")
+        self.setStyleSheet("\n".join([self.mw.styles.get("textbutton"), self.mw.styles.get("dropdown")]))
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"Export the {result_count} results of the current search as:"))
+        self.format_combobox = QComboBox(self)
+        self.format_combobox.addItems(EXPORT_FORMATS)
+        layout.addWidget(self.format_combobox)
+
+        layout.addWidget(QLabel("Fields:"))
+        self.field_list = QListWidget(self)
+        for field in MangaEntry.ATTRIBUTE_MAP:
+            item = QListWidgetItem(field, self.field_list)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if field in fields else Qt.Unchecked)
+        layout.addWidget(self.field_list)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, self)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+    def file_format(self):
+        return self.format_combobox.currentText()
+
+    def chosen_fields(self):
+        return [self.field_list.item(row).text() for row in range(self.field_list.count())
+                if self.field_list.item(row).checkState() == Qt.Checked]
+
+    def accept(self):
+        # An export without fields would only contain empty lines
+        if not self.chosen_fields() or not self.result_count:
+            return
+        super().accept()
@@ -3,36 +3,38 @@ import logging
 from PyQt5.QtCore import pyqtSignal, Qt
 from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QPushButton, QHBoxLayout, QDialog, QVBoxLayout, QLabel, QLineEdit, QColorDialog, \
-    QListWidget, QMenu, QWidget, QDialogButtonBox, QListWidgetItem
+    QListWidget, QMenu, QWidget, QDialogButtonBox, QListWidgetItem, QInputDialog, QMessageBox
 
 from auxillary.JSONMethods import load_json, save_json
 from gui.WidgetDerivatives import RightClickableComboBox, DraggableListWidget
 
 
-def fill_groups_box(groups, combobox):
+def fill_groups_box(groups, combobox, group_index=None):
+    """Fill the box with the groups, with a group index their member counts are shown next to the names."""
     combobox.blockSignals(True)
-    current_text = combobox.currentText()
+    current_group = combobox.currentData()
     combobox.clear()
     combobox.addItem("None")
     for group in groups.keys():
-        combobox.addItem(group, group)
-    index = combobox.findText(current_text)
-    # If the current text is not in the new list and was not "None", unblock signals before resetting to "None"
-    if current_text not in groups and current_text != "None":
-        combobox.blockSignals(False)
-    # Set the index of the previously selected item, defaulting to "None" if not found
+        combobox.addItem(group_label(group, group_index), group)
+    index = combobox.findData(current_group) if current_group else 0
+    # Set the index of the previously selected item, defaulting to "None" if not found. Entries of a removed or
+    # renamed group are updated by GroupHandler, so the box doesn't announce the change as an edit
     combobox.setCurrentIndex(index if index != -1 else 0)
-    # Emit the change to write it, removes the group from current selection however is inconsistent with other groups
-    #combobox.currentIndexChanged.emit(combobox.currentIndex())
-    if combobox.signalsBlocked():
-        combobox.blockSignals(False)
+    combobox.blockSignals(False)
+
+
+def group_label(group, group_index=None):
+    return f"{group} ({group_index.count(group)})" if group_index is not None else group
 
 
 class GroupHandler(QWidget):
     group_modified = pyqtSignal()
+    counts_changed = pyqtSignal()
 
     def __init__(self, mw):
         super().__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
         self.group_list = None
         self.groups = load_json(mw.groups_file)
         self.mw = mw
@@ -40,12 +42,16 @@ class GroupHandler(QWidget):
 
     def init_ui(self):
         self.group_combobox = RightClickableComboBox(self.mw)
-        fill_groups_box(self.groups, self.group_combobox)
+        fill_groups_box(self.groups, self.group_combobox, self.mw.group_index)
         self.group_combobox.setFixedWidth(100)
         self.group_combobox.setStyleSheet(self.mw.styles.get("dropdown"))
         self.group_combobox.currentIndexChanged.connect(lambda: self.mw.search_bar_handler.update_list())
         self.group_combobox.rightClicked.connect(lambda: self.group_combobox.setCurrentIndex(0))
-        self.group_modified.connect(lambda: fill_groups_box(self.groups, self.group_combobox))
+        self.group_modified.connect(lambda: fill_groups_box(self.groups, self.group_combobox, self.mw.group_index))
+        # The group index is updated first, it was connected before
+        self.mw.entryChanged.connect(self.on_entry_changed)
+        self.mw.entriesChanged.connect(lambda changes: self.update_counts())
+        self.mw.entriesRemoved.connect(lambda entry_ids: self.update_counts())
 
         self.manage_groups_btn = QPushButton("Manage Groups", self.mw)
         self.manage_groups_btn.clicked.connect(self.show_group_management_dialog)
@@ -64,6 +70,78 @@ class GroupHandler(QWidget):
         dialog = GroupManagementDialog(self, self.mw, self.groups)
         dialog.exec_()
 
+    def on_entry_changed(self, entry, fields):
+        if "group" in fields:
+            self.update_counts()
+
+    def update_counts(self):
+        for index in range(1, self.group_combobox.count()):
+            group = self.group_combobox.itemData(index)
+            self.group_combobox.setItemText(index, group_label(group, self.mw.group_index))
+        self.counts_changed.emit()
+
+    def reassign_members(self, group, new_group):
+        """Move every member of the group to new_group, None ungroups them, as one batch of changes."""
+        changes = {}
+        for entry_id in list(self.mw.group_index.members_of(group)):
+            entry = self.mw.data[self.mw.entry_to_index[entry_id]]
+            if new_group:
+                entry.group = new_group
+            else:
+                del entry.group
+            changes[entry_id] = (entry, {"group"})
+        if changes:
+            self.mw.is_data_modified = True
+            self.mw.entriesChanged.emit(changes)
+        return len(changes)
+
+    def rename_group(self, old_name, new_name):
+        # Rebuilt in place so the order of the groups and references to the dict stay the same
+        items = [(new_name if name == old_name else name, values) for name, values in self.groups.items()]
+        self.groups.clear()
+        self.groups.update(items)
+        selected = self.finish_group_change(old_name, new_name)
+        moved = self.reassign_members(old_name, new_name)
+        self.refresh_if_needed(selected, moved)
+        self.logger.debug(f"Renamed group {old_name} to {new_name}, {moved} entries moved")
+
+    def merge_groups(self, source, target):
+        del self.groups[source]
+        selected = self.finish_group_change(source, target)
+        moved = self.reassign_members(source, target)
+        self.refresh_if_needed(selected, moved)
+        self.logger.debug(f"Merged group {source} into {target}, {moved} entries moved")
+
+    def delete_group(self, name):
+        """Delete a group and ungroup its members, so no entry keeps the name of a group that doesn't exist."""
+        del self.groups[name]
+        selected = self.finish_group_change(name, None)
+        removed = self.reassign_members(name, None)
+        self.refresh_if_needed(selected, removed)
+        self.logger.debug(f"Removed group {name}, {removed} entries ungrouped")
+
+    def finish_group_change(self, old_name, new_name):
+        """Save the groups and refill the boxes, returns whether the changed group was the selected one."""
+        save_json(self.mw.groups_file, self.groups)
+        selected = self.group_combobox.currentData() == old_name
+        if selected:
+            # Follow a renamed or merged group, without a group all entries are shown
+            self.group_combobox.blockSignals(True)
+            index = self.group_combobox.currentIndex()
+            if new_name and self.group_combobox.findData(new_name) == -1:
+                self.group_combobox.setItemText(index, group_label(new_name, self.mw.group_index))
+                self.group_combobox.setItemData(index, new_name)
+            else:
+                self.group_combobox.setCurrentIndex(max(self.group_combobox.findData(new_name), 0) if new_name else 0)
+            self.group_combobox.blockSignals(False)
+        self.group_modified.emit()
+        return selected
+
+    def refresh_if_needed(self, selected, moved):
+        # Moved entries rebuild the list through entriesChanged already
+        if selected and not moved:
+            self.mw.search_bar_handler.update_list()
+
 
 class GroupManagementDialog(QDialog):
     def __init__(self, parent, mw, groups):
@@ -85,6 +163,7 @@ class GroupManagementDialog(QDialog):
         self.group_list.customContextMenuRequested.connect(self.show_context_menu)
         self.group_list.itemMoved.connect(self.update_groups_order)
         self.parent().group_modified.connect(self.refresh_groups_list)
+        self.parent().counts_changed.connect(self.update_counts)
         layout.addWidget(self.group_list)
 
         self.setLayout(layout)
@@ -92,7 +171,8 @@ class GroupManagementDialog(QDialog):
     def refresh_groups_list(self):
         self.group_list.clear()
         for group in self.groups.items():
-            item = QListWidgetItem(group[0])
+            item = QListWidgetItem(group_label(group[0], self.mw.group_index))
+            item.setData(Qt.UserRole, group[0])
             col = group[1].get('color')
             if col:
                 item.setBackground(QColor(col))
@@ -101,6 +181,11 @@ class GroupManagementDialog(QDialog):
                 item.setToolTip(desc)
             self.group_list.addItem(item)
 
+    def update_counts(self):
+        for row in range(self.group_list.count()):
+            item = self.group_list.item(row)
+            item.setText(group_label(item.data(Qt.UserRole), self.mw.group_index))
+
     def update_groups_order(self, from_index, to_index):
         if from_index == to_index:
             return
@@ -130,12 +215,16 @@ class GroupManagementDialog(QDialog):
         edit_action = menu.addAction("Edit Group")
         edit_action.triggered.connect(self.edit_group)
 
+        merge_action = menu.addAction("Merge Into Group")
+        merge_action.triggered.connect(self.merge_group)
+
         remove_action = menu.addAction("Remove Group")
         remove_action.triggered.connect(self.remove_group)
 
-        # Disable edit and remove actions if no item is selected
+        # Disable edit, merge and remove actions if no item is selected
         selected = self.group_list.selectedItems()
         edit_action.setVisible(bool(selected))
+        merge_action.setVisible(bool(selected) and len(self.groups) > 1)
         remove_action.setVisible(bool(selected))
 
         menu.exec_(self.group_list.viewport().mapToGlobal(position))
@@ -146,16 +235,30 @@ class GroupManagementDialog(QDialog):
     def remove_group(self):
         selected_items = self.group_list.selectedItems()
         if selected_items:
-            group_name = selected_items[0].text()
-            del self.groups[group_name]
-            save_json(self.mw.groups_file, self.groups)
-            self.logger.debug("Removed Group")
-            self.parent().group_modified.emit()
+            group_name = selected_items[0].data(Qt.UserRole)
+            members = self.mw.group_index.count(group_name)
+            if members:
+                answer = QMessageBox.question(self, "Remove Group", f"Remove {group_name}? Its {members} entries "
+                                              f"will be ungrouped.", QMessageBox.Yes | QMessageBox.Cancel,
+                                              QMessageBox.Cancel)
+                if answer != QMessageBox.Yes:
+                    return
+            self.parent().delete_group(group_name)
+
+    def merge_group(self):
+        selected_items = self.group_list.selectedItems()
+        if selected_items:
+            group_name = selected_items[0].data(Qt.UserRole)
+            targets = [name for name in self.groups if name != group_name]
+            target, ok = QInputDialog.getItem(self, "Merge Group", f"Move the entries of {group_name} to:",
+                                              targets, 0, False)
+            if ok and target:
+                self.parent().merge_groups(group_name, target)
 
     def edit_group(self):
         selected_items = self.group_list.selectedItems()
         if selected_items:
-            group_name = selected_items[0].text()
+            group_name = selected_items[0].data(Qt.UserRole)
             self.manage_group(group_name)
 
     def manage_group(self, group_name=None):
@@ -166,7 +269,6 @@ class GroupManagementDialog(QDialog):
         name_label = QLabel("Group Name:", dialog)
         name_input = QLineEdit(dialog)
         name_input.setText(group_name if group_name else "")
-        name_input.setReadOnly(bool(group_name))  # Group name is not editable if editing
         name_input.setStyleSheet(self.mw.styles.get("lineedit"))
         layout.addWidget(name_label)
         layout.addWidget(name_input)
@@ -216,7 +318,20 @@ class GroupManagementDialog(QDialog):
 
         result = dialog.exec_()
         if result == QDialog.Accepted:
-            group_name = group_name or name_input.text()
+            new_name = name_input.text().strip()
+            if group_name and new_name and new_name != group_name:
+                if new_name not in self.groups:
+                    self.parent().rename_group(group_name, new_name)
+                elif QMessageBox.question(self, "Merge Groups", f"{new_name} already exists, move the entries of "
+                                          f"{group_name} to it?") == QMessageBox.Yes:
+                    self.parent().merge_groups(group_name, new_name)
+                    return
+                else:
+                    return
+                group_name = new_name
+            group_name = group_name or new_name
+            if not group_name:
+                return
             group_desc = desc_input.text()
             isNew = group_name not in self.groups
             if isNew:
@@ -4,8 +4,8 @@ import os
 import typing
 
 from PyQt5 import QtCore
-from PyQt5.QtCore import Qt, QRect, QSize, QRectF, QPoint
-from PyQt5.QtGui import QColor, QPen, QFontMetrics, QPainterPath, QStandardItemModel, QStandardItem, QPixmap
+from PyQt5.QtCore import Qt, QRect, QSize, QRectF, QPoint, QTimer, QModelIndex, QItemSelectionModel
+from PyQt5.QtGui import QColor, QPen, QFontMetrics, QPainterPath, QStandardItemModel, QStandardItem, QPixmap, QCursor
 from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QListView, QAbstractItemView, QWidget, QVBoxLayout, \
     QLabel, QGraphicsDropShadowEffect
 
@@ -21,6 +21,10 @@ class ListViewHandler:
         self.list_view = None
         self.mw = parent
         self.selection_history = {'back': [], 'forward': []}
+        # Ids in the order of the model rows and the row of every id, so a single entry can be found and moved
+        # without a full rebuild
+        self.row_ids = []
+        self.id_rows = {}
         self.current_id = None
         self.init_ui()
 
@@ -29,19 +33,22 @@ class ListViewHandler:
         self.list_view = SpecialListView(self.mw)
         self.list_model = QStandardItemModel(self.list_view)
         self.list_view.setModel(self.list_model)
+        self.list_model.modelReset.connect(self.list_view.schedule_visible_update)
+        self.list_model.rowsInserted.connect(self.list_view.schedule_visible_update)
 
         self.list_view.setWrapping(True)
         self.list_view.setFlow(QListView.LeftToRight)
         self.list_view.setLayoutMode(QListView.Batched)
+        # Ctrl and shift clicks select several entries for bulk edits
+        self.list_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
 
         self.list_delegate = MangaDelegate(self.mw, self.list_view)
         self.list_view.setItemDelegate(self.list_delegate)
         # Prevent editing on double-click
         self.list_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
-        self.list_view.clicked.connect(self.mw.details_handler.display_detail)
+        self.list_view.clicked.connect(self.show_clicked)
         # To force manual update because I use custom highlighting logic
         self.list_view.clicked.connect(lambda: self.list_view.viewport().update())
-        self.list_view.clicked.connect(self.update_selection_history)
         self.list_view.middleClicked.connect(self.open_tab)
         self.list_view.rightClicked.connect(lambda index: self.mw.open_detail_view(index.data(Qt.UserRole)))
 
@@ -54,15 +61,69 @@ class ListViewHandler:
 
     def clear_view(self):
         self.list_model.clear()
+        self.row_ids.clear()
+        self.id_rows.clear()
 
     def add_item(self, entry):
+        self.insert_item(len(self.row_ids), entry)
+
+    def insert_item(self, row, entry):
         item = QStandardItem()
         item.setData(entry, Qt.UserRole)
-        self.list_model.appendRow(item)
+        self.list_model.insertRow(row, item)
+        self.row_ids.insert(row, entry.id)
+        self.renumber(row, len(self.row_ids))
+
+    def renumber(self, start, end):
+        # Only the rows between a change and its other end shift, appending touches a single id
+        for row in range(start, end):
+            self.id_rows[self.row_ids[row]] = row
+
+    def row_of(self, entry_id):
+        return self.id_rows.get(entry_id)
+
+    def entry_at(self, row):
+        return self.mw.data[self.mw.entry_to_index[self.row_ids[row]]]
+
+    def remove_row(self, row):
+        self.list_model.removeRow(row)
+        del self.id_rows[self.row_ids.pop(row)]
+        self.renumber(row, len(self.row_ids))
 
-    def update_selection_history(self, index):
-        if index.isValid():
-            unique_id = index.data(Qt.UserRole).id
+    def move_row(self, row, new_row):
+        """
+        Move a row to new_row, counted after the row was taken out. The entry stays current and selected if it was
+        and the list keeps its scroll position.
+        """
+        if row == new_row:
+            self.list_model.item(row).emitDataChanged()
+            return
+        selection = self.list_view.selectionModel()
+        was_current = self.list_view.currentIndex().row() == row
+        was_selected = selection.isRowSelected(row, QModelIndex())
+        scroll_bar = self.list_view.verticalScrollBar()
+        scroll_position = scroll_bar.value()
+        items = self.list_model.takeRow(row)
+        self.list_model.insertRow(new_row, items)
+        self.row_ids.insert(new_row, self.row_ids.pop(row))
+        self.renumber(min(row, new_row), max(row, new_row) + 1)
+        index = self.list_model.index(new_row, 0)
+        if was_current:
+            # Without clearing the rest of the selection like setCurrentIndex would
+            selection.setCurrentIndex(index, QItemSelectionModel.NoUpdate)
+        if was_selected:
+            selection.select(index, QItemSelectionModel.Select)
+        scroll_bar.setValue(scroll_position)
+
+    def show_clicked(self, index):
+        # Showing the entry saves pending edits, which can move rows and leave the index pointing elsewhere
+        entry = index.data(Qt.UserRole)
+        self.mw.details_handler.display_detail(index)
+        self.update_selection_history(entry)
+
+    def update_selection_history(self, entry):
+        if entry is not None:
+            unique_id = entry.id
             # Push the current_id into the back stack only if it's different from the last entry
             if self.current_id is not None and (
                     not self.selection_history['back'] or self.current_id != self.selection_history['back'][-1]):
@@ -85,20 +146,21 @@ class ListViewHandler:
                 self.current_id = self.selection_history['forward'].pop()
 
     def select_index_by_id(self, unique_id):
-        for row in range(self.list_model.rowCount()):
-            if self.list_model.item(row).data(Qt.UserRole).id == unique_id:
-                self.select_index(self.list_model.index(row, 0))
-                return True
+        row = self.row_of(unique_id)
+        if row is not None:
+            self.select_index(self.list_model.index(row, 0))
+            return True
         entry = self.mw.data[self.mw.entry_to_index[unique_id]]
         if entry:
             self.mw.toast.show_notification(f"{unique_id} is not in the list currently.\n{entry.display_title()}")
         return False
 
     def select_index(self, index, update_history=False):
+        entry = index.data(Qt.UserRole)
         self.list_view.setCurrentIndex(index)
         self.mw.details_handler.display_detail(index)
         if update_history:
-            self.update_selection_history(index)
+            self.update_selection_history(entry)
 
     def open_tab(self, index):
         entry = index.data(Qt.UserRole)
@@ -106,6 +168,7 @@ class ListViewHandler:
             entry.opens += 1
             self.mw.is_data_modified = True
             self.logger.debug(f"{entry.id}: MC_num_opens was updated with: {entry.opens}")
+            self.mw.entryChanged.emit(entry, {"opens"})
             if self.mw.details_handler.json_edit_mode:
                 self.mw.details_handler.display_detail(index, True)
         self.mw.browser_handler.open_tab(entry)
@@ -191,6 +254,8 @@ class MangaDelegate(QStyledItemDelegate):
 
         if self.mw.details_handler.cur_data and self.mw.details_handler.cur_data.id == entry.id:
             background_color = option.palette.highlight().color()
+        elif option.state & QStyle.State_Selected:
+            background_color = blend_colors(option.palette.highlight().color(), background_color, 0.5)
 
         item_path = QPainterPath()
         item_path.addRoundedRect(QRectF(option.rect), 5, 5)
@@ -390,8 +455,9 @@ class MangaDelegate(QStyledItemDelegate):
 
 
 class ImagePreview(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, thumb_manager, parent=None):
         super().__init__(parent)
+        self.thumb_manager = thumb_manager
         self.setWindowFlags(Qt.ToolTip)  # Makes it float above other widgets
         self.setLayout(QVBoxLayout())
         self.label = QLabel(self)
@@ -404,25 +470,75 @@ class ImagePreview(QWidget):
         effect.setOffset(1, 1)
         self.setGraphicsEffect(effect)
 
-        self._last_image_path = None
+        self._last_entry_id = None
         self._cached_pixmap = None
 
-    def set_image(self, image_path, max_width=250, max_height=300):
-        if self._last_image_path != image_path:
-            self._cached_pixmap = QPixmap(image_path).scaled(max_width, max_height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self._last_image_path = image_path
+    def invalidate(self, entry_id):
+        if self._last_entry_id == entry_id:
+            self._last_entry_id = None
+
+    def set_image(self, entry_id, max_width=250, max_height=300):
+        if self._last_entry_id != entry_id:
+            pixmap = QPixmap()
+            pixmap.loadFromData(self.thumb_manager.get_thumbnail_data(entry_id) or b"")
+            self._cached_pixmap = pixmap.scaled(max_width, max_height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self._last_entry_id = entry_id
             self.label.setPixmap(self._cached_pixmap)
             self.adjustSize()
 
 
 class SpecialListView(CustomListView):
+    VISIBLE_UPDATE_DELAY = 150
+
     def __init__(self, parent=None):
         super(CustomListView, self).__init__(parent)
         self.mw = parent
-        self.image_preview = ImagePreview(self)
+        self.image_preview = ImagePreview(self.mw.thumbnail_manager, self)
+        self.mw.thumbnail_manager.thumbnailChanged.connect(self.on_thumbnail_changed)
         self.setMouseTracking(True)
         # Amount of items to scroll
         self.scroll_speed = 1
+        # Id of the hovered entry whose cover is still being fetched
+        self.hovered_id = None
+
+        # Covers of the rows on screen are fetched first, the timer collapses bursts of scrolling into one request
+        self.visible_timer = QTimer(self)
+        self.visible_timer.setSingleShot(True)
+        self.visible_timer.setInterval(SpecialListView.VISIBLE_UPDATE_DELAY)
+        self.visible_timer.timeout.connect(self.prioritize_visible_thumbnails)
+        self.verticalScrollBar().valueChanged.connect(self.schedule_visible_update)
+
+    def schedule_visible_update(self):
+        self.visible_timer.start()
+
+    def prioritize_visible_thumbnails(self):
+        model = self.model()
+        if model is None or model.rowCount() == 0:
+            return
+        viewport = self.viewport().rect()
+        first = self.indexAt(viewport.topLeft() + QPoint(2, 2))
+        row = first.row() if first.isValid() else 0
+        entries = []
+        while row < model.rowCount():
+            index = model.index(row, 0)
+            rect = self.visualRect(index)
+            if rect.top() > viewport.bottom():
+                break
+            if rect.intersects(viewport):
+                entries.append(index.data(Qt.UserRole))
+            row += 1
+        self.mw.thumbnail_manager.prioritize(entries, self.mw.thumbnail_manager.VISIBLE)
+
+    def on_thumbnail_changed(self, entry_id, location):
+        self.image_preview.invalidate(entry_id)
+        # Show the preview right away if the cover of the hovered entry just arrived
+        if entry_id == self.hovered_id and self.underMouse():
+            global_pos = QCursor.pos()
+            self.show_image_preview_at(self.viewport().mapFromGlobal(global_pos), global_pos)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_visible_update()
 
     def mouseMoveEvent(self, event):
         self.show_image_preview(event)
@@ -457,13 +573,17 @@ class SpecialListView(CustomListView):
         super().leaveEvent(event)
 
     def show_image_preview(self, event):
+        self.show_image_preview_at(event.pos(), event.globalPos())
+
+    def show_image_preview_at(self, pos, global_pos):
         if self.mw.settings[thumbnail_preview]:
+            self.hovered_id = None
             # Fix bug that unshackles preview from leaveEvent when opening new window without leaving the app
-            if not self.is_cursor_within_view(event.pos()):
+            if not self.is_cursor_within_view(pos):
                 self.image_preview.hide()
                 return
 
-            index = self.indexAt(event.pos())
+            index = self.indexAt(pos)
             if index.isValid():
                 entry = index.data(Qt.UserRole)
 
@@ -473,12 +593,13 @@ class SpecialListView(CustomListView):
                     self.image_preview.hide()
                     return
 
-                image_path = self.mw.thumbnail_manager.get_thumbnail_path(entry.id)
-                if image_path:
-                    self.image_preview.set_image(image_path)
-                    self.image_preview.move(event.globalPos() + QPoint(5, 5))
+                if self.mw.thumbnail_manager.has_thumbnail(entry.id):
+                    self.image_preview.set_image(entry.id)
+                    self.image_preview.move(global_pos + QPoint(5, 5))
                     self.image_preview.show()
                     return
+                self.hovered_id = entry.id
+                self.mw.thumbnail_manager.prioritize([entry], self.mw.thumbnail_manager.HOVERED)
             self.image_preview.hide()
             return
 
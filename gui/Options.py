@@ -5,14 +5,13 @@ from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QDialog, QLabel, QSlider, QVBoxLayout, QCheckBox, QPushButton, QComboBox, QHBoxLayout
 
 from auxillary.JSONMethods import save_json, load_json
+# Keys of the settings the search engine reads live next to it
+from auxillary.SearchEngine import show_removed, default_sort, loose_match, multi_match
 
-show_removed = "show_removed_entries"
-default_sort = "default_sort_option"
 search_thrshold = "search_cutoff_threshold"
-loose_match = "loose_search_matching"
-multi_match = "count_multiple_matches"
 bind_dview = "bind_detail_view"
 thumbnail_preview = "show_hover_thumbnail"
+thumbnail_status = "show_thumbnail_status"
 
 
 def init_settings():
@@ -23,7 +22,8 @@ def init_settings():
         loose_match: False,
         multi_match: False,
         bind_dview: False,
-        thumbnail_preview: True
+        thumbnail_preview: True,
+        thumbnail_status: False
     }
 
 
@@ -117,6 +117,11 @@ class OptionsHandler(QDialog):
         self.thumbnail_checkbox.setChecked(self.mw.settings[thumbnail_preview])
         self.thumbnail_checkbox.stateChanged.connect(lambda state: self.simple_change(thumbnail_preview, state))
 
+        self.thumbnail_status_checkbox = QCheckBox("Show Thumbnail Download Status", self)
+        self.thumbnail_status_checkbox.setChecked(self.mw.settings.get(thumbnail_status, False))
+        self.thumbnail_status_checkbox.stateChanged.connect(self.thumbnail_status_changed)
+        self.thumbnail_status_checkbox.setToolTip("Show live download metrics below the manga list, hover it for the error rates of each host.")
+
         sort_layout = QHBoxLayout()
         sort_layout.addWidget(self.default_sort_label)
         sort_layout.addWidget(self.default_sort_combobox)
@@ -131,6 +136,7 @@ class OptionsHandler(QDialog):
         layout.addWidget(self.multi_match_checkbox)
         layout.addWidget(self.bind_view_checkbox)
         layout.addWidget(self.thumbnail_checkbox)
+        layout.addWidget(self.thumbnail_status_checkbox)
         self.setLayout(layout)
 
     def slider_value_changed(self, value):
@@ -147,6 +153,10 @@ class OptionsHandler(QDialog):
         self.mw.settings[bind_dview] = bool(state)
         self.bindViewChanged.emit(bool(state))
 
+    def thumbnail_status_changed(self, state):
+        self.mw.settings[thumbnail_status] = bool(state)
+        self.mw.thumbnail_status.setVisible(bool(state))
+
     def set_default_sort_option(self, index):
         sort_option = self.mw.search_bar_handler.sorting_options[index][0]
         self.mw.settings[default_sort] = sort_option
@@ -1,15 +1,11 @@
-import os
 import random
-import re
-from collections import defaultdict
-from typing import Tuple, Callable, Any, List
 
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtWidgets import QLineEdit, QLabel, QHBoxLayout, QPushButton, QCompleter
 
-from auxillary.DataAccess import MangaEntry
+from auxillary.SearchEngine import MIN_SEARCH_LENGTH
 from gui.WidgetDerivatives import RightClickableComboBox
-from gui.Options import search_thrshold, loose_match, multi_match, show_removed, default_sort
+from gui.Options import search_thrshold, default_sort
 
 
 class SearchBarHandler:
@@ -22,16 +18,22 @@ class SearchBarHandler:
         self.mw = main_window
         self.sort_order_reversed = False
         self.showing_all_entries = False
-        self.sorting_options = [
-            # Name, algorithm, should be reversed by default
-            ("By data order", lambda entry: self.mw.entry_to_index.get(entry.id, 0), False),
-            ("By id", lambda entry: (0, int(entry.id)) if entry.id.isdigit() else (1, entry.id), True),  # number id or UUID
-            ("By upload date", lambda entry: (0 if entry.upload is None else 1, entry.upload_date()), True),
-            ("By name", lambda entry: entry.display_title().lower(), False),
-            ("By artist", lambda entry: entry.first_artist().lower(), False),
-            ("By score", lambda entry: entry.get('score', float('-inf')), True)  # Reversed will show unrated first
-        ]
+        # The search, filters and sort the list was last built with, edited entries are placed with them
+        self.active_terms = None
+        self.active_filters = []
+        self.active_sort = None
+        self.hit_count = 0
+        self.truncated = False
+        # Hits past the search threshold, they aren't listed but belong to the results
+        self.hidden_results = []
+        # Runs the queries, shared with the command line
+        self.engine = self.mw.search_engine
+        self.sorting_options = self.engine.sorting_options
         self.init_ui()
+        self.mw.entryChanged.connect(self.refresh_entry)
+        # A batch of edits rebuilds the list once instead of placing every row
+        self.mw.entriesChanged.connect(lambda changes: self.update_list())
+        self.mw.entriesRemoved.connect(lambda entry_ids: self.update_list())
 
     def init_ui(self):
         # Search bar
@@ -107,143 +109,113 @@ class SearchBarHandler:
         self.sort_order_reversed = not self.sort_order_reversed
         self.update_list()
 
-    def apply_filters(self, entry, filters):
-        # Apply all filters; if any filter returns False, the entry is excluded
-        return all(filter_func(entry) for filter_func in filters)
-
     def update_list(self, forceRefresh=True):
-        search_terms = [term.strip() for term in self.search_bar.text().split(",")]
-
-        # Define sort in case we need it
-        sorting_option: tuple[str, Callable, bool] = self.sorting_options[self.sort_combobox.currentIndex()]
-        reverse_final = sorting_option[2] ^ self.sort_order_reversed  # XOR
-        selected_group = self.mw.group_handler.group_combobox.currentData()
-
-        # Aggregate applicable filters
-        filters = []
-        if selected_group:
-            filters.append(lambda e: e.group == selected_group)
-        if not self.mw.settings[show_removed]:
-            filters.append(lambda e: not e.removed)
-
-        # Now filter the data using a single list comprehension
-        if filters:
-            mod_data = [entry for entry in self.mw.data if self.apply_filters(entry, filters)]
-        else:
-            mod_data = self.mw.data
-
+        text = self.search_bar.text()
         # If less than 3 characters and already showing all entries, return early
-        if len(self.search_bar.text()) < 3:
-            if self.showing_all_entries and not forceRefresh:
-                return
-            else:
-                sorted_data = sorted(mod_data, key=lambda x: sorting_option[1](x), reverse=reverse_final)
-                self.mw.manga_list_handler.clear_view()
-                for entry in sorted_data:
-                    self.mw.manga_list_handler.add_item(entry)
-                self.showing_all_entries = True
-                self.hits_label.hide()
-                return
-
-        # Compute scores for all manga entries and sort them based on the score
-        scored_data = [(entry, self.match_score(entry, search_terms)) for entry in mod_data]
-        grouped_data = defaultdict(list)
-        for entry, score in scored_data:
-            if score != 0:  # prune non-hits early
-                grouped_data[score].append((entry, score))
-
-        # 2. Sort Each Group by Secondary Key
-        for score, group in grouped_data.items():
-            grouped_data[score] = sorted(group, key=lambda x: sorting_option[1](x[0]), reverse=reverse_final)
-
-        sorted_data = [item for score in sorted(grouped_data.keys(), reverse=True) for item in grouped_data[score]]
+        if len(text) < MIN_SEARCH_LENGTH and self.showing_all_entries and not forceRefresh:
+            return
+
+        result = self.engine.query(text, self.sort_combobox.currentText(), self.sort_order_reversed,
+                                   self.mw.group_handler.group_combobox.currentData(), self.mw.settings)
+        self.active_filters = result.filters
+        self.active_sort = result.sort
+        self.active_terms = result.terms
+        self.hidden_results = []
 
         self.mw.manga_list_handler.clear_view()  # Clear the list before adding filtered results
+        if result.terms is None:
+            for entry in result.entries:
+                self.mw.manga_list_handler.add_item(entry)
+            self.showing_all_entries = True
+            self.truncated = False
+            self.hit_count = len(result.entries)
+            self.hits_label.hide()
+            return
 
-        hit_count = len(sorted_data)
+        hit_count = len(result.entries)
         threshold = self.mw.settings[search_thrshold]
+        # Show all entries if Threshold is 0
+        for entry in result.entries if threshold == 0 else result.entries[:threshold]:
+            self.mw.manga_list_handler.add_item(entry)
+
+        self.truncated = threshold != 0 and hit_count > threshold
+        if self.truncated:
+            self.hidden_results = result.entries[threshold:]
+        self.set_hit_count(hit_count)
+        self.showing_all_entries = False
 
-        for idx, (entry, score) in enumerate(sorted_data):
-            if threshold == 0 or idx < threshold:  # Show all entries if Threshold is 0
-                self.mw.manga_list_handler.add_item(entry)
+    def result_entries(self):
+        """All entries of the active search in list order, including the hits past the threshold."""
+        list_handler = self.mw.manga_list_handler
+        return [list_handler.entry_at(row) for row in range(len(list_handler.row_ids))] + self.hidden_results
 
-        if hit_count > 0 and search_terms:
+    def set_hit_count(self, hit_count):
+        self.hit_count = hit_count
+        if hit_count > 0 and self.active_terms:
             self.hits_label.setText(f"Hits: {hit_count}")
             self.hits_label.show()
         else:
             self.hits_label.hide()
 
-        self.showing_all_entries = False
-
-    def match_score(self, data, terms):
-        """Compute a score based on the number of matching terms."""
+    def refresh_entry(self, entry, fields):
+        """
+        Re-evaluate one edited entry against the active search, filters and sort and insert, move, update or remove
+        only its row. Falls back to rebuilding the list when the edit can change other rows as well.
+        """
+        if self.active_sort is None:
+            return
+        if self.needs_full_refresh(fields):
+            self.update_list()
+            return
+        list_handler = self.mw.manga_list_handler
+        row = list_handler.row_of(entry.id)
         score = 0
+        if self.engine.apply_filters(entry, self.active_filters):
+            score = 1 if self.active_terms is None else self.match_score(entry, self.active_terms)
+        if not score:
+            if row is not None:
+                list_handler.remove_row(row)
+                self.set_hit_count(self.hit_count - 1)
+            return
 
-        for term in terms:
-            term_score = 0
-            if ":" in term:
-                field, value = term.split(":", 1)
-                fields_to_search = MangaEntry.FIELD_ALIASES_AND_GROUPING.get(field, [field])
-
-                for search_field in fields_to_search:
-                    data_value = data.get(search_field, "")
-                    if value and value[0] in [">", "<"]:
-                        term_score += self.compare_match(data_value, value)
-                    else:
-                        term_score += self.count_matches(data_value, value)
+        # Rows stay sorted while the edited one is left out, so its new place is found by bisecting the others
+        key = self.order_key(entry, score)
+        low, high = 0, len(list_handler.row_ids) - (row is not None)
+        while low < high:
+            middle = (low + high) // 2
+            other_row = middle + (row is not None and middle >= row)
+            other = list_handler.entry_at(other_row)
+            other_score = 1 if self.active_terms is None else self.match_score(other, self.active_terms)
+            if self.precedes(self.order_key(other, other_score), key):
+                low = middle + 1
             else:
-                for data_value in data.values():
-                    term_score += self.count_matches(data_value, term)
-
-            if not self.mw.settings[loose_match] and term_score == 0:
-                return 0  # If a term did not match any field, we return a score of 0 for the entire entry
-
-            score += term_score
-
-        if not self.mw.settings[multi_match] and score > 1:
-            score = 1  # Disable multiple match weighting to preserve proper sort order
-
-        return score
-
-    def count_matches(self, value, target):
-        """
-        Count the number of times the target is present in the value or any of its items (if list/dict).
-        """
-        count = 0
-
-        if isinstance(value, (int, float)):
-            if str(value) == target:
-                count += 1
-        elif isinstance(value, list):
-            for item in value:
-                count += self.count_matches(item, target)
-        elif isinstance(value, dict):
-            for item_value in value.values():
-                count += self.count_matches(item_value, target)
-        elif target.lower() in str(value).lower():
-            count += 1
-
-        return count
-
-    def compare_match(self, data_value, compare_term):
-        """Match > or < for field searches"""
-        operator = compare_term[0]
-        target_value = compare_term[1:]
-
-        if isinstance(data_value, (list, dict)):
-            value = len(data_value)
-        elif isinstance(data_value, (float, int)) or (isinstance(data_value, str) and data_value.isnumeric()):
-            value = int(data_value)
+                high = middle
+        if row is None:
+            list_handler.insert_item(low, entry)
+            self.set_hit_count(self.hit_count + 1)
         else:
-            value = len(str(data_value))
-
-        if target_value and target_value.isnumeric():
-            if operator == '>':
-                return 1 if value > int(target_value) else 0
-            elif operator == '<':
-                return 1 if value < int(target_value) else 0
-
-        return 0
+            list_handler.move_row(row, low)
+
+    def needs_full_refresh(self, fields):
+        # A changed id moves the entry in the data order, changed links change the matches of similar: terms
+        if "id" in fields or self.truncated:
+            return True
+        return "similar" in fields and any(term.startswith("similar:") for term in self.active_terms or ())
+
+    def order_key(self, entry, score):
+        return score, self.active_sort[0](entry), self.mw.entry_to_index.get(entry.id, 0)
+
+    def precedes(self, first, second):
+        """Whether a row with the first order key comes before one with the second, like the sort in update_list."""
+        if first[0] != second[0]:
+            return first[0] > second[0]
+        if first[1] != second[1]:
+            return (first[1] > second[1]) == self.active_sort[1]
+        # The sort is stable, ties keep the data order
+        return first[2] < second[2]
+
+    def match_score(self, entry, terms):
+        return self.engine.match_score(entry, terms, self.mw.settings)
 
 
 class FieldSearchCompleter(QCompleter):
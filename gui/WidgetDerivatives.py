@@ -1,13 +1,16 @@
 import os
 import re
+from bisect import bisect_left
 
 from PyQt5 import QtCore
-from PyQt5.QtCore import pyqtSignal, Qt, QRectF, QPointF, QPoint, pyqtSlot, QTimer, QPropertyAnimation
+from PyQt5.QtCore import pyqtSignal, Qt, QRectF, QPointF, QPoint, pyqtSlot, QTimer, QPropertyAnimation, \
+    QAbstractListModel, QAbstractProxyModel, QModelIndex
 from PyQt5.QtGui import QColor, QPainter, QPixmap, QWheelEvent, QMouseEvent, QShowEvent, QHideEvent
 from PyQt5.QtWidgets import QComboBox, QCompleter, QTextEdit, QVBoxLayout, QWidget, QLineEdit, QListWidget, QLabel, \
-    QListWidgetItem, QGridLayout, QScrollArea, QPushButton, QInputDialog, QListView, QGraphicsView, QGraphicsScene, \
-    QHBoxLayout, QGraphicsDropShadowEffect
+    QGridLayout, QScrollArea, QPushButton, QInputDialog, QListView, QGraphicsView, QGraphicsScene, \
+    QHBoxLayout, QGraphicsDropShadowEffect, QAbstractItemView
 
+from auxillary.Catalog import sort_key as catalog_sort_key
 from gui.Options import bind_dview
 
 
@@ -43,19 +46,6 @@ class CustomListView(QListView):
             super().mousePressEvent(event)
 
 
-class CustomListWidget(QListWidget):
-    itemRightClicked = pyqtSignal(object)
-
-    def __init__(self, parent=None):
-        super(CustomListWidget, self).__init__(parent)
-        self.setUniformItemSizes(True)
-
-    def contextMenuEvent(self, event):
-        item = self.itemAt(event.pos())
-        if item:
-            self.itemRightClicked.emit(item)
-
-
 class DraggableListWidget(QListWidget):
     itemMoved = pyqtSignal(int, int)  # Signal to emit when item is moved
 
@@ -167,9 +157,203 @@ class ToastNotification(QWidget):
         self.animation.finished.disconnect()
 
 
+class ThumbnailStatus(QLabel):
+    """One line summary of the thumbnail downloads, the per host error rates are shown in the tooltip."""
+
+    def __init__(self, thumb_manager, parent=None):
+        super().__init__(parent)
+        self.setText("Thumbnails: idle")
+        thumb_manager.metricsUpdated.connect(self.update_metrics)
+
+    def update_metrics(self, metrics):
+        self.setText(f"Thumbnails: {metrics['queued']} queued, {metrics['in_flight']} in flight, "
+                     f"{metrics['completed']} done, {metrics['failed']} failed, "
+                     f"{metrics['bytes'] / 1024 / 1024:.1f} MB, {metrics['latency'] * 1000:.0f} ms avg, "
+                     f"{metrics['rate']:.1f} images/s")
+        self.setToolTip("\n".join(f"{host}: {stats['errors']} of {stats['requests']} requests failed "
+                                  f"({stats['error_rate']:.0%})" for host, stats in metrics["hosts"].items()))
+
+
+def entry_tooltip(entry):
+    tooltip_lines = [f"<b>ID:</b> {entry.id}", f"<b>Title:</b> {entry.display_title()}"]
+    if entry.description:
+        tooltip_lines.append(f"<b>Description:</b> {entry.description}")
+    tooltip_lines.append(f"<b>Tags:</b> {', '.join(entry.tags)}")
+    if entry.artist and entry.artist != ['']:
+        tooltip_lines.append(f"<b>Artist(s):</b> {', '.join(entry.artist)}")
+    return "<br>".join(tooltip_lines)
+
+
+class EntryListModel(QAbstractListModel):
+    """All entries of the library, the texts are only built when a view asks for them."""
+
+    def __init__(self, entries, selected, recommended=None, parent=None):
+        super().__init__(parent)
+        self.entries = entries
+        # Shared with the owner, rows of selected ids are highlighted and recommended {id: score} rows are marked
+        self.selected = selected
+        self.recommended = recommended if recommended is not None else {}
+        self.known_rows = len(entries)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{entry.id} - {entry.display_title()}"
+        if role == Qt.UserRole:
+            return entry
+        if role == Qt.ToolTipRole:
+            if entry.id in self.recommended:
+                return f"<b>Recommended</b> ({self.recommended[entry.id]:.0%} similar)<br>" + entry_tooltip(entry)
+            return entry_tooltip(entry)
+        if role == Qt.BackgroundRole:
+            if entry.id in self.selected:
+                return IdMatcher.SELECTED_COLOR
+            if entry.id in self.recommended:
+                return IdMatcher.RECOMMENDED_COLOR
+        return None
+
+    def row_changed(self, row):
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def all_changed(self):
+        """Refresh every row, the model is reset and True returned if entries were added or removed."""
+        if len(self.entries) != self.known_rows:
+            self.beginResetModel()
+            self.known_rows = len(self.entries)
+            self.endResetModel()
+            return True
+        if self.entries:
+            self.dataChanged.emit(self.index(0), self.index(len(self.entries) - 1))
+        return False
+
+
+class EntryFilterProxy(QAbstractProxyModel):
+    """
+    Shows the given source rows, or every row except the excluded one when there's no filter.
+    Filtering only costs as much as there are matches instead of testing every row of the library.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.positions = {}
+        self.excluded = None
+
+    def setSourceModel(self, source_model):
+        super().setSourceModel(source_model)
+        source_model.dataChanged.connect(self.source_data_changed)
+
+    def set_rows(self, rows, excluded=None):
+        """Show the source rows in the given order, None shows all rows except excluded."""
+        self.beginResetModel()
+        self.rows = rows
+        self.positions = {row: position for position, row in enumerate(rows)} if rows is not None else {}
+        self.excluded = excluded
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.rows is not None:
+            return len(self.rows)
+        return self.sourceModel().rowCount() - (self.excluded is not None)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < self.rowCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        row = proxy_index.row()
+        if self.rows is not None:
+            row = self.rows[row]
+        elif self.excluded is not None and row >= self.excluded:
+            row += 1
+        return self.sourceModel().index(row)
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row()
+        if self.rows is not None:
+            if row not in self.positions:
+                return QModelIndex()
+            return self.index(self.positions[row])
+        if row == self.excluded:
+            return QModelIndex()
+        return self.index(row - 1 if self.excluded is not None and row > self.excluded else row)
+
+    def source_data_changed(self, top_left, bottom_right, roles=()):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            index = self.mapFromSource(self.sourceModel().index(row))
+            if index.isValid():
+                self.dataChanged.emit(index, index, roles)
+
+
+class CatalogModel(QAbstractListModel):
+    """
+    Sorted values of one catalog field for completers. Values that appear or vanish in the library are inserted or
+    removed as single rows, so the model is never rebuilt.
+    """
+
+    def __init__(self, catalog, field, parent=None):
+        super().__init__(parent)
+        self.field = field
+        self.values = catalog.values(field)
+        self.keys = [catalog_sort_key(value) for value in self.values]
+        catalog.subscribe(self.on_catalog_changed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.values)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self.values[index.row()]
+        return None
+
+    def on_catalog_changed(self, field, added, removed):
+        if field != self.field:
+            return
+        for value in removed:
+            row = bisect_left(self.keys, catalog_sort_key(value))
+            if row < len(self.values) and self.values[row] == value:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.values[row], self.keys[row]
+                self.endRemoveRows()
+        for value in added:
+            key = catalog_sort_key(value)
+            row = bisect_left(self.keys, key)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.values.insert(row, value)
+            self.keys.insert(row, key)
+            self.endInsertRows()
+
+
+def catalog_completer(model, parent, completer_class=QCompleter):
+    completer = completer_class(model, parent)
+    completer.setCaseSensitivity(Qt.CaseInsensitive)
+    # The catalog is sorted case-insensitively, so the completer can search it instead of scanning
+    completer.setModelSorting(QCompleter.CaseInsensitivelySortedModel)
+    return completer
+
+
 class IdMatcher(QWidget):
     SELECTED_COLOR = QColor(26, 122, 39)
-    DEFAULT_COLOR = Qt.transparent
+    RECOMMENDED_COLOR = QColor(40, 70, 110)
     saveSignal = pyqtSignal()
     DEFAULT_RATIO = 0.65
 
@@ -177,7 +361,9 @@ class IdMatcher(QWidget):
         super(IdMatcher, self).__init__(parent)
 
         self.mw = mw
-        self.selected_items = []
+        self.selected_items = set()
+        # {id: score} of entries with similar tags, artists and parodies that aren't linked yet
+        self.recommended = {}
         # Id of entry to not show self
         self.base_id = None
         self.show_similar_toggle = False
@@ -196,48 +382,26 @@ class IdMatcher(QWidget):
         self.toggle_button.clicked.connect(self.toggle_similar_items)
         input_layout.addWidget(self.toggle_button)
 
-        self.list_widget = CustomListWidget(self)
-        self.list_widget.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.list_widget.itemClicked.connect(self.handle_item_click)
-        self.list_widget.itemRightClicked.connect(lambda index: self.mw.open_detail_view(index.data(Qt.UserRole)))
+        self.entry_model = EntryListModel(self.mw.data, self.selected_items, self.recommended, self)
+        self.filter_model = EntryFilterProxy(self)
+        self.filter_model.setSourceModel(self.entry_model)
+        self.list_view = CustomListView(self)
+        self.list_view.setModel(self.filter_model)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.list_view.clicked.connect(self.handle_item_click)
+        self.list_view.rightClicked.connect(lambda index: self.mw.open_detail_view(index.data(Qt.UserRole)))
+        self.mw.entryChanged.connect(self.on_entry_changed)
+        self.mw.entriesChanged.connect(lambda changes: self.on_entries_changed())
+        self.mw.entriesRemoved.connect(self.on_entries_removed)
 
         self.layout.addWidget(QLabel("Similar:"))
         self.layout.addLayout(input_layout)
-        self.layout.addWidget(self.list_widget)
-
-        self.populate_list()
+        self.layout.addWidget(self.list_view)
 
     def emit_save_signal(self):
         self.saveSignal.emit()
 
-    def populate_list(self):
-        """Populate the list widget based on the mw data."""
-        for entry in self.mw.data:
-            item = QListWidgetItem(f"{entry.id} - {entry.display_title()}")
-
-            # Set custom data on the item
-            item.setData(Qt.UserRole, entry)
-
-            tooltip_lines = []
-
-            # Conditional tooltip content
-            tooltip_lines.append(f"<b>ID:</b> {entry.id}")
-            tooltip_lines.append(f"<b>Title:</b> {entry.display_title()}")
-            if entry.description:
-                tooltip_lines.append(f"<b>Description:</b> {entry.description}")
-            tooltip_lines.append(f"<b>Tags:</b> {', '.join(entry.tags)}")
-            if entry.artist and entry.artist != ['']:
-                tooltip_lines.append(f"<b>Artist(s):</b> {', '.join(entry.artist)}")
-
-            # Join the tooltip lines with a line break
-            tooltip_text = "<br>".join(tooltip_lines)
-
-            # Set the tooltip
-            item.setToolTip(tooltip_text)
-
-            self.list_widget.addItem(item)
-            item.setHidden(True)
-
     def update_list(self):
         """Filter the list based on the input ID."""
         if not self.base_id:
@@ -248,7 +412,7 @@ class IdMatcher(QWidget):
         if input and len(input) < 3:
             return
 
-        self._update_item_visibility_and_color(input_filter=input)
+        self._update_rows(input_filter=input)
 
     def toggle_similar_items(self):
         """Toggle the display of similar items in the list."""
@@ -260,55 +424,76 @@ class IdMatcher(QWidget):
 
         self.update_list()
 
-    def handle_item_click(self, item):
+    def handle_item_click(self, index):
         if not self.base_id:
             return
 
-        entry_id = item.data(Qt.UserRole).id
+        entry_id = index.data(Qt.UserRole).id
         if entry_id in self.selected_items:
             # If already selected, deselect it
-            item.setBackground(IdMatcher.DEFAULT_COLOR)
             self.selected_items.remove(entry_id)
         else:
-            self.selected_items.append(entry_id)
-            item.setBackground(IdMatcher.SELECTED_COLOR)
+            self.selected_items.add(entry_id)
+        self.entry_model.row_changed(self.mw.entry_to_index[entry_id])
 
         self.emit_save_signal()
 
+    def on_entry_changed(self, entry, fields):
+        row = self.mw.entry_to_index.get(entry.id)
+        if row is not None:
+            self.entry_model.row_changed(row)
+
+    def on_entries_changed(self):
+        if self.entry_model.all_changed():
+            # Rows are positions in the data, which moved
+            self._update_rows(self.search_input.text().strip().lower())
+
+    def on_entries_removed(self, entry_ids):
+        if self.base_id in entry_ids:
+            self.clear()
+        self.on_entries_changed()
+
+    def clear(self):
+        """Show nothing until the next entry is loaded, like before the first one."""
+        self.base_id = None
+        self.search_input.clear()
+        self.selected_items.clear()
+        self._update_rows()
+
     # Handles resetting and loading the data
     def load(self, entry):
+        self.base_id = None
         self.search_input.clear()
         self.selected_items.clear()
-        self.selected_items = [sim for sim in entry.similar]
+        self.selected_items.update(entry.similar)
         self.base_id = entry.id
 
-        self._update_item_visibility_and_color(update_color=True)
-
-    def _update_item_visibility_and_color(self, input_filter="", update_color=False):
-        for idx in range(self.list_widget.count()):
-            item = self.list_widget.item(idx)
-            entry_id = item.data(Qt.UserRole).id
-
-            # Determine if the item should be hidden
-            if self.show_similar_toggle:
-                is_hidden = entry_id not in self.selected_items or entry_id == self.base_id
-            else:
-                is_hidden = entry_id == self.base_id or (
-                            len(input_filter) > 0 and input_filter not in item.text().lower())
-
-            item.setHidden(is_hidden)
-
-            if update_color:
-                if entry_id in self.selected_items:
-                    item.setBackground(IdMatcher.SELECTED_COLOR)
-                else:
-                    item.setBackground(IdMatcher.DEFAULT_COLOR)
+        self._update_rows()
+
+    def _update_rows(self, input_filter=""):
+        rows = None
+        self.recommended.clear()
+        if self.base_id is None:
+            rows = []
+        elif self.show_similar_toggle:
+            rows = sorted(self.mw.entry_to_index[entry_id] for entry_id in self.selected_items
+                          if entry_id in self.mw.entry_to_index and entry_id != self.base_id)
+            # Linked entries first, then the best recommendations that aren't linked yet
+            for entry_id, score in self.mw.recommender.recommend(self.base_id):
+                if entry_id not in self.selected_items and entry_id in self.mw.entry_to_index:
+                    self.recommended[entry_id] = score
+                    rows.append(self.mw.entry_to_index[entry_id])
+        elif input_filter:
+            matches = self.mw.search_index.search(input_filter)
+            if matches is not None:
+                rows = sorted(self.mw.entry_to_index[entry_id] for entry_id in matches if entry_id != self.base_id)
+        self.filter_model.set_rows(rows, self.mw.entry_to_index.get(self.base_id))
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
 
         new_height = self.height() * IdMatcher.DEFAULT_RATIO
-        self.list_widget.setFixedHeight(int(new_height))
+        self.list_view.setFixedHeight(int(new_height))
 
 
 class TagsWidget(QWidget):
@@ -380,17 +565,13 @@ class TagsWidget(QWidget):
         dialog.setStyleSheet(self.mw.styles["lineedit"] + "\n" + self.mw.styles["textbutton"])
 
         line_edit = dialog.findChild(QLineEdit)
-        completer = QCompleter(list(self.mw.all_tags), dialog)
-        completer.setCaseSensitivity(Qt.CaseInsensitive)
-        line_edit.setCompleter(completer)
+        line_edit.setCompleter(catalog_completer(self.mw.tag_model, dialog))
 
         ok = dialog.exec_()
         text = dialog.textValue()
 
         if ok and text:
             text = text.strip()
-            # Update all tags in case it's a new one
-            self.mw.all_tags.append(text)
 
             # Check for duplicate tags
             existing_tags = self.extract_tags_from_layout()
@@ -452,16 +633,20 @@ class ImageViewer(QGraphicsView):
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
 
         self._zoom_factor = 1.0
+        self.thumb_manager.thumbnailChanged.connect(self.on_thumbnail_changed)
+
+    def on_thumbnail_changed(self, entry_id, location):
+        if entry_id == self.entry_id:
+            self.load_image(self.entry_id)
 
     def load_image(self, entry_id):
         self.entry_id = entry_id
         self._zoom_factor = 1.0
         if not self.isHidden():
-            img_path = self.thumb_manager.get_thumbnail_path(self.entry_id)
-            if not img_path:
-                img_path = self.DEFAULT_IMG
-
-            self.original_pixmap = QPixmap(img_path)
+            img_data = self.thumb_manager.get_thumbnail_data(self.entry_id)
+            self.original_pixmap = QPixmap()
+            if not img_data or not self.original_pixmap.loadFromData(img_data):
+                self.original_pixmap = QPixmap(self.DEFAULT_IMG)
             self._update_pixmap()
 
     def _update_pixmap(self):
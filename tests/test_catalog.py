@@ -0,0 +1,38 @@
+from auxillary.Catalog import Catalog
+from auxillary.DataAccess import MangaEntry
+
+
+def test_counts_follow_edits_and_removals():
+    first = MangaEntry({"id": "1", "tag": ["b", "A"], "artist": ["x"]})
+    second = MangaEntry({"id": "2", "tag": ["b"]})
+    catalog = Catalog([first, second])
+    events = []
+    catalog.subscribe(lambda field, added, removed: events.append((field, sorted(added), sorted(removed))))
+
+    assert catalog.values("tags") == ["A", "b"] and catalog.count("tags", "b") == 2
+    assert ("id", "2") in catalog and ("artist", "y") not in catalog
+
+    first.tags = ["b", "c"]
+    catalog.update(first)
+    assert events == [("tags", ["c"], ["A"])]
+    assert catalog.count("tags", "b") == 2
+
+    events.clear()
+    catalog.remove("2")
+    catalog.remove("2")
+    assert events == [("id", [], ["2"])]
+    assert catalog.count("tags", "b") == 1 and ("id", "2") not in catalog
+
+
+def test_unchanged_update_notifies_nobody():
+    entry = MangaEntry({"id": "1", "tag": ["a"]})
+    catalog = Catalog([entry])
+    events = []
+    catalog.subscribe(lambda *event: events.append(event))
+    catalog.update(entry)
+    assert events == []
+
+
+def test_empty_values_are_not_cataloged():
+    catalog = Catalog([MangaEntry({"id": "1", "tag": ["", "a"], "artist": []})])
+    assert catalog.values("tags") == ["a"] and catalog.values("artist") == []
@@ -0,0 +1,48 @@
+import random
+
+from auxillary.CoverIndex import CoverIndex
+
+
+def test_similar_returns_close_covers_nearest_first():
+    index = CoverIndex()
+    index.update("a", 0b0000)
+    index.update("b", 0b0111)
+    index.update("c", 0b0001)
+    index.update("d", 0b1111_1111)
+    assert index.similar("a", max_distance=3) == [("c", 1), ("b", 3)]
+    assert index.similar("a", max_distance=3, limit=1) == [("c", 1)]
+    assert index.similar("missing") == []
+
+
+def test_remove_keeps_the_other_hashes_reachable():
+    index = CoverIndex()
+    for number in range(5):
+        index.update(str(number), number)
+    index.remove("1")
+    index.remove("1")
+    index.update("4", 0b1000)
+    assert len(index) == 4 and index.get("1") is None
+    assert {key: index.get(key) for key in ("0", "2", "3", "4")} == {"0": 0, "2": 2, "3": 3, "4": 0b1000}
+    assert index.similar("0", max_distance=1) == [("2", 1), ("4", 1)]
+
+
+def test_bucket_lookups_find_what_a_full_scan_finds():
+    rng = random.Random(0)
+    index = CoverIndex()
+    hashes = {}
+    # Variations of a few covers, so there are matches at every distance
+    bases = [rng.getrandbits(64) for _ in range(20)]
+    for number in range(2000):
+        value = bases[number % 20]
+        for _ in range(rng.randint(0, 16)):
+            value ^= 1 << rng.randrange(64)
+        hashes[str(number)] = value
+        index.update(str(number), value)
+    for number in range(0, 2000, 50):
+        index.remove(str(number))
+        del hashes[str(number)]
+    for key in rng.sample(sorted(hashes), 30):
+        for max_distance in (0, 4, 7, 13):
+            expected = sorted((bin(hashes[key] ^ value).count("1"), other) for other, value in hashes.items()
+                              if other != key and bin(hashes[key] ^ value).count("1") <= max_distance)
+            assert index.similar(key, max_distance) == [(other, distance) for distance, other in expected]
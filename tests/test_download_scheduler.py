@@ -0,0 +1,119 @@
+import asyncio
+from types import SimpleNamespace
+
+from auxillary.DownloadScheduler import DownloadScheduler, JobQueue, PRIORITY_VISIBLE
+from auxillary.Thumbnails import ThumbnailManager
+
+URL = "http://covers.example/1.png"
+
+
+def make_scheduler(responses, on_success, on_failure=None):
+    """Scheduler whose fetch answers with the given (status, data) pairs in order."""
+    fetched = []
+
+    async def fetch(url, headers=None):
+        fetched.append((url, headers))
+        status, data = responses[min(len(fetched), len(responses)) - 1]
+        return status, data, {}
+
+    scheduler = DownloadScheduler(fetch, on_success, on_failure or (lambda *args, **kwargs: None), retries=0)
+    return scheduler, fetched
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+
+def test_put_skips_running_job_without_requeue():
+    async def scenario():
+        queue = JobQueue()
+        queue.put("a", URL)
+        await queue.get()
+        queue.put("a", URL)
+        assert len(queue) == 0
+        queue.task_done("a")
+        assert len(queue) == 0 and queue.idle.is_set()
+
+    run(scenario())
+
+
+def test_requeue_of_running_job_runs_after_it_finished():
+    async def scenario():
+        queue = JobQueue()
+        queue.put("a", URL)
+        await queue.get()
+        queue.put("a", URL, priority=PRIORITY_VISIBLE, requeue=True)
+        assert len(queue) == 0
+        queue.task_done("a")
+        assert len(queue) == 1 and not queue.idle.is_set()
+        key, job = await queue.get()
+        assert key == "a" and job["priority"] == PRIORITY_VISIBLE
+
+    run(scenario())
+
+
+def test_resubmit_from_success_callback_downloads_again():
+    async def scenario():
+        calls = []
+
+        def on_success(key, url, data, headers):
+            calls.append(data)
+            if data is None:
+                scheduler.submit(key, url, requeue=True)
+
+        scheduler, fetched = make_scheduler([(304, None), (200, b"cover")], on_success)
+        scheduler.submit(URL, URL)
+        await scheduler.join()
+        await scheduler.stop()
+        return calls, fetched
+
+    calls, fetched = run(scenario())
+    assert len(fetched) == 2
+    assert calls == [None, b"cover"]
+
+
+def test_revalidation_of_evicted_cover_fetches_data_and_clears_pending():
+    """A 304 for entries whose cover was evicted downloads it again instead of stalling the pending urls."""
+    async def scenario():
+        manga = SimpleNamespace(id="1", thumbnail_url=URL)
+        saved = []
+        manager = SimpleNamespace(
+            pending={URL: [manga]},
+            id_to_path={},
+            manifest=SimpleNamespace(touch=lambda entry_id: None),
+            queue=SimpleNamespace(done=lambda entry_id: None),
+            save_img=lambda data, mangas, source=None: saved.append((data, [m.id for m in mangas])),
+        )
+        scheduler, fetched = make_scheduler(
+            [(304, None), (200, b"cover")],
+            lambda *args: ThumbnailManager.on_download(manager, *args),
+            lambda *args, **kwargs: ThumbnailManager.on_download_failed(manager, *args, **kwargs))
+        manager.get_scheduler = lambda: scheduler
+        scheduler.submit(URL, URL, {"If-None-Match": "etag"})
+        await scheduler.join()
+        await scheduler.stop()
+        return manager, saved, fetched
+
+    manager, saved, fetched = run(scenario())
+    assert len(fetched) == 2
+    assert saved == [(b"cover", ["1"])]
+    assert manager.pending == {}
+
+
+def test_failure_clears_pending():
+    async def scenario():
+        manga = SimpleNamespace(id="1", thumbnail_url=URL)
+        failed = []
+        manager = SimpleNamespace(pending={URL: [manga]},
+                                  queue=SimpleNamespace(fail=lambda entry_id, url: failed.append(entry_id)))
+        scheduler, _ = make_scheduler(
+            [(404, None)], lambda *args: None,
+            lambda *args, **kwargs: ThumbnailManager.on_download_failed(manager, *args, **kwargs))
+        scheduler.submit(URL, URL)
+        await scheduler.join()
+        await scheduler.stop()
+        return manager, failed
+
+    manager, failed = run(scenario())
+    assert manager.pending == {}
+    assert failed == ["1"]
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from auxillary.DataAccess import MangaEntry
+from auxillary.EntryImport import iter_records, normalize, import_entries
+
+
+def library():
+    return [MangaEntry({"id": "1", "title": "Old", "tag": ["a"], "similar": ["2"], "score": 4,
+                        "MC_Grouping": "Watched", "MC_num_opens": 3, "description": "Kept"})]
+
+
+def test_iter_records_reads_arrays_and_json_lines(tmp_path):
+    records = [{"id": 1}, {"id": "2", "title": "x"}]
+    array = tmp_path / "dump.json"
+    array.write_text("\n " + json.dumps(records))
+    lines = tmp_path / "dump.jsonl"
+    lines.write_text(json.dumps(records[0]) + "\n\nnot json\n" + json.dumps(records[1]) + "\n")
+    empty = tmp_path / "empty.json"
+    empty.write_text("  \n")
+    assert list(iter_records(str(array))) == records
+    assert list(iter_records(str(lines))) == records
+    assert list(iter_records(str(empty))) == []
+
+
+def test_normalize_maps_attribute_names_and_types():
+    record = normalize({"id": 7, "tags": "solo", "upload": "2023/01/01", "pages": "24", "artist": "", "group": "x"})
+    assert record == {"id": "7", "tag": ["solo"], "upload_date": "2023/01/01", "pages": 24, "artist": [],
+                      "group": ["x"]}
+    assert normalize({"title": "no id"}) is None
+    assert normalize({"id": ""}) is None
+    assert normalize(["not", "a", "record"]) is None
+
+
+def test_import_merges_by_id_and_appends_new_entries():
+    data = library()
+    records = [{"id": "1", "title": "New", "tags": ["b", "a"], "similar": ["3"], "score": 1, "MC_Grouping": "x"},
+               {"id": 2, "title": "Added", "MC_num_opens": 9}, {"title": "skipped"}]
+    changes, skipped = import_entries(data, records)
+
+    assert skipped == 1
+    entry = data[0]
+    assert entry.title == "New" and entry.tags == ["a", "b"] and entry.similar == ["2", "3"]
+    # Fields only the app writes are never taken from an import
+    assert (entry.score, entry.group, entry.opens) == (4, "Watched", 3)
+    assert changes["1"] == (entry, {"title", "tags", "similar"})
+    assert [e.id for e in data] == ["1", "2"] and "MC_num_opens" not in data[1]
+    assert changes["2"][0] is data[1]
+
+
+def test_import_precedence_rules():
+    data = library()
+    precedence = {"default": "existing", "fields": {"tags": "import", "description": "import"}}
+    changes, _ = import_entries(data, [{"id": "1", "title": "New", "tags": ["z"], "language": ["en"],
+                                        "description": ""}], precedence)
+    entry = data[0]
+    assert entry.title == "Old" and entry.tags == ["z"] and entry.language == ["en"] and entry.description == ""
+    assert changes["1"][1] == {"tags", "language", "description"}
+
+
+def test_unchanged_records_are_not_reported():
+    data = library()
+    changes, skipped = import_entries(data, [{"id": "1", "title": "Old", "tags": ["a"]}])
+    assert (changes, skipped) == ({}, 0)
+
+
+def test_unknown_precedence_raises():
+    with pytest.raises(ValueError):
+        import_entries(library(), [], {"default": "newest"})
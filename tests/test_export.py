@@ -0,0 +1,52 @@
+import csv
+import json
+import os
+
+import pytest
+
+from auxillary.DataAccess import MangaEntry
+from auxillary.Export import export_entries, PROGRESS_STEP
+
+ENTRIES = [MangaEntry({"id": "1", "title": "First, \"quoted\"", "tag": ["a", "b"], "score": 4}),
+           MangaEntry({"id": "2", "title": "Ünïcode", "MC_Grouping": "Watched"})]
+
+
+def test_jsonl_has_one_projected_entry_per_line(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    assert export_entries(ENTRIES, path, ["id", "tags", "group"]) == 2
+    with open(path, encoding="utf-8") as file:
+        lines = [json.loads(line) for line in file]
+    # Missing fields are written with their default value
+    assert lines == [{"id": "1", "tags": ["a", "b"], "group": None}, {"id": "2", "tags": [], "group": "Watched"}]
+    assert not os.path.exists(path + ".part")
+
+
+def test_csv_has_a_header_and_joined_lists(tmp_path):
+    path = str(tmp_path / "out.csv")
+    export_entries(ENTRIES, path, ["id", "title", "tags", "group"], "CSV")
+    with open(path, newline="", encoding="utf-8") as file:
+        rows = list(csv.reader(file))
+    assert rows == [["id", "title", "tags", "group"], ["1", "First, \"quoted\"", "a, b", ""],
+                    ["2", "Ünïcode", "", "Watched"]]
+
+
+def test_stopping_the_progress_leaves_no_file(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    entries = [MangaEntry({"id": str(number)}) for number in range(PROGRESS_STEP * 2)]
+    seen = []
+    # Returning None keeps the export going, only False stops it
+    count = export_entries(entries, path, ["id"], progress=seen.append)
+    assert (count, seen) == (PROGRESS_STEP * 2, [PROGRESS_STEP, PROGRESS_STEP * 2])
+    assert os.path.exists(path)
+
+    os.remove(path)
+    assert export_entries(entries, path, ["id"], progress=lambda written: False) == PROGRESS_STEP
+    assert not os.path.exists(path) and not os.path.exists(path + ".part")
+
+
+@pytest.mark.parametrize("arguments", [(["id"], "XML"), (["id", "nothing"], "JSONL")])
+def test_invalid_arguments_raise_before_writing(tmp_path, arguments):
+    path = str(tmp_path / "out")
+    with pytest.raises(ValueError):
+        export_entries(ENTRIES, path, *arguments)
+    assert not os.listdir(tmp_path)
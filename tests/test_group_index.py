@@ -0,0 +1,60 @@
+from auxillary.DataAccess import MangaEntry
+from auxillary.GroupIndex import GroupIndex
+
+
+def make_entries():
+    return [MangaEntry({"id": str(number), "MC_Grouping": group})
+            for number, group in enumerate(["A", "B", None, "A", "A"])]
+
+
+def test_members_follow_group_changes():
+    entries = make_entries()
+    index = GroupIndex(entries)
+    assert index.members_of("A") == {"0", "3", "4"} and index.count("B") == 1
+
+    entries[0].group = "B"
+    index.update(entries[0])
+    entries[2].group = "C"
+    index.update(entries[2])
+    assert index.members_of("A") == {"3", "4"} and index.members_of("B") == {"0", "1"}
+    assert index.members_of("C") == {"2"}
+
+
+def test_emptied_groups_disappear():
+    entries = make_entries()
+    index = GroupIndex(entries)
+    index.remove("1")
+    entries[2].group = None
+    index.update(entries[2])
+    assert "B" not in index.members and index.count("B") == 0
+    assert index.members_of("missing") == set()
+
+
+def test_presorted_members_stay_sorted_through_edits():
+    entries = [MangaEntry({"id": str(number), "MC_Grouping": "A" if number % 3 else "B", "score": number % 4})
+               for number in range(30)]
+    positions = {entry.id: idx for idx, entry in enumerate(entries)}
+    by_id = {entry.id: entry for entry in entries}
+    index = GroupIndex(entries, positions)
+    sort_key = lambda entry: entry.score
+
+    def expected(group):
+        # A full sort is stable, ties keep the data order
+        return [entry.id for entry in sorted((entry for entry in entries if entry.group == group), key=sort_key,
+                                             reverse=True)]
+
+    assert [entry.id for entry in index.sorted_members("A", by_id.get, sort_key, True)] == expected("A")
+    for number, (score, group) in enumerate([(3, "A"), (0, "A"), (2, "B"), (1, "A"), (3, None)]):
+        entry = entries[number * 5 + 1]
+        entry.score, entry.group = score, group
+        index.update(entry)
+        assert [entry.id for entry in index.sorted_members("A", by_id.get, sort_key, True)] == expected("A")
+
+
+def test_another_sort_rebuilds_the_presorted_members():
+    entries = [MangaEntry({"id": str(number), "MC_Grouping": "A", "score": 5 - number}) for number in range(5)]
+    index = GroupIndex(entries, {entry.id: idx for idx, entry in enumerate(entries)})
+    by_id = {entry.id: entry for entry in entries}
+    by_score = [entry.id for entry in index.sorted_members("A", by_id.get, lambda entry: entry.score, False)]
+    by_id_order = [entry.id for entry in index.sorted_members("A", by_id.get, lambda entry: entry.id, False)]
+    assert by_score == ["4", "3", "2", "1", "0"] and by_id_order == ["0", "1", "2", "3", "4"]
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from auxillary.DataAccess import MangaEntry
+from auxillary.JSONMethods import iter_json_array, canonical_json, content_hash
+
+ITEMS = [{"id": "1", "tag": ["a", "b"], "nested": {"x": [1, 2.5, None]}}, 12345, "text with ] and , inside", [],
+         {}, True, {"id": "ünïcode", "title": "\"quoted\" \\ back"}, 1.5e+16, -2.5e-08, "\u00e9" * 40]
+
+
+def write(tmp_path, text):
+    path = tmp_path / "data.json"
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_streams_the_same_items_as_json_load(tmp_path, chunk_size, indent):
+    path = write(tmp_path, "\n  " + json.dumps(ITEMS, indent=indent) + "\n")
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == ITEMS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+def test_empty_array(tmp_path, chunk_size):
+    assert list(iter_json_array(write(tmp_path, " [ \n ] "), chunk_size=chunk_size)) == []
+
+
+@pytest.mark.parametrize("text", ["", "{}", "[1, 2", "[1 2]", "[{\"id\": 1}", "[1,]", "[\"unterminated]"])
+@pytest.mark.parametrize("chunk_size", [1, 4, 1 << 16])
+def test_invalid_files_raise(tmp_path, text, chunk_size):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(write(tmp_path, text), chunk_size=chunk_size))
+
+
+def test_errors_raise_without_reading_the_rest_of_the_file(tmp_path, monkeypatch):
+    path = write(tmp_path, '[{"id": "1"}, {"id": "2" "title": "x"}, ' + ", ".join(['{"id": "n"}'] * 10000) + "]")
+    read = []
+
+    def tracked_open(*args, **kwargs):
+        file = open(*args, **kwargs)
+        original_read = file.read
+        file.read = lambda size: read.append(size) or original_read(size)
+        return file
+
+    monkeypatch.setattr("auxillary.JSONMethods.open", tracked_open, raising=False)
+    items = iter_json_array(path, chunk_size=16)
+    assert next(items) == {"id": "1"}
+    with pytest.raises(json.JSONDecodeError):
+        next(items)
+    assert len(read) < 5
+
+
+def test_object_pairs_hook_builds_entries(tmp_path):
+    path = write(tmp_path, json.dumps([{"id": "1", "tag": ["x"]}]))
+    entry = next(iter_json_array(path, object_pairs_hook=MangaEntry))
+    assert isinstance(entry, MangaEntry) and entry.tags == ["x"]
+
+
+def test_canonical_json_ignores_key_order():
+    first = {"id": "1", "tag": ["a"], "score": 3}
+    second = {"score": 3, "tag": ["a"], "id": "1"}
+    assert canonical_json(first) == canonical_json(second)
+    assert canonical_json(first) != canonical_json(dict(first, tag=["b"]))
+    assert json.loads(canonical_json(first)) == first
+
+
+def test_content_hash_is_a_small_digest_of_the_canonical_json():
+    first = {"id": "1", "tag": ["a"], "description": "x" * 10000}
+    assert len(content_hash(first)) == 16
+    assert content_hash(first) == content_hash(dict(reversed(list(first.items()))))
+    assert content_hash(first) != content_hash(dict(first, tag=["b"]))
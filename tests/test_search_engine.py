@@ -0,0 +1,137 @@
+import itertools
+import os
+from collections import defaultdict
+
+import pytest
+
+from auxillary.DataAccess import MangaEntry
+from auxillary.GroupIndex import GroupIndex
+from auxillary.JSONMethods import load_json
+from auxillary.SearchEngine import SearchEngine, show_removed, loose_match, multi_match
+from auxillary.SimilarGraph import SimilarGraph
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), os.pardir, "assets", "data", "data.json")
+
+TEXTS = ["", "ro", "romance", "ROMANCE", "tag:romance", "tag:romance, war", "war, no such thing", "pages:>20",
+         "pages:<25, language:english", "title:the", "rating:4", "author:a", "deprecated:true", "similar:225174~1",
+         "similar:225174~", "cover:225174", "cover:225174~3", "no such thing"]
+SETTINGS = [{}, {show_removed: True}, {loose_match: True}, {multi_match: True},
+            {show_removed: True, loose_match: True, multi_match: True}]
+COVERS = {"225174": [("342253", 2), ("4408039", 5)]}
+
+
+def similar_covers(entry_id, max_distance):
+    return [(similar_id, distance) for similar_id, distance in COVERS.get(entry_id, [])
+            if max_distance is None or distance <= max_distance]
+
+
+@pytest.fixture(scope="module")
+def library():
+    data = load_json(DATA_FILE, data_type="mangas")
+    entry_to_index = {entry.id: idx for idx, entry in enumerate(data)}
+    graph = SimilarGraph(data)
+    engine = SearchEngine(data, entry_to_index, GroupIndex(data, entry_to_index), graph, similar_covers)
+    return data, entry_to_index, graph, engine
+
+
+def count_matches(value, target):
+    if isinstance(value, (int, float)):
+        return 1 if str(value) == target else 0
+    if isinstance(value, list):
+        return sum(count_matches(item, target) for item in value)
+    if isinstance(value, dict):
+        return sum(count_matches(item, target) for item in value.values())
+    return 1 if target.lower() in str(value).lower() else 0
+
+
+def compare_match(data_value, compare_term):
+    if isinstance(data_value, (list, dict)):
+        value = len(data_value)
+    elif isinstance(data_value, (float, int)) or (isinstance(data_value, str) and data_value.isnumeric()):
+        value = int(data_value)
+    else:
+        value = len(str(data_value))
+    target = compare_term[1:]
+    if not target.isnumeric():
+        return 0
+    return int(value > int(target)) if compare_term[0] == ">" else int(value < int(target))
+
+
+def old_score(entry, terms, graph, settings):
+    """The scoring of the search bar before it moved into SearchEngine."""
+    score = 0
+    for term in terms:
+        term_score = 0
+        if term.startswith("cover:"):
+            entry_id, _, distance = term[len("cover:"):].partition("~")
+            matches = {entry_id} | {similar_id for similar_id, _ in
+                                    similar_covers(entry_id, int(distance) if distance.isdigit() else None)}
+            term_score = int(entry.id in matches)
+        elif term.startswith("similar:") and "~" in term:
+            entry_id, _, hops = term[len("similar:"):].partition("~")
+            linked = graph.neighbors(entry_id, int(hops)) if hops.isdigit() else graph.component(entry_id)
+            term_score = int(entry.id in linked)
+        elif ":" in term:
+            field, value = term.split(":", 1)
+            for search_field in MangaEntry.FIELD_ALIASES_AND_GROUPING.get(field, [field]):
+                data_value = entry.get(search_field, "")
+                if value and value[0] in "<>":
+                    term_score += compare_match(data_value, value)
+                else:
+                    term_score += count_matches(data_value, value)
+        else:
+            term_score = sum(count_matches(value, term) for value in entry.values())
+        if not settings.get(loose_match) and term_score == 0:
+            return 0
+        score += term_score
+    return min(score, 1) if not settings.get(multi_match) else score
+
+
+def old_search(data, graph, text, sort_key, reverse, group, settings):
+    """The list the search bar built before the search moved into SearchEngine, as ids."""
+    entries = [entry for entry in data if (settings.get(show_removed) or not entry.removed)
+               and (not group or entry.group == group)]
+    if len(text) < 3:
+        return [entry.id for entry in sorted(entries, key=sort_key, reverse=reverse)]
+    terms = [term.strip() for term in text.split(",")]
+    by_score = defaultdict(list)
+    for entry in entries:
+        score = old_score(entry, terms, graph, settings)
+        if score:
+            by_score[score].append(entry)
+    return [entry.id for score in sorted(by_score, reverse=True)
+            for entry in sorted(by_score[score], key=sort_key, reverse=reverse)]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_query_matches_the_old_search(library, text):
+    data, _, graph, engine = library
+    groups = [None] + sorted({entry.group for entry in data if entry.group})
+    for (name, sort_key, reverse_default), reverse_order, group, settings in itertools.product(
+            engine.sorting_options, (False, True), groups, SETTINGS):
+        result = engine.query(text, name, reverse_order, group, settings)
+        expected = old_search(data, graph, text, sort_key, reverse_default ^ reverse_order, group, settings)
+        assert [entry.id for entry in result.entries] == expected, (text, name, reverse_order, group, settings)
+        assert result.sort == (sort_key, reverse_default ^ reverse_order)
+        assert result.terms == (None if len(text) < 3 else [term.strip() for term in text.split(",")])
+
+
+def test_query_has_hits_for_the_sample_terms(library):
+    # Guards the parity test against comparing empty results only
+    _, _, _, engine = library
+    for text in ("romance", "tag:romance, war", "pages:>20", "similar:225174~1", "cover:225174"):
+        assert engine.query(text, "By data order").entries, text
+
+
+def test_filters_of_the_result_match_the_entries(library):
+    data, _, _, engine = library
+    group = next(entry.group for entry in data if entry.group)
+    result = engine.query("", "By id", group=group)
+    assert all(engine.apply_filters(entry, result.filters) for entry in result.entries)
+    assert not any(engine.apply_filters(entry, result.filters) for entry in data if entry.group != group)
+
+
+def test_unknown_sort_name_falls_back_to_data_order(library):
+    data, _, _, engine = library
+    result = engine.query("", "By nothing", settings={show_removed: True})
+    assert [entry.id for entry in result.entries] == [entry.id for entry in data]
@@ -0,0 +1,40 @@
+import random
+
+from auxillary.DataAccess import MangaEntry
+from auxillary.SearchIndex import SearchIndex
+
+
+def brute_force(entries, text):
+    return {entry.id for entry in entries if text.lower() in SearchIndex.entry_text(entry)}
+
+
+def test_search_matches_a_scan_through_edits():
+    rng = random.Random(7)
+    words = ["moon", "Night", "sky", "sea", "nigh", "skyline"]
+    entries = [MangaEntry({"id": str(1000 + number), "title": " ".join(rng.sample(words, 2))})
+               for number in range(60)]
+    index = SearchIndex(entries)
+    queries = ["moo", "night", "NIGH", "sky s", "100", "1059 - ", "xyz", "ky"]
+    for query in queries:
+        expected = None if len(query) < SearchIndex.MIN_LENGTH else brute_force(entries, query)
+        assert index.search(query) == expected, query
+
+    for entry in entries[::3]:
+        entry.title_short = rng.choice(words)
+        index.update(entry)
+    removed = entries.pop(5)
+    index.remove(removed.id)
+    added = MangaEntry({"id": "9999", "title": "sea moon"})
+    entries.append(added)
+    index.update(added)
+    for query in queries:
+        expected = None if len(query) < SearchIndex.MIN_LENGTH else brute_force(entries, query)
+        assert index.search(query) == expected, query
+
+
+def test_edits_before_the_first_search_are_picked_up():
+    entry = MangaEntry({"id": "1", "title": "before"})
+    index = SearchIndex([entry])
+    entry.title = "after"
+    index.update(entry)
+    assert index.search("after") == {"1"} and index.search("before") == set()
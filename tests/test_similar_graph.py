@@ -0,0 +1,46 @@
+from auxillary.DataAccess import MangaEntry
+from auxillary.SimilarGraph import SimilarGraph, repair_links
+
+
+def chain():
+    # 1 - 2 - 3 - 4 and 5 on its own, 3 only knows about 2 through 2's list
+    return [MangaEntry({"id": "1", "similar": ["2"]}), MangaEntry({"id": "2", "similar": ["1", "3"]}),
+            MangaEntry({"id": "3", "similar": ["4"]}), MangaEntry({"id": "4", "similar": ["3"]}),
+            MangaEntry({"id": "5"})]
+
+
+def test_neighbors_and_components_count_links_in_both_directions():
+    graph = SimilarGraph(chain())
+    assert graph.neighbors("1") == {"1": 0, "2": 1}
+    assert graph.neighbors("1", 2) == {"1": 0, "2": 1, "3": 2}
+    assert graph.neighbors("3", 1) == {"3": 0, "2": 1, "4": 1}
+    assert graph.component("4") == {"1", "2", "3", "4"}
+    assert graph.component("5") == {"5"}
+    assert set(graph.one_sided()) == {("2", "3")}
+
+
+def test_edges_stay_while_either_entry_stores_them():
+    entries = chain()
+    graph = SimilarGraph(entries)
+    entries[0].similar = []
+    graph.update(entries[0])
+    # 2 still lists 1
+    assert "1" in graph.neighbors("2")
+    entries[1].similar = ["3"]
+    graph.update(entries[1])
+    assert graph.component("1") == {"1"}
+
+    graph.remove("3")
+    assert graph.component("2") == {"2"} and graph.component("4") == {"4"}
+
+
+def test_repair_links_stores_links_on_both_sides():
+    entries = chain()
+    entries[4].similar = ["5", "missing", "1", "1"]
+    changes = repair_links(entries)
+    by_id = {entry.id: entry for entry in entries}
+    assert by_id["5"].similar == ["1"] and by_id["1"].similar == ["2", "5"] and by_id["3"].similar == ["4", "2"]
+    # The duplicate is dropped, but the link itself stays
+    assert changes["5"][2] == ["5", "missing"]
+    assert set(changes) == {"1", "3", "5"}
+    assert list(SimilarGraph(entries).one_sided()) == []
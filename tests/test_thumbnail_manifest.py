@@ -0,0 +1,63 @@
+import sqlite3
+from types import SimpleNamespace
+
+from auxillary.ThumbnailManifest import ThumbnailManifest, BLUR, file_hash
+
+
+def test_upsert_keeps_columns_it_was_not_given(tmp_path):
+    manifest = ThumbnailManifest(str(tmp_path / "manifest.db"))
+    assert manifest.is_empty()
+    manifest.upsert({"id": "1", "path": "a.png", "url": "http://x/1", "etag": "e1", "size": 10})
+    manifest.upsert({"id": "1", "etag": "e2"})
+    record = manifest.get("1")
+    assert (record["path"], record["url"], record["etag"], record["size"]) == ("a.png", "http://x/1", "e2", 10)
+    assert record["checked"] is not None and manifest.get("1", BLUR) is None
+
+
+def test_variants_and_removal(tmp_path):
+    manifest = ThumbnailManifest(str(tmp_path / "manifest.db"))
+    manifest.upsert({"id": "1", "path": "a.png", "size": 10})
+    manifest.upsert({"id": "1", "variant": BLUR, "path": "b.png", "size": 4})
+    manifest.upsert({"id": "2", "path": "a.png", "size": 10})
+    assert sorted(manifest.variants()) == sorted(["original", BLUR])
+    # The shared file is counted once
+    assert manifest.total_size() == 14
+    assert sorted(manifest.references("a.png")) == [("1", "original"), ("2", "original")]
+
+    manifest.remove("1", BLUR)
+    assert manifest.load(BLUR) == {} and "1" in manifest.load()
+    manifest.remove("1")
+    assert list(manifest.load()) == ["2"] and manifest.is_referenced("a.png")
+
+
+def test_opening_an_old_manifest_adds_the_new_columns(tmp_path):
+    path = str(tmp_path / "manifest.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE thumbnails (id TEXT NOT NULL, variant TEXT NOT NULL DEFAULT 'original', "
+                 "path TEXT NOT NULL, url TEXT, etag TEXT, last_modified TEXT, size INTEGER, hash TEXT, "
+                 "width INTEGER, height INTEGER, checked REAL, PRIMARY KEY (id, variant))")
+    conn.execute("INSERT INTO thumbnails (id, path) VALUES ('1', 'a.png')")
+    conn.commit()
+    conn.close()
+
+    manifest = ThumbnailManifest(path)
+    manifest.upsert({"id": "1", "dhash": "ff", "accessed": 1.0})
+    assert manifest.get("1")["path"] == "a.png" and manifest.get("1")["dhash"] == "ff"
+
+
+def test_import_directory_records_existing_files(tmp_path):
+    (tmp_path / "1.png").write_bytes(b"cover")
+    manifest = ThumbnailManifest(str(tmp_path / "manifest.db"))
+    entries = [SimpleNamespace(id="1", thumbnail_url="http://x/1"), SimpleNamespace(id="2", thumbnail_url="")]
+    assert manifest.import_directory(str(tmp_path), entries) == 1
+    record = manifest.get("1")
+    assert record["size"] == 5 and record["hash"] == file_hash(str(tmp_path / "1.png"))
+    assert record["checked"] == 0 and manifest.get("2") is None
+
+
+def test_blur_overrides(tmp_path):
+    manifest = ThumbnailManifest(str(tmp_path / "manifest.db"))
+    manifest.set_blur_override("1", True)
+    manifest.set_blur_override("2", False)
+    manifest.set_blur_override("1", None)
+    assert manifest.load_blur_overrides() == {"2": False}
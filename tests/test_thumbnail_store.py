@@ -0,0 +1,62 @@
+import os
+
+from auxillary.ThumbnailManifest import ThumbnailManifest, BLUR
+from auxillary.ThumbnailStore import DirectoryStore, PackStore, convert_directory, deduplicate, PACK_PREFIX
+
+
+def make_stores(tmp_path):
+    manifest = ThumbnailManifest(str(tmp_path / "manifest.db"))
+    pack = PackStore(str(tmp_path / "thumbnails.pack"))
+    return manifest, pack, DirectoryStore(str(tmp_path))
+
+
+def test_pack_roundtrip_and_reopen(tmp_path):
+    _, pack, _ = make_stores(tmp_path)
+    location = pack.write("abc", b"data")
+    assert location.startswith(PACK_PREFIX)
+    assert pack.read(location) == b"data"
+    pack.close()
+    reopened = PackStore(str(tmp_path / "thumbnails.pack"))
+    assert reopened.read(location) == b"data"
+    reopened.close()
+
+
+def test_convert_directory_keeps_every_row_of_a_shared_file(tmp_path):
+    manifest, pack, directory = make_stores(tmp_path)
+    shared = directory.write("abc", b"shared cover")
+    single = directory.write("def", b"own cover")
+    manifest.upsert({"id": "1", "path": shared})
+    manifest.upsert({"id": "2", "path": shared})
+    manifest.upsert({"id": "2", "variant": BLUR, "path": single})
+
+    assert convert_directory(manifest, pack) == 2
+
+    originals = {entry_id: record["path"] for entry_id, record in manifest.load().items()}
+    assert originals == {"1": "pack:abc", "2": "pack:abc"}
+    assert manifest.load(BLUR)["2"]["path"] == "pack:def"
+    assert pack.read("pack:abc") == b"shared cover"
+    assert not os.path.exists(shared) and not os.path.exists(single)
+    pack.close()
+
+
+def test_convert_directory_drops_rows_of_missing_files(tmp_path):
+    manifest, pack, directory = make_stores(tmp_path)
+    manifest.upsert({"id": "1", "path": str(tmp_path / "gone.png")})
+    assert convert_directory(manifest, pack) == 0
+    assert manifest.load() == {}
+    pack.close()
+
+
+def test_deduplicate_points_identical_covers_to_one_file(tmp_path):
+    manifest, pack, directory = make_stores(tmp_path)
+    first = directory.write("1", b"same")
+    second = directory.write("2", b"same")
+    manifest.upsert({"id": "1", "path": first, "hash": "h"})
+    manifest.upsert({"id": "2", "path": second, "hash": "h"})
+
+    removed, freed = deduplicate(manifest, pack)
+
+    assert (removed, freed) == (1, 4)
+    assert {record["path"] for record in manifest.load().values()} == {first}
+    assert not os.path.exists(second)
+    pack.close()
@@ -0,0 +1,65 @@
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+from auxillary.DownloadScheduler import PRIORITY_SELECTED, PRIORITY_VISIBLE
+from auxillary.Thumbnails import ThumbnailManager
+
+URL = "http://covers.example/1.png"
+
+
+def fake_manager(**attributes):
+    """Manager with just the state the tested methods use, the loop only records what is scheduled on it."""
+    scheduled, submitted = [], []
+    state = dict(pending={}, evicted=set(), blurring=set(), entries={},
+                 pinned={PRIORITY_SELECTED: set(), PRIORITY_VISIBLE: set()}, download=True,
+                 loop=SimpleNamespace(call_soon_threadsafe=lambda func, *args: scheduled.append((func, args))),
+                 should_blur=lambda entry_id: False)
+    manager = SimpleNamespace(**{**state, **attributes})
+    manager._promote = lambda *args: ThumbnailManager._promote(manager, *args)
+    manager.get_scheduler = lambda: SimpleNamespace(
+        submit=lambda key, url, headers=None, priority=None, requeue=False: submitted.append((url, priority)))
+    manager.wait_for = lambda url, manga: ThumbnailManager.wait_for(manager, url, manga)
+    return manager, scheduled, submitted
+
+
+def test_prioritize_leaves_the_download_state_to_the_loop():
+    entry = SimpleNamespace(id="1", thumbnail_url=URL)
+    manager, scheduled, submitted = fake_manager(evicted={"1"})
+
+    ThumbnailManager.prioritize(manager, [entry], PRIORITY_VISIBLE)
+    assert manager.pinned[PRIORITY_VISIBLE] == {"1"}
+    assert manager.pending == {} and manager.evicted == {"1"} and submitted == []
+
+    func, args = scheduled.pop()
+    func(*args)
+    assert manager.pending == {URL: [entry]} and manager.evicted == set()
+    assert submitted == [(URL, PRIORITY_VISIBLE)]
+
+
+def test_promote_skips_entries_without_a_pending_download():
+    entry = SimpleNamespace(id="1", thumbnail_url=URL)
+    manager, _, submitted = fake_manager()
+    ThumbnailManager._promote(manager, [entry], PRIORITY_SELECTED)
+    assert manager.pending == {} and submitted == []
+
+
+def test_blur_of_an_entry_removed_meanwhile_is_dropped():
+    entry = SimpleNamespace(id="1", thumbnail_url=URL)
+    future = Future()
+    manager, scheduled, _ = fake_manager(entries={"1": entry}, id_to_path={"1": "a.png"}, blur_paths={}, blur_strength=10,
+                                 image_format="PNG", quality=None, logger=SimpleNamespace(error=print),
+                                 read_location=lambda location: b"cover",
+                                 processor=SimpleNamespace(submit=lambda *args: future))
+    manager.on_processed = lambda *args, **kwargs: ThumbnailManager.on_processed(manager, *args, **kwargs)
+    manager.processed_later = lambda *args, **kwargs: ThumbnailManager.processed_later(manager, *args, **kwargs)
+
+    assert ThumbnailManager.request_blur(manager, "1") is future
+    assert manager.blurring == {"1"}
+    ThumbnailManager.remove_entries(manager, ["1"])
+    future.set_result({"data": b"blurred", "hash": "h"})
+    # The result is stored on the loop thread, not on the thread that finished the future
+    assert manager.blurring == {"1"}
+    func, args = scheduled.pop()
+    func(*args)
+    assert manager.blurring == set() and manager.blur_paths == {}
+    assert ThumbnailManager.request_blur(manager, "1") is None